@@ -0,0 +1,149 @@
+"""
+Deletion of a user account and everything it owns
+
+Every user-owned collection is cleared in one step: as a multi-document
+transaction when the deployment supports it (replica set or sharded
+cluster), otherwise with concurrent deletes. Suggestion histories above a
+threshold are left out of that step and removed afterwards by a background
+task in small batches, so the request takes the same time for every user
+and no transaction grows with the size of a history.
+"""
+import os
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Collections whose documents belong to a user through `user_id`
+USER_OWNED_COLLECTIONS = (
+    "profiles",
+    "suggestions",
+    "generation_jobs",
+    "subscriptions",
+    "payment_transactions",
+)
+
+
+class AccountDeleter:
+    def __init__(self, background_threshold: int = 1000, batch_size: int = 500):
+        # Suggestion histories larger than this are deleted in background batches
+        self.background_threshold = background_threshold
+        self.batch_size = batch_size
+        self._supports_transactions: Optional[bool] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.deleted_accounts = 0
+        self.transactional = 0
+        self.concurrent = 0
+        self.background_batches = 0
+        self.background_failed = 0
+
+    async def delete_account(self, db, user_id: str) -> int:
+        """
+        Delete the user and their data; large histories finish in the background
+
+        Returns the number of user documents deleted (0 when the account
+        was already gone).
+        """
+        in_background = await self._has_large_history(db, user_id)
+        collections = [
+            name for name in USER_OWNED_COLLECTIONS
+            if not (in_background and name == "suggestions")
+        ]
+
+        if await self._transactions_available(db):
+            deleted = await self._delete_in_transaction(db, user_id, collections)
+            self.transactional += 1
+        else:
+            *_, user_result = await asyncio.gather(
+                *(db[name].delete_many({"user_id": user_id}) for name in collections),
+                db.users.delete_one({"id": user_id})
+            )
+            deleted = user_result.deleted_count
+            self.concurrent += 1
+        if deleted:
+            self.deleted_accounts += 1
+
+        if in_background:
+            task = asyncio.create_task(self._delete_suggestions_in_batches(db, user_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return deleted
+
+    async def _has_large_history(self, db, user_id: str) -> bool:
+        # Counting stops at the threshold, so this is bounded for heavy users too
+        count = await db.suggestions.count_documents(
+            {"user_id": user_id},
+            limit=self.background_threshold + 1
+        )
+        return count > self.background_threshold
+
+    async def _transactions_available(self, db) -> bool:
+        if self._supports_transactions is None:
+            try:
+                reply = await db.client.admin.command("hello")
+                self._supports_transactions = "setName" in reply or reply.get("msg") == "isdbgrid"
+            except Exception as e:
+                logger.warning(f"Não foi possível detectar suporte a transações: {str(e)}")
+                self._supports_transactions = False
+            logger.info(
+                "Exclusão de contas "
+                + ("transacional" if self._supports_transactions else "concorrente (sem replica set)")
+            )
+        return self._supports_transactions
+
+    async def _delete_in_transaction(self, db, user_id: str, collections: list[str]) -> int:
+        async def delete_all(session):
+            # Operations in a transaction share the session and run one at a time
+            for name in collections:
+                await db[name].delete_many({"user_id": user_id}, session=session)
+            result = await db.users.delete_one({"id": user_id}, session=session)
+            return result.deleted_count
+
+        async with await db.client.start_session() as session:
+            # Retries the whole transaction on transient errors
+            return await session.with_transaction(delete_all)
+
+    async def _delete_suggestions_in_batches(self, db, user_id: str) -> None:
+        try:
+            while True:
+                batch = await db.suggestions.find(
+                    {"user_id": user_id}, {"_id": 1}
+                ).limit(self.batch_size).to_list(length=self.batch_size)
+                if not batch:
+                    break
+                await db.suggestions.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+                self.background_batches += 1
+                # Let request handlers run between batches
+                await asyncio.sleep(0)
+            logger.info(f"Histórico de sugestões removido para o usuário {user_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.background_failed += 1
+            logger.error(f"Erro ao remover histórico de sugestões do usuário {user_id}: {str(e)}")
+
+    async def stop(self) -> None:
+        """Cancel pending background deletes (the remaining suggestions stay orphaned)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "deleted_accounts": self.deleted_accounts,
+            "transactional": self.transactional,
+            "concurrent": self.concurrent,
+            "transactions_available": self._supports_transactions,
+            "background_pending": len(self._tasks),
+            "background_batches": self.background_batches,
+            "background_failed": self.background_failed
+        }
+
+
+# Create singleton instance
+account_deleter = AccountDeleter(
+    background_threshold=int(os.environ.get("ACCOUNT_DELETE_BACKGROUND_THRESHOLD", "1000")),
+    batch_size=int(os.environ.get("ACCOUNT_DELETE_BATCH_SIZE", "500"))
+)
@@ -3,17 +3,108 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 import os
+import time
+import uuid
+import hashlib
+from cache import TTLCache
 
 # Security configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-production-123456789")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Scheme stored hashes were created with before schemes were configurable
+LEGACY_PASSWORD_SCHEME = "pbkdf2_sha256"
+
+def build_crypt_context(schemes: list[str], options: dict) -> CryptContext:
+    """
+    CryptContext hashing with schemes[0]; the other schemes only verify and
+    are flagged by needs_update, as are hashes below a scheme's default rounds
+    """
+    if LEGACY_PASSWORD_SCHEME not in schemes:
+        schemes = schemes + [LEGACY_PASSWORD_SCHEME]
+    options = dict(options)
+    for key, value in list(options.items()):
+        scheme, _, setting = key.partition("__")
+        # Raising default_rounds alone does not flag existing hashes
+        if setting == "default_rounds":
+            options.setdefault(f"{scheme}__min_rounds", value)
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+def parse_scheme_options(value: str) -> dict:
+    """Parse "scheme__setting=value,..." (passlib CryptContext keywords)"""
+    options = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, raw = item.partition("=")
+        options[key.strip()] = int(raw) if raw.strip().isdigit() else raw.strip()
+    return options
+
+pwd_context = build_crypt_context(
+    [scheme.strip() for scheme in os.environ.get("PASSWORD_SCHEMES", LEGACY_PASSWORD_SCHEME).split(",") if scheme.strip()],
+    parse_scheme_options(os.environ.get("PASSWORD_SCHEME_OPTIONS", ""))
+)
 security = HTTPBearer()
 
+
+class VerifiedTokenCache:
+    """
+    Payloads of tokens that already passed signature and claim verification
+
+    Clients resend the same token for days, so verifying it once is enough:
+    entries are keyed by the SHA-256 of the token and dropped the moment
+    the token's `exp` passes (checked against the wall clock on every hit).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._cache.delete(key)
+            return None
+        return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        expires_at = payload.get("exp")
+        ttl_seconds = None
+        if isinstance(expires_at, (int, float)):
+            ttl_seconds = expires_at - time.time()
+            if ttl_seconds <= 0:
+                return
+        else:
+            expires_at = None
+        self._cache.set(self._key(token), (payload, expires_at), ttl_seconds=ttl_seconds)
+
+    def evict(self, token: str) -> None:
+        self._cache.delete(self._key(token))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+token_cache = VerifiedTokenCache(max_entries=int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", "10000")))
+
+# Optional check run by get_token_payload on every request (cached token or
+# not) with the payload and the raw token; returning True rejects the token
+# and evicts it from the cache
+revocation_hook: Optional[Callable[[dict, str], Awaitable[bool]]] = None
+
+def set_revocation_hook(hook: Optional[Callable[[dict, str], Awaitable[bool]]]) -> None:
+    """Install (or remove, with None) the revocation check used by get_token_payload"""
+    global revocation_hook
+    revocation_hook = hook
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -22,6 +113,10 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def password_needs_update(hashed_password: str) -> bool:
+    """Whether a (verified) hash uses a deprecated scheme or weaker settings than configured"""
+    return pwd_context.needs_update(hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -30,31 +125,46 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation (logout)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def decode_token(token: str) -> dict:
-    """Decode and verify a JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido ou expirado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    """Decode and verify a JWT token (verification is cached until the token expires)"""
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido ou expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        token_cache.set(token, payload)
+    # Copy: the cached payload is shared by every request with this token
+    return dict(payload)
 
-async def get_current_user_email(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Get current user email from JWT token"""
+async def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Get the verified JWT claims, requiring the subject (email)"""
     token = credentials.credentials
     payload = decode_token(token)
-    email: str = payload.get("sub")
-    if email is None:
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return email
+    if revocation_hook is not None and await revocation_hook(payload, token):
+        token_cache.evict(token)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+async def get_current_user_email(payload: dict = Depends(get_token_payload)) -> str:
+    """Get current user email from JWT token"""
+    return payload["sub"]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: latency of unrelated requests during a burst of logins
+
+A stand-in for a cheap endpoint (one short await per request) runs at a
+steady rate while a burst of password verifications executes, either inline
+on the event loop (as the handlers used to) or through password_hasher.
+Reports p50/p99 of the cheap requests and the throughput of the logins.
+
+Usage: python backend/benchmarks/bench_password_hashing.py [--logins N] [--concurrency N]
+"""
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from auth import pwd_context
+from password_hasher import PasswordHasher
+
+PASSWORD = "senha-de-teste-123"
+
+
+async def cheap_requests(stop: asyncio.Event, latencies: list, interval: float = 0.002) -> None:
+    """Issue one cheap request every `interval` seconds, recording its latency"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0)  # the request's own I/O, already complete
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def login_burst(verify, hashed: str, logins: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_login():
+        async with semaphore:
+            assert await verify(PASSWORD, hashed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    return time.perf_counter() - started
+
+
+async def run(label: str, verify, hashed: str, logins: int, concurrency: int) -> None:
+    latencies: list = []
+    stop = asyncio.Event()
+    background = asyncio.create_task(cheap_requests(stop, latencies))
+    await asyncio.sleep(0.05)
+    elapsed = await login_burst(verify, hashed, logins, concurrency)
+    stop.set()
+    await background
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if len(latencies) >= 100 else latencies[-1] * 1000
+    print(f"{label:>24}: requisições simples p50 {p50:7.2f} ms | p99 {p99:8.2f} ms "
+          f"| {len(latencies):5d} amostras | {logins / elapsed:6.1f} logins/s")
+
+
+async def main_async(args) -> None:
+    hashed = pwd_context.hash(PASSWORD)
+
+    async def inline_verify(password, hashed_password):
+        return pwd_context.verify(password, hashed_password)
+
+    await run("inline no event loop", inline_verify, hashed, args.logins, args.concurrency)
+    for workers in args.workers:
+        hasher = PasswordHasher(max_workers=workers, max_pending=args.logins)
+        await run(f"executor ({workers} threads)", hasher.verify, hashed, args.logins, args.concurrency)
+        hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
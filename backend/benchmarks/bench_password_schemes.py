@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hash and verify latency per password scheme on this machine
+
+Each candidate is "<scheme>[:setting=value,...]" with passlib settings for
+that scheme, e.g. "pbkdf2_sha256:default_rounds=600000" or
+"argon2:memory_cost=65536,time_cost=3". Schemes whose backend is not
+installed are reported and skipped. Use the numbers to choose
+PASSWORD_SCHEMES / PASSWORD_SCHEME_OPTIONS.
+
+Usage: python backend/benchmarks/bench_password_schemes.py [--samples N] [candidate ...]
+"""
+import time
+import argparse
+import statistics
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+
+DEFAULT_CANDIDATES = (
+    "pbkdf2_sha256",
+    "pbkdf2_sha256:default_rounds=100000",
+    "pbkdf2_sha256:default_rounds=600000",
+    "bcrypt:default_rounds=12",
+    "argon2",
+    "scrypt",
+)
+
+PASSWORD = "senha-de-teste-123"
+
+
+def parse_candidate(candidate: str) -> tuple[str, dict]:
+    scheme, _, raw_settings = candidate.partition(":")
+    settings = {}
+    for item in filter(None, raw_settings.split(",")):
+        key, _, value = item.partition("=")
+        settings[f"{scheme}__{key}"] = int(value) if value.isdigit() else value
+    return scheme, settings
+
+
+def measure(func, samples: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+    return statistics.median(timings) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("candidates", nargs="*", default=list(DEFAULT_CANDIDATES))
+    args = parser.parse_args()
+
+    print(f"{'esquema':>40} | {'hash p50':>9} | {'hash p95':>9} | {'verify p50':>10} | {'tamanho':>7}")
+    for candidate in args.candidates:
+        scheme, settings = parse_candidate(candidate)
+        try:
+            context = CryptContext(schemes=[scheme], **settings)
+            hashed = context.hash(PASSWORD)
+        except (MissingBackendError, KeyError, ValueError) as e:
+            print(f"{candidate:>40} | indisponível: {e}")
+            continue
+
+        hash_p50, hash_p95 = measure(lambda: context.hash(PASSWORD), args.samples)
+        verify_p50, _ = measure(lambda: context.verify(PASSWORD, hashed), args.samples)
+        print(f"{candidate:>40} | {hash_p50:7.1f}ms | {hash_p95:7.1f}ms | {verify_p50:8.1f}ms | {len(hashed):7d}")
+
+
+if __name__ == "__main__":
+    main()
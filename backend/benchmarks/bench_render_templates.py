@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: rendering structured plans (6 training days, 6 meals) with the f-string templates
+
+Usage: python backend/benchmarks/bench_render_templates.py [--repeat N]
+"""
+import sys
+import argparse
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from templates import render_workout_plan, render_nutrition_plan
+
+
+def sample_workout() -> dict:
+    """Six training days with warm-up, eight exercises and four stretches each"""
+    day = {
+        "warmup": [
+            {"exercise": "Polichinelo", "duration": "3 minutos"},
+            {"exercise": "Corrida estacionária", "duration": "2 minutos"},
+        ],
+        "main_workout": [
+            {"name": f"Exercício {i}", "sets": 4, "reps": "10 a 12", "rest": "60 segundos"}
+            for i in range(1, 9)
+        ],
+        "cooldown": [
+            {"muscle": "quadríceps", "duration": "30 segundos", "instructions": "Segure o pé atrás do corpo"},
+            {"muscle": "posteriores", "duration": "30 segundos", "instructions": "Incline o tronco à frente"},
+            {"muscle": "peitoral", "duration": "30 segundos", "instructions": ""},
+            {"muscle": "ombros", "duration": "30 segundos", "instructions": "Cruze o braço à frente do peito"},
+        ],
+    }
+    return {
+        "frequency": "6 vezes por semana",
+        "division": "ABCDEF - Treino dividido por grupos musculares",
+        "days": [dict(day, title=f"DIA {letter} - TREINO {letter}") for letter in "ABCDEF"],
+    }
+
+
+def sample_nutrition() -> dict:
+    """Six meals of five items, eighteen shopping items and six substitutions"""
+    items = [
+        {"food": "Arroz branco", "quantity": "5 colheres de sopa", "details": "Base energética da refeição"},
+        {"food": "Feijão carioca", "quantity": "1 concha média", "details": "Proteína vegetal e ferro"},
+        {"food": "Frango (coxa ou sobrecoxa)", "quantity": "150g", "details": ""},
+        {"food": "Salada de alface e tomate", "quantity": "à vontade", "details": "Vitaminas e minerais"},
+        {"food": "Banana", "quantity": "1 unidade", "details": ""},
+    ]
+    meals = {}
+    for name in ("breakfast", "morning_snack", "lunch", "afternoon_snack", "dinner", "supper"):
+        meals[name] = items
+        meals[f"{name}_cal"] = 350
+    meals["shopping_list"] = [{"item": f"Item {i}", "price": 7.5} for i in range(18)]
+    meals["total_cost"] = "135.00"
+    meals["substitutions"] = [{"original": "Frango", "alternative": "Ovos"}] * 6
+    return {"calories": 2100, "protein": 140, "carbs": 230, "fats": 60, "meals": meals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    cases = (
+        ("treino (6 dias)", render_workout_plan, sample_workout()),
+        ("nutrição (6 refeições)", render_nutrition_plan, sample_nutrition()),
+    )
+    for label, render, data in cases:
+        text, sections = render(data, "Maria da Silva")
+        seconds = min(timeit.repeat(lambda: render(data, "Maria da Silva"), number=args.repeat, repeat=5))
+        per_call_us = seconds / args.repeat * 1e6
+        print(f"{label:>24}: {per_call_us:7.1f} µs por plano | {1e6 / per_call_us:9.0f} planos/s "
+              f"| {len(text)} caracteres, {len(sections)} seções")
+
+
+if __name__ == "__main__":
+    main()
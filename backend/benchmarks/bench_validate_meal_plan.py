@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: validate_meal_plan (compiled matcher) vs the previous substring scan
+
+Usage: python backend/benchmarks/bench_validate_meal_plan.py [--repeat N]
+"""
+import sys
+import argparse
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_lists import ALIMENTOS_PROIBIDOS, validate_meal_plan
+from templates import render_nutrition_plan
+from text_matcher import MultiPatternMatcher
+
+
+def legacy_validate_meal_plan(meal_text: str) -> tuple[bool, list]:
+    """Implementation before the compiled matcher: one `in` scan per forbidden food"""
+    forbidden_found = []
+    meal_lower = meal_text.lower()
+
+    for forbidden in ALIMENTOS_PROIBIDOS:
+        if forbidden.lower() in meal_lower:
+            forbidden_found.append(forbidden)
+
+    return len(forbidden_found) == 0, forbidden_found
+
+
+def sample_plan() -> str:
+    """A typical rendered nutrition plan (six meals, shopping list, substitutions)"""
+    meal = [
+        {"food": "Arroz branco", "quantity": "5 colheres de sopa", "details": "Base energética da refeição"},
+        {"food": "Feijão carioca", "quantity": "1 concha média", "details": "Proteína vegetal e ferro"},
+        {"food": "Frango (coxa ou sobrecoxa)", "quantity": "150g", "details": ""},
+        {"food": "Salada de alface e tomate", "quantity": "à vontade", "details": "Vitaminas e minerais"},
+    ]
+    meals = {}
+    for name in ("breakfast", "morning_snack", "lunch", "afternoon_snack", "dinner", "supper"):
+        meals[name] = meal
+        meals[f"{name}_cal"] = 400
+    meals["shopping_list"] = [{"item": f"Item {i}", "price": 10.0} for i in range(18)]
+    meals["total_cost"] = "140.00"
+    meals["substitutions"] = [{"original": "Frango", "alternative": "Carne moída"}] * 5
+    plan, _ = render_nutrition_plan(
+        {"calories": 2000, "protein": 130, "carbs": 220, "fats": 55, "meals": meals},
+        "Maria da Silva"
+    )
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    clean = sample_plan()
+    dirty = clean + "\nExtra: Salmão grelhado com quinoa e castanha de caju\n"
+
+    print(f"Padrões proibidos: {len(ALIMENTOS_PROIBIDOS)}, texto: {len(clean)} caracteres")
+    for label, text in (("plano válido", clean), ("plano com proibidos", dirty)):
+        legacy = min(timeit.repeat(lambda: legacy_validate_meal_plan(text), number=args.repeat, repeat=5))
+        current = min(timeit.repeat(lambda: validate_meal_plan(text), number=args.repeat, repeat=5))
+        legacy_us = legacy / args.repeat * 1e6
+        current_us = current / args.repeat * 1e6
+        print(f"{label:>22}: anterior {legacy_us:8.1f} µs | compilado {current_us:8.1f} µs "
+              f"| {legacy_us / current_us:4.2f}x")
+        print(f"{'':>22}  encontrados: {validate_meal_plan(text)[1]}")
+
+    # Crescimento da lista: o custo do matcher compilado não depende do número de padrões
+    print()
+    for factor in (1, 10, 50):
+        patterns = ALIMENTOS_PROIBIDOS + [f"{food} tipo {i}" for i in range(1, factor) for food in ALIMENTOS_PROIBIDOS]
+        lowered = [pattern.lower() for pattern in patterns]
+        matcher = MultiPatternMatcher(patterns)
+
+        def legacy_scan():
+            meal_lower = clean.lower()
+            return [pattern for pattern in lowered if pattern in meal_lower]
+
+        legacy = min(timeit.repeat(legacy_scan, number=args.repeat // 10, repeat=3)) / (args.repeat // 10) * 1e6
+        current = min(timeit.repeat(lambda: matcher.matched_patterns(clean), number=args.repeat // 10, repeat=3)) / (args.repeat // 10) * 1e6
+        print(f"{len(patterns):>5} padrões: anterior {legacy:8.1f} µs | compilado {current:8.1f} µs | {legacy / current:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compressed storage for suggestion content
+
+Rendered plans are large, repetitive text, so they are stored compressed:
+the document keeps `content_z` (BSON binary) and a `content_codec` marker
+instead of the plain `content` string. Documents written before this (plain
+`content`) are read as they are, so old and new documents can coexist
+while the backfill migration runs.
+
+zlib is always available; zstd is used when the optional `zstandard`
+package is installed.
+"""
+import os
+import zlib
+import logging
+from typing import Callable, NamedTuple, Optional
+from bson.binary import Binary
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Contents shorter than this are stored as plain text
+MIN_COMPRESS_BYTES = 512
+
+
+class Codec(NamedTuple):
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+CODECS = {
+    "zlib": Codec("zlib", lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=9)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    CODECS["zstd"] = Codec("zstd", _zstd_compressor.compress, _zstd_decompressor.decompress)
+
+
+def get_codec(name: str) -> Optional[Codec]:
+    """Codec by name; None for "none" (store plain text)"""
+    if name == "none":
+        return None
+    if name == "zstd" and name not in CODECS:
+        logger.warning("zstandard não instalado; usando zlib para o conteúdo das sugestões")
+        name = "zlib"
+    if name not in CODECS:
+        raise ValueError(f"Codec de conteúdo desconhecido: {name}")
+    return CODECS[name]
+
+
+class ContentCodec:
+    def __init__(self, codec_name: str = "zlib", min_bytes: int = MIN_COMPRESS_BYTES):
+        self.codec = get_codec(codec_name)
+        self.min_bytes = min_bytes
+
+    def encode(self, doc: dict) -> dict:
+        """Replace doc["content"] by its compressed form, in place; returns doc"""
+        content = doc.get("content")
+        if self.codec is None or not isinstance(content, str):
+            return doc
+
+        data = content.encode("utf-8")
+        if len(data) < self.min_bytes:
+            return doc
+
+        del doc["content"]
+        doc["content_z"] = Binary(self.codec.compress(data))
+        doc["content_codec"] = self.codec.name
+        return doc
+
+    @staticmethod
+    def decode(doc: dict) -> dict:
+        """Restore doc["content"] from its compressed form, in place; returns doc"""
+        compressed = doc.pop("content_z", None)
+        codec_name = doc.pop("content_codec", None)
+        if compressed is not None:
+            codec = CODECS.get(codec_name)
+            if codec is None:
+                raise ValueError(f"Codec de conteúdo indisponível: {codec_name}")
+            doc["content"] = codec.decompress(bytes(compressed)).decode("utf-8")
+        return doc
+
+
+# Create singleton instance
+content_codec = ContentCodec(
+    codec_name=os.environ.get("SUGGESTION_CONTENT_CODEC", "zlib"),
+    min_bytes=int(os.environ.get("SUGGESTION_CONTENT_MIN_BYTES", str(MIN_COMPRESS_BYTES)))
+)
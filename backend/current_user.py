@@ -0,0 +1,108 @@
+"""
+Resolution of the authenticated user for request handlers
+
+Tokens issued with a "uid" claim carry everything a handler needs, so the
+user is built from the claims without touching MongoDB. Older tokens only
+carry the email; those are resolved with one lookup (joined with the
+profile when the handler needs it) whose result is kept in a bounded
+per-process TTL cache.
+"""
+import os
+from typing import NamedTuple, Optional
+from fastapi import Depends, HTTPException, status
+from auth import ACCESS_TOKEN_EXPIRE_MINUTES, get_token_payload
+from cache import TTLCache
+from database import get_database
+from models import CurrentUser, Profile
+from repository import load_profile, load_user_with_profile
+
+
+class UserWithProfile(NamedTuple):
+    user: CurrentUser
+    # None when the user has not created a profile
+    profile: Optional[Profile]
+
+
+class CurrentUserResolver:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300):
+        # email -> CurrentUser, for tokens without a uid claim
+        self.users = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # Ids of accounts deleted by this process, for as long as their
+        # tokens can still be valid
+        self.deleted = TTLCache(max_entries=max_entries, ttl_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        self.claim_hits = 0
+
+    async def resolve(self, db, payload: dict) -> CurrentUser:
+        email = payload["sub"]
+        user_id = payload.get("uid")
+
+        if user_id is not None:
+            current_user = CurrentUser(id=user_id, email=email)
+            self.claim_hits += 1
+        else:
+            current_user = self.users.get(email)
+            if current_user is None:
+                user_doc = await db.users.find_one({"email": email}, {"_id": 0, "id": 1, "email": 1})
+                if user_doc:
+                    current_user = CurrentUser(id=user_doc["id"], email=user_doc["email"])
+                    self.users.set(email, current_user)
+
+        return self._check(current_user)
+
+    async def resolve_with_profile(self, db, payload: dict) -> UserWithProfile:
+        """Resolve the user and load their profile in a single query"""
+        email = payload["sub"]
+        user_id = payload.get("uid")
+
+        if user_id is not None:
+            current_user = CurrentUser(id=user_id, email=email)
+            self.claim_hits += 1
+        else:
+            current_user = self.users.get(email)
+
+        if current_user is not None:
+            self._check(current_user)
+            return UserWithProfile(current_user, await load_profile(db, current_user.id))
+
+        # Email-only token and cache miss: user and profile via one $lookup
+        current_user, profile = await load_user_with_profile(db, email)
+        if current_user is not None:
+            self.users.set(email, current_user)
+        return UserWithProfile(self._check(current_user), profile)
+
+    def _check(self, current_user: Optional[CurrentUser]) -> CurrentUser:
+        if current_user is None or current_user.id in self.deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuário não encontrado"
+            )
+        return current_user
+
+    def invalidate(self, current_user: CurrentUser) -> None:
+        """Forget a user whose account was deleted"""
+        self.users.delete(current_user.email)
+        self.deleted.set(current_user.id, True)
+
+    def stats(self) -> dict:
+        return {
+            "claim_hits": self.claim_hits,
+            "cache": self.users.stats(),
+            "deleted_tracked": len(self.deleted)
+        }
+
+
+# Create singleton instance
+current_user_resolver = CurrentUserResolver(
+    max_entries=int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", "300"))
+)
+
+
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> CurrentUser:
+    """Get the authenticated user (id and email) for the request"""
+    return await current_user_resolver.resolve(get_database(), payload)
+
+
+async def get_current_user_with_profile(payload: dict = Depends(get_token_payload)) -> UserWithProfile:
+    """Get the authenticated user and their profile (None if not created yet)"""
+    return await current_user_resolver.resolve_with_profile(get_database(), payload)
@@ -1,6 +1,26 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from typing import Optional
+from pool_metrics import pool_metrics
+
+
+def client_options() -> dict:
+    """Connection pool and timeout settings for the MongoDB client, from the environment"""
+    options = {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000")),
+    }
+    # No default: without it a checkout waits for as long as the pool is exhausted
+    wait_queue_timeout = os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    if wait_queue_timeout:
+        options["waitQueueTimeoutMS"] = int(wait_queue_timeout)
+    # e.g. "zstd,snappy,zlib"; the server picks the first one it supports
+    compressors = os.environ.get("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
@@ -9,7 +29,11 @@ class Database:
     def get_client(cls) -> AsyncIOMotorClient:
         if cls.client is None:
             mongo_url = os.environ['MONGO_URL']
-            cls.client = AsyncIOMotorClient(mongo_url)
+            cls.client = AsyncIOMotorClient(
+                mongo_url,
+                event_listeners=[pool_metrics],
+                **client_options()
+            )
         return cls.client
     
     @classmethod
@@ -0,0 +1,401 @@
+"""
+Biblioteca de planos padrão usados quando a geração com IA falha
+
+Os planos são montados e renderizados uma única vez na importação, indexados por
+(tipo de treino, faixa de IMC, faixa etária, objetivo). Em uma falha do LLM o
+custo por requisição é um lookup no dicionário e a troca do nome do usuário.
+"""
+import unicodedata
+from itertools import product
+from models import Profile
+from plan_cache import PROFILE_NAME_PLACEHOLDER, personalize_plan
+from templates import render_workout_plan, render_nutrition_plan
+
+TRAINING_TYPES = ("academia", "casa", "ar_livre")
+BMI_BANDS = ("abaixo_do_peso", "normal", "sobrepeso", "obesidade")
+AGE_BANDS = ("adolescente", "adulto", "idoso")
+OBJECTIVES = ("emagrecimento", "hipertrofia", "condicionamento")
+
+# Palavras-chave (sem acentos) que classificam o texto livre de objetivos.
+# A ordem importa: o primeiro objetivo com alguma palavra encontrada vence.
+OBJECTIVE_KEYWORDS = (
+    ("emagrecimento", ("emagrec", "perder", "perda", "queimar", "gordura", "secar", "definir", "definicao")),
+    ("hipertrofia", ("hipertrofia", "massa", "ganhar", "musculo", "muscular", "forca", "crescer")),
+)
+
+# ==================== TREINOS ====================
+
+# Aquecimentos: (exercício, duração, alto impacto)
+WARMUPS = {
+    "academia": {
+        "A": [("Esteira em caminhada leve", "5 minutos", False), ("Rotação de braços", "2 minutos", False)],
+        "B": [("Bicicleta ergométrica", "5 minutos", False), ("Circundução de ombros", "2 minutos", False)],
+        "C": [("Elíptico", "5 minutos", False), ("Círculos com tornozelos", "2 minutos", False)],
+    },
+    "casa": {
+        "A": [("Polichinelos", "3 minutos", True), ("Rotação de braços", "2 minutos", False)],
+        "B": [("Marcha no lugar", "3 minutos", False), ("Circundução de ombros", "2 minutos", False)],
+        "C": [("Elevação de joelhos", "3 minutos", True), ("Círculos com tornozelos", "2 minutos", False)],
+    },
+    "ar_livre": {
+        "A": [("Trote leve", "5 minutos", True), ("Rotação de braços", "2 minutos", False)],
+        "B": [("Caminhada rápida", "5 minutos", False), ("Circundução de ombros", "2 minutos", False)],
+        "C": [("Trote leve", "5 minutos", True), ("Círculos com tornozelos", "2 minutos", False)],
+    },
+}
+
+LOW_IMPACT_WARMUP = ("Marcha no lugar", "3 minutos", False)
+
+# Exercícios principais: (nome, repetições fixas ou None para usar as do objetivo)
+EXERCISES = {
+    "academia": {
+        "A": [("Supino reto com halteres", None), ("Crucifixo na máquina", None),
+              ("Tríceps na polia", None), ("Tríceps francês com halter", None)],
+        "B": [("Puxada frontal", None), ("Remada baixa na máquina", None),
+              ("Rosca direta com barra", None), ("Rosca martelo", None)],
+        "C": [("Leg press", None), ("Cadeira extensora", None),
+              ("Mesa flexora", None), ("Prancha abdominal", "30 segundos")],
+    },
+    "casa": {
+        "A": [("Flexões no solo", None), ("Mergulho entre cadeiras", None),
+              ("Flexão com pegada fechada", None)],
+        "B": [("Remada curvada com mochila", None), ("Rosca direta com garrafas de água", None),
+              ("Superman no solo", None)],
+        "C": [("Agachamento", None), ("Afundo alternado", "10 (cada perna)"),
+              ("Ponte de glúteos", None), ("Prancha abdominal", "30 segundos")],
+    },
+    "ar_livre": {
+        "A": [("Flexões com mãos no banco da praça", None), ("Mergulho no banco", None),
+              ("Flexões no solo", None)],
+        "B": [("Remada australiana na barra baixa", None), ("Barra fixa (ou negativa assistida)", "5 a 8"),
+              ("Superman no solo", None)],
+        "C": [("Agachamento", None), ("Subida no banco ou degrau", "10 (cada perna)"),
+              ("Afundo caminhando", "10 (cada perna)"), ("Prancha abdominal", "30 segundos")],
+    },
+}
+
+CARDIO_FINISHER_NAME = "Cardio final: {}"
+CARDIO_FINISHERS = {
+    "academia": "Esteira ou bicicleta em ritmo moderado",
+    "casa": "Marcha acelerada no lugar",
+    "ar_livre": "Caminhada rápida",
+}
+
+DAY_TITLES = {
+    "A": "DIA A - PEITO E TRÍCEPS",
+    "B": "DIA B - COSTAS E BÍCEPS",
+    "C": "DIA C - PERNAS E CORE",
+}
+
+COOLDOWNS = {
+    "A": [
+        ("Peitoral", "30 segundos",
+         "Fique de pé ao lado de uma parede, apoie a mão na altura do ombro e gire o tronco para o lado oposto"),
+        ("Tríceps", "30 segundos (cada braço)",
+         "Levante um braço, dobre o cotovelo levando a mão nas costas, use a outra mão para puxar suavemente o cotovelo"),
+    ],
+    "B": [
+        ("Costas", "30 segundos",
+         "Sentado ou em pé, entrelace os dedos à frente do corpo e empurre as palmas para frente arredondando as costas"),
+        ("Bíceps", "30 segundos (cada braço)",
+         "Estenda o braço à frente com a palma para cima, use a outra mão para puxar suavemente os dedos para trás"),
+    ],
+    "C": [
+        ("Quadríceps", "30 segundos (cada perna)",
+         "Em pé, segure um pé atrás levando o calcanhar em direção ao glúteo, mantenha os joelhos alinhados"),
+        ("Posteriores de coxa", "30 segundos (cada perna)",
+         "Sentado no chão, estenda uma perna à frente, dobre a outra, incline o tronco buscando tocar o pé"),
+        ("Panturrilha", "30 segundos (cada perna)",
+         "Apoie as mãos na parede, estenda uma perna atrás mantendo o calcanhar no chão, dobre a perna da frente"),
+    ],
+}
+
+# Volume por objetivo: séries, repetições, descanso e frequência semanal
+WORKOUT_VOLUME = {
+    "emagrecimento": (3, "15", "30 a 45 segundos", "4 vezes por semana, alternando os treinos A, B e C"),
+    "hipertrofia": (4, "8 a 12", "90 segundos", "3 a 4 vezes por semana com descanso entre treinos"),
+    "condicionamento": (3, "12", "60 segundos", "3 vezes por semana com 1 dia de descanso entre treinos"),
+}
+
+DIVISION_NOTES = {
+    "abaixo_do_peso": "volume moderado para favorecer o ganho de massa",
+    "obesidade": "exercícios de baixo impacto para proteger as articulações",
+    "adolescente": "foco na técnica, sem cargas máximas",
+    "idoso": "intensidade moderada, com atenção ao equilíbrio e ao controle dos movimentos",
+}
+
+
+def _build_workout(training_type: str, bmi_band: str, age_band: str, objective: str) -> dict:
+    """Monta o treino estruturado (mesmo formato JSON pedido ao LLM)"""
+    sets, reps, rest, frequency = WORKOUT_VOLUME[objective]
+    low_impact = bmi_band == "obesidade" or age_band == "idoso"
+
+    if age_band != "adulto":
+        sets = min(sets, 3)
+    if age_band == "adolescente" and objective == "hipertrofia":
+        reps = "10 a 15"
+    if age_band == "idoso":
+        rest = "90 segundos"
+
+    notes = [DIVISION_NOTES[band] for band in (bmi_band, age_band) if band in DIVISION_NOTES]
+    division = "ABC - Treino dividido por grupos musculares"
+    if notes:
+        division += f" ({'; '.join(notes)})"
+
+    days = []
+    for day_key, title in DAY_TITLES.items():
+        warmup = []
+        for exercise, duration, high_impact in WARMUPS[training_type][day_key]:
+            if low_impact and high_impact:
+                exercise, duration, _ = LOW_IMPACT_WARMUP
+            warmup.append({"exercise": exercise, "duration": duration})
+
+        main_workout = [
+            {"name": name, "sets": sets, "reps": fixed_reps or reps, "rest": rest}
+            for name, fixed_reps in EXERCISES[training_type][day_key]
+        ]
+        if objective == "emagrecimento":
+            main_workout.append({
+                "name": CARDIO_FINISHER_NAME.format(CARDIO_FINISHERS[training_type]),
+                "sets": 1,
+                "reps": "15 minutos",
+                "rest": "-"
+            })
+
+        cooldown = [
+            {"muscle": muscle, "duration": duration, "instructions": instructions}
+            for muscle, duration, instructions in COOLDOWNS[day_key]
+        ]
+
+        days.append({
+            "title": title,
+            "warmup": warmup,
+            "main_workout": main_workout,
+            "cooldown": cooldown
+        })
+
+    return {"frequency": frequency, "division": division, "days": days}
+
+# ==================== NUTRIÇÃO ====================
+
+# Cardápios base por objetivo: refeição -> [(alimento, quantidade, detalhes)]
+MENUS = {
+    "emagrecimento": {
+        "breakfast": [("Ovos mexidos", "2 unidades", "Proteína de alta qualidade e baixo custo"),
+                      ("Pão francês", "1 unidade", ""),
+                      ("Café com leite", "1 xícara", "Sem açúcar")],
+        "morning_snack": [("Maçã", "1 unidade", "Fibras e saciedade")],
+        "lunch": [("Arroz integral", "3 colheres de sopa", ""),
+                  ("Feijão carioca", "1 concha pequena", "Proteína vegetal e ferro"),
+                  ("Frango grelhado (peito)", "150g", ""),
+                  ("Salada de alface, tomate e cenoura", "à vontade", "Vitaminas e fibras")],
+        "afternoon_snack": [("Iogurte natural", "1 copo (170g)", ""),
+                            ("Aveia em flocos", "1 colher de sopa", "")],
+        "dinner": [("Omelete", "2 ovos", "Com abobrinha e tomate picados"),
+                   ("Legumes cozidos (chuchu, cenoura, vagem)", "1 prato raso", "")],
+        "supper": [("Leite integral", "1 copo (200ml)", "")],
+    },
+    "condicionamento": {
+        "breakfast": [("Ovos mexidos", "2 unidades", "Fonte de proteína de alta qualidade e baixo custo"),
+                      ("Pão francês", "2 unidades", "Carboidrato de energia rápida"),
+                      ("Banana", "1 unidade média", "Rica em potássio e fibras"),
+                      ("Café com leite", "1 xícara", "")],
+        "morning_snack": [("Iogurte natural", "1 copo (200ml)", "Probióticos para saúde intestinal"),
+                          ("Aveia em flocos", "2 colheres de sopa", "Fibras e saciedade")],
+        "lunch": [("Arroz branco", "5 colheres de sopa", "Base energética da refeição"),
+                  ("Feijão carioca", "1 concha média", "Proteína vegetal e ferro"),
+                  ("Frango (coxa ou sobrecoxa)", "150g", "Proteína acessível e saborosa"),
+                  ("Salada de alface e tomate", "à vontade", "Vitaminas e minerais")],
+        "afternoon_snack": [("Pão de forma", "2 fatias", ""),
+                            ("Requeijão", "1 colher de sopa", ""),
+                            ("Mamão", "1 fatia média", "Digestão e vitaminas")],
+        "dinner": [("Macarrão", "1 pegador médio", "Carboidrato de fácil preparo"),
+                   ("Carne moída", "100g", "Proteína econômica"),
+                   ("Cenoura ralada", "2 colheres de sopa", "")],
+        "supper": [("Leite integral", "1 copo (200ml)", "Cálcio e proteína antes de dormir")],
+    },
+    "hipertrofia": {
+        "breakfast": [("Ovos mexidos", "3 unidades", "Proteína de alta qualidade e baixo custo"),
+                      ("Pão francês", "2 unidades", ""),
+                      ("Banana com aveia", "1 banana + 2 colheres de aveia", "Energia para o treino"),
+                      ("Café com leite", "1 xícara", "")],
+        "morning_snack": [("Pão de forma integral", "2 fatias", ""),
+                          ("Sardinha em lata", "1/2 lata", "Proteína e ômega 3 acessíveis")],
+        "lunch": [("Arroz branco", "6 colheres de sopa", ""),
+                  ("Feijão carioca", "2 conchas médias", ""),
+                  ("Frango (coxa ou sobrecoxa)", "200g", ""),
+                  ("Batata doce cozida", "1 unidade média", "Carboidrato de digestão lenta"),
+                  ("Salada de alface e tomate", "à vontade", "")],
+        "afternoon_snack": [("Leite integral", "1 copo (300ml)", ""),
+                            ("Aveia em flocos", "3 colheres de sopa", ""),
+                            ("Banana", "1 unidade", "")],
+        "dinner": [("Macarrão", "1 pegador grande", ""),
+                   ("Carne moída", "150g", "Proteína econômica"),
+                   ("Legumes refogados", "1 porção", "")],
+        "supper": [("Ovos cozidos", "2 unidades", ""),
+                   ("Leite integral", "1 copo (200ml)", "")],
+    },
+}
+
+# Calorias base de cada refeição por objetivo (somam a meta do objetivo)
+MEAL_CALORIES = {
+    "emagrecimento": {"breakfast": 350, "morning_snack": 100, "lunch": 550,
+                      "afternoon_snack": 180, "dinner": 380, "supper": 140},
+    "condicionamento": {"breakfast": 420, "morning_snack": 180, "lunch": 650,
+                        "afternoon_snack": 220, "dinner": 400, "supper": 130},
+    "hipertrofia": {"breakfast": 500, "morning_snack": 250, "lunch": 700,
+                    "afternoon_snack": 320, "dinner": 500, "supper": 230},
+}
+
+CALORIE_ADJUSTMENTS = {
+    "abaixo_do_peso": 200,
+    "normal": 0,
+    "sobrepeso": -100,
+    "obesidade": -200,
+    "adolescente": 200,
+    "adulto": 0,
+    "idoso": -200,
+}
+
+SHOPPING_LIST = [
+    ("Ovos (30 unidades)", 18.00),
+    ("Frango (coxa/sobrecoxa 2kg)", 20.00),
+    ("Carne moída (1kg)", 18.00),
+    ("Arroz (5kg)", 20.00),
+    ("Feijão (1kg)", 8.00),
+    ("Macarrão (1kg)", 5.00),
+    ("Pão francês (14 unidades)", 10.00),
+    ("Leite (3L)", 15.00),
+    ("Iogurte natural (1L)", 8.00),
+    ("Aveia (500g)", 5.00),
+    ("Banana (1 dúzia)", 6.00),
+    ("Alface (2 pés)", 4.00),
+    ("Tomate (1kg)", 6.00),
+    ("Cenoura (500g)", 3.00),
+]
+
+SUBSTITUTIONS = [
+    ("Frango", "Carne de segunda (patinho, músculo)"),
+    ("Banana", "Laranja ou Maçã"),
+    ("Iogurte natural", "Leite com aveia"),
+    ("Carne moída", "Sardinha em lata ou ovos"),
+    ("Arroz branco", "Batata inglesa ou mandioca"),
+]
+
+
+def _build_nutrition(bmi_band: str, age_band: str, objective: str) -> dict:
+    """Monta o plano nutricional estruturado (mesmo formato JSON pedido ao LLM)"""
+    base_calories = MEAL_CALORIES[objective]
+    base_total = sum(base_calories.values())
+    calories = max(1500, base_total + CALORIE_ADJUSTMENTS[bmi_band] + CALORIE_ADJUSTMENTS[age_band])
+    scale = calories / base_total
+
+    meals = {}
+    for meal, items in MENUS[objective].items():
+        meals[meal] = [
+            {"food": food, "quantity": quantity, "details": details}
+            for food, quantity, details in items
+        ]
+        meals[f"{meal}_cal"] = int(round(base_calories[meal] * scale, -1))
+
+    meals["shopping_list"] = [{"item": item, "price": price} for item, price in SHOPPING_LIST]
+    meals["total_cost"] = f"{sum(price for _, price in SHOPPING_LIST):.2f}"
+    meals["substitutions"] = [
+        {"original": original, "alternative": alternative}
+        for original, alternative in SUBSTITUTIONS
+    ]
+
+    protein_share = 0.30 if objective == "hipertrofia" else 0.25
+    return {
+        "calories": calories,
+        "protein": round(calories * protein_share / 4),
+        "carbs": round(calories * (0.75 - protein_share) / 4),
+        "fats": round(calories * 0.25 / 9),
+        "meals": meals
+    }
+
+# ==================== LOOKUP ====================
+
+def _strip_accents(text: str) -> str:
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(ch)
+    )
+
+
+def bmi_band(weight: float, height: int) -> str:
+    bmi = weight / ((height / 100) ** 2)
+    if bmi < 18.5:
+        return "abaixo_do_peso"
+    if bmi < 25:
+        return "normal"
+    if bmi < 30:
+        return "sobrepeso"
+    return "obesidade"
+
+
+def age_band(age: int) -> str:
+    if age < 18:
+        return "adolescente"
+    if age < 60:
+        return "adulto"
+    return "idoso"
+
+
+def objective_keyword(objectives: str) -> str:
+    text = _strip_accents((objectives or "").lower())
+    for objective, keywords in OBJECTIVE_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return objective
+    return "condicionamento"
+
+
+def profile_bucket(profile: Profile) -> tuple[str, str, str, str]:
+    """Chave (tipo de treino, faixa de IMC, faixa etária, objetivo) do perfil"""
+    training_type = profile.training_type if profile.training_type in TRAINING_TYPES else "casa"
+    return (
+        training_type,
+        bmi_band(profile.weight, profile.height),
+        age_band(profile.age),
+        objective_keyword(profile.objectives)
+    )
+
+
+class FallbackLibrary:
+    """Planos padrão pré-renderizados, indexados por profile_bucket"""
+
+    def __init__(self):
+        # bucket -> (plano renderizado com o placeholder, seções, plano estruturado)
+        self._workouts = {}
+        self._nutrition = {}
+
+        nutrition_by_bucket = {}
+        for bmi, age, objective in product(BMI_BANDS, AGE_BANDS, OBJECTIVES):
+            data = _build_nutrition(bmi, age, objective)
+            nutrition_by_bucket[(bmi, age, objective)] = (
+                *render_nutrition_plan(data, PROFILE_NAME_PLACEHOLDER), data
+            )
+
+        for training_type, bmi, age, objective in product(TRAINING_TYPES, BMI_BANDS, AGE_BANDS, OBJECTIVES):
+            key = (training_type, bmi, age, objective)
+            data = _build_workout(training_type, bmi, age, objective)
+            self._workouts[key] = (*render_workout_plan(data, PROFILE_NAME_PLACEHOLDER), data)
+            # Nutrição não depende do local de treino; os textos são compartilhados
+            self._nutrition[key] = nutrition_by_bucket[(bmi, age, objective)]
+
+    def workout(self, profile: Profile) -> tuple[str, list, dict]:
+        """Treino padrão do perfil: (plano completo, seções por dia, plano estruturado)"""
+        content, sections, data = self._workouts[profile_bucket(profile)]
+        return personalize_plan(content, profile.full_name), sections, data
+
+    def nutrition(self, profile: Profile) -> tuple[str, list, dict]:
+        """Plano nutricional padrão do perfil: (plano completo, seções por refeição, plano estruturado)"""
+        content, sections, data = self._nutrition[profile_bucket(profile)]
+        return personalize_plan(content, profile.full_name), sections, data
+
+    def __len__(self) -> int:
+        return len(self._workouts) + len(self._nutrition)
+
+
+# Construída uma vez na importação (startup da API)
+fallback_library = FallbackLibrary()
@@ -2,6 +2,7 @@
 Listas de alimentos permitidos e proibidos
 Garantem que apenas alimentos acessíveis sejam sugeridos
 """
+from text_matcher import MultiPatternMatcher, Match
 
 # ALIMENTOS PERMITIDOS - Baratos e fáceis de encontrar
 ALIMENTOS_PERMITIDOS = {
@@ -163,30 +164,32 @@ ALIMENTOS_PROIBIDOS = [
     "Shakes prontos importados"
 ]
 
+# Textos das listas montados uma vez na importação; entram no prefixo fixo dos prompts
+ALLOWED_FOODS_TEXT = (
+    "ALIMENTOS PERMITIDOS (BARATOS E ACESSÍVEIS):\n\n"
+    "Proteínas:\n" + ", ".join(ALIMENTOS_PERMITIDOS["proteinas"][:10]) + "\n\n"
+    "Carboidratos:\n" + ", ".join(ALIMENTOS_PERMITIDOS["carboidratos"][:15]) + "\n\n"
+    "Vegetais:\n" + ", ".join(ALIMENTOS_PERMITIDOS["vegetais"][:12]) + "\n\n"
+    "Gorduras:\n" + ", ".join(ALIMENTOS_PERMITIDOS["gorduras"])
+)
+
+FORBIDDEN_FOODS_TEXT = "ALIMENTOS PROIBIDOS (CAROS/DIFÍCEIS):\n" + ", ".join(ALIMENTOS_PROIBIDOS[:30])
+
 def get_allowed_foods_text() -> str:
     """Retorna lista formatada de alimentos permitidos"""
-    text = "ALIMENTOS PERMITIDOS (BARATOS E ACESSÍVEIS):\n\n"
-    
-    text += "Proteínas:\n"
-    text += ", ".join(ALIMENTOS_PERMITIDOS["proteinas"][:10])
-    text += "\n\n"
-    
-    text += "Carboidratos:\n"
-    text += ", ".join(ALIMENTOS_PERMITIDOS["carboidratos"][:15])
-    text += "\n\n"
-    
-    text += "Vegetais:\n"
-    text += ", ".join(ALIMENTOS_PERMITIDOS["vegetais"][:12])
-    text += "\n\n"
-    
-    text += "Gorduras:\n"
-    text += ", ".join(ALIMENTOS_PERMITIDOS["gorduras"])
-    
-    return text
+    return ALLOWED_FOODS_TEXT
 
 def get_forbidden_foods_text() -> str:
     """Retorna lista formatada de alimentos proibidos"""
-    return "ALIMENTOS PROIBIDOS (CAROS/DIFÍCEIS):\n" + ", ".join(ALIMENTOS_PROIBIDOS[:30])
+    return FORBIDDEN_FOODS_TEXT
+
+# Compilado uma vez na importação: busca todos os proibidos em uma única passada,
+# ignorando acentos e maiúsculas e respeitando limites de palavra
+FORBIDDEN_FOODS_MATCHER = MultiPatternMatcher(ALIMENTOS_PROIBIDOS)
+
+def find_forbidden_foods(meal_text: str) -> list[Match]:
+    """Retorna cada ocorrência de alimento proibido com sua posição no texto"""
+    return FORBIDDEN_FOODS_MATCHER.findall(meal_text)
 
 def validate_meal_plan(meal_text: str) -> tuple[bool, list]:
     """
@@ -195,11 +198,6 @@ def validate_meal_plan(meal_text: str) -> tuple[bool, list]:
     Returns:
         tuple: (is_valid, forbidden_foods_found)
     """
-    forbidden_found = []
-    meal_lower = meal_text.lower()
-    
-    for forbidden in ALIMENTOS_PROIBIDOS:
-        if forbidden.lower() in meal_lower:
-            forbidden_found.append(forbidden)
+    forbidden_found = FORBIDDEN_FOODS_MATCHER.matched_patterns(meal_text)
     
     return len(forbidden_found) == 0, forbidden_found
@@ -1,34 +1,63 @@
 import os
 import uuid
-import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from models import Profile
-from templates import (
-    get_workout_template, 
-    get_nutrition_template,
-    format_exercise_item,
-    format_food_item,
-    format_warmup_item,
-    format_cooldown_item
-)
-from food_lists import (
-    get_allowed_foods_text,
-    get_forbidden_foods_text,
-    validate_meal_plan,
-    ALIMENTOS_PERMITIDOS
-)
+from templates import render_plan, MEAL_SECTIONS
+from food_lists import validate_meal_plan
+from prompts import PROMPT_TEMPLATES
+from plan_cache import PlanCache, PROFILE_NAME_PLACEHOLDER, personalize_plan
+from llm_limiter import AdmissionController
+from fallback_plans import fallback_library
+from json_extractor import extract_json, JSONExtractionError, REPAIR_CODE_FENCE, REPAIR_TRUNCATED
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+TRAINING_LOCATIONS = {
+    "academia": "academia com equipamentos disponíveis",
+    "casa": "casa sem equipamentos especiais",
+    "ar_livre": "ao ar livre (parques, praças)"
+}
+
+class IncompletePlanError(ValueError):
+    """Raised when a parsed plan is missing required parts (e.g. a truncated response)"""
+
+
+@dataclass
+class GeneratedPlan:
+    """Result of a plan generation"""
+    content: str
+    # Rendered day/meal blocks, in order, when the response was parsed
+    sections: list = field(default_factory=list)
+    # "llm", "cache", "raw" (unparseable response) or "fallback"
+    source: str = "llm"
+    # Structured plan the content was rendered from (None for "raw")
+    data: Optional[dict] = None
+
 class GeminiService:
     def __init__(self):
         self.api_key = os.environ.get("EMERGENT_LLM_KEY")
         if not self.api_key:
             raise ValueError("EMERGENT_LLM_KEY não configurada")
+        
+        self.plan_cache = PlanCache(
+            max_entries=int(os.environ.get("PLAN_CACHE_MAX_ENTRIES", "2048")),
+            ttl_seconds=float(os.environ.get("PLAN_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+        )
+        
+        # Bounds concurrent Gemini sessions; overflow fails fast to the fallback plans
+        self.llm_limiter = AdmissionController(
+            max_concurrent=int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+            max_queue=int(os.environ.get("LLM_MAX_QUEUE", "64")),
+            max_wait_seconds=float(os.environ.get("LLM_QUEUE_TIMEOUT_SECONDS", "5"))
+        )
     
     def _calculate_bmi(self, weight: float, height: int) -> float:
         """Calculate BMI from weight (kg) and height (cm)"""
@@ -40,586 +69,207 @@ class GeminiService:
         Generate personalized workout plan using Gemini with fixed template
         Adapts to training location and current activities
         """
-        bmi = self._calculate_bmi(profile.weight, profile.height)
-        
-        training_location = {
-            "academia": "academia com equipamentos disponíveis",
-            "casa": "casa sem equipamentos especiais",
-            "ar_livre": "ao ar livre (parques, praças)"
-        }.get(profile.training_type, "local escolhido")
-        
-        system_message = """Você é um personal trainer experiente especializado em criar treinos personalizados.
-Você deve retornar APENAS um JSON estruturado com os dados do treino. NÃO adicione texto extra."""
-        
-        prompt = f"""Crie um plano de treino personalizado retornando um JSON estruturado.
-
-PERFIL
-Nome: {profile.full_name}
-Idade: {profile.age} anos
-Peso: {profile.weight} kg  
-Altura: {profile.height} cm
-IMC: {bmi}
-Local: {training_location}
-Objetivos: {profile.objectives}
-Atividades atuais: {profile.current_activities or "Nenhuma"}
-
-INSTRUÇÕES
-- Adapte para {training_location}
-- Considere atividades atuais
-- Inclua aquecimento, treino e alongamento
-- Seja específico nas séries e repetições
-- IMPORTANTE: Para alongamentos, descreva COMO FAZER cada um passo a passo
-- Exemplo alongamento: "Sentado, estenda uma perna à frente, incline o tronco buscando tocar os dedos dos pés"
-
-RETORNE APENAS ESTE JSON (sem texto extra):
-
-{{
-  "frequency": "3 a 4 vezes por semana com descanso entre treinos",
-  "division": "Tipo de divisão (ABC, Upper/Lower, Full Body, etc)",
-  "days": [
-    {{
-      "title": "DIA A - NOME DO GRUPO",
-      "warmup": [
-        {{"exercise": "Nome", "duration": "tempo"}},
-        {{"exercise": "Nome", "duration": "tempo"}}
-      ],
-      "main_workout": [
-        {{
-          "name": "Nome do exercício",
-          "sets": 3,
-          "reps": "12",
-          "rest": "60 segundos"
-        }}
-      ],
-      "cooldown": [
-        {{
-          "muscle": "Nome do músculo",
-          "duration": "30 segundos",
-          "instructions": "Descrição passo a passo de como fazer o alongamento"
-        }}
-      ]
-    }}
-  ]
-}}
-
-Gere 3 dias de treino (A, B, C) adaptados ao perfil. 
-Seja específico e prático.
-LEMBRE-SE: Alongamentos devem ter instruções detalhadas de execução!"""
-
-        try:
-            # Create a unique session for this request
-            session_id = f"workout_{profile.user_id}_{uuid.uuid4()}"
-            
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=system_message
-            ).with_model("gemini", "gemini-2.0-flash")
-            
-            user_message = UserMessage(text=prompt)
-            json_response = await chat.send_message(user_message)
-            
-            # Try to parse JSON response
-            try:
-                # Remove markdown code blocks if present
-                cleaned_response = json_response.strip()
-                if cleaned_response.startswith('```'):
-                    cleaned_response = cleaned_response.split('```')[1]
-                    if cleaned_response.startswith('json'):
-                        cleaned_response = cleaned_response[4:]
-                cleaned_response = cleaned_response.strip()
-                
-                workout_data = json.loads(cleaned_response)
-                
-                # Format days using template
-                formatted_days = []
-                for day in workout_data.get('days', []):
-                    # Format warmup
-                    warmup_text = ""
-                    for i, ex in enumerate(day.get('warmup', []), 1):
-                        warmup_text += format_warmup_item(i, ex['exercise'], ex['duration'])
-                    
-                    # Format main workout
-                    main_text = ""
-                    for i, ex in enumerate(day.get('main_workout', []), 1):
-                        main_text += format_exercise_item(
-                            i, ex['name'], ex['sets'], ex['reps'], ex['rest']
-                        )
-                    
-                    # Format cooldown
-                    cooldown_text = ""
-                    for i, stretch in enumerate(day.get('cooldown', []), 1):
-                        cooldown_text += format_cooldown_item(
-                            i, 
-                            stretch['muscle'], 
-                            stretch['duration'],
-                            stretch.get('instructions', '')
-                        )
-                    
-                    formatted_days.append({
-                        'title': day['title'],
-                        'warmup': warmup_text,
-                        'main_workout': main_text,
-                        'cooldown': cooldown_text
-                    })
-                
-                # Generate final workout using template
-                final_workout = get_workout_template(
-                    profile_name=profile.full_name,
-                    frequency=workout_data.get('frequency', '3 a 4 vezes por semana'),
-                    division=workout_data.get('division', 'Treino ABC'),
-                    days=formatted_days
-                )
-                
-                return final_workout
-                
-            except (json.JSONDecodeError, KeyError) as parse_error:
-                print(f"Erro ao parsear JSON, usando resposta direta: {str(parse_error)}")
-                # Se falhar o parse, retorna resposta direta mas limpa
-                return json_response.replace('**', '').replace('*', '')
-            
-        except Exception as e:
-            print(f"Erro ao gerar treino: {str(e)}")
-            # Fallback plan
-            return self._get_default_workout(profile)
+        plan = await self.generate_plan("workout", profile)
+        return plan.content
     
     async def generate_nutrition(self, profile: Profile) -> str:
         """
         Generate personalized nutrition plan using Gemini
         Focus on affordable and accessible foods
         """
-        bmi = self._calculate_bmi(profile.weight, profile.height)
+        plan = await self.generate_plan("nutrition", profile)
+        return plan.content
+    
+    async def generate_plan(self, kind: str, profile: Profile) -> GeneratedPlan:
+        """Generate a workout or nutrition plan, falling back to a default plan on errors"""
+        label = "treino" if kind == "workout" else "plano nutricional"
         
-        system_message = """Você é um nutricionista especializado em planos alimentares ECONÔMICOS e ACESSÍVEIS.
-Você DEVE usar APENAS alimentos da lista permitida.
-Retorne APENAS um JSON estruturado. NÃO adicione texto extra."""
+        # Versioned and content-addressed: an edited prompt never reuses stale plans
+        prompt_version = PROMPT_TEMPLATES[kind].cache_key
+        cached_plan = self.plan_cache.get(kind, profile, prompt_version)
+        if cached_plan is not None:
+            return GeneratedPlan(
+                content=cached_plan.content,
+                sections=cached_plan.sections,
+                source="cache",
+                data=cached_plan.data
+            )
         
-        # Get allowed and forbidden foods lists
-        allowed_foods = get_allowed_foods_text()
-        forbidden_foods = get_forbidden_foods_text()
+        system_message, prompt = self._build_prompt(kind, profile)
         
-        prompt = f"""Crie um plano nutricional ECONÔMICO e ACESSÍVEL retornando um JSON estruturado.
-
-PERFIL
-Nome: {profile.full_name}
-Idade: {profile.age} anos
-Peso: {profile.weight} kg
-Altura: {profile.height} cm
-IMC: {bmi}
-Objetivos: {profile.objectives}
-Restrições: {profile.dietary_restrictions or "Nenhuma"}
-Atividade: {profile.current_activities or "Sedentário"}
-
-{allowed_foods}
-
-{forbidden_foods}
-
-REGRAS OBRIGATÓRIAS:
-1. Use APENAS alimentos da lista permitida acima
-2. NUNCA use alimentos da lista proibida
-3. Priorize: ovos, frango, carne moída, arroz, feijão, batata, banana, pão, leite, aveia
-4. Evite alimentos caros como: salmão, camarão, quinoa, chia, castanhas caras, superfoods
-5. Preços devem ser realistas (R$ 5 a R$ 20 por item)
-6. Total da semana deve ficar entre R$ 100 e R$ 150
-7. Respeite as restrições alimentares do perfil
-
-IMPORTANTE: Se incluir algum alimento caro ou não permitido, o plano será rejeitado!
-
-RETORNE APENAS ESTE JSON (sem texto extra):
-
-{{
-  "calories": 2000,
-  "protein": 150,
-  "carbs": 200,
-  "fats": 60,
-  "meals": {{
-    "breakfast": [
-      {{"food": "Nome", "quantity": "quantidade", "details": "opcional"}}
-    ],
-    "breakfast_cal": 400,
-    "morning_snack": [
-      {{"food": "Nome", "quantity": "quantidade"}}
-    ],
-    "morning_snack_cal": 150,
-    "lunch": [
-      {{"food": "Nome", "quantity": "quantidade"}}
-    ],
-    "lunch_cal": 600,
-    "afternoon_snack": [
-      {{"food": "Nome", "quantity": "quantidade"}}
-    ],
-    "afternoon_snack_cal": 200,
-    "dinner": [
-      {{"food": "Nome", "quantity": "quantidade"}}
-    ],
-    "dinner_cal": 500,
-    "supper": [
-      {{"food": "Nome", "quantity": "quantidade"}}
-    ],
-    "supper_cal": 150,
-    "shopping_list": [
-      {{"item": "Nome", "price": 10.00}}
-    ],
-    "total_cost": "120.00",
-    "substitutions": [
-      {{"original": "Alimento", "alternative": "Substituto"}}
-    ]
-  }}
-}}
-
-Gere um plano completo com alimentos BARATOS e ACESSÍVEIS."""
-
         try:
-            # Create a unique session for this request
-            session_id = f"nutrition_{profile.user_id}_{uuid.uuid4()}"
-            
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=system_message
-            ).with_model("gemini", "gemini-2.0-flash")
-            
-            user_message = UserMessage(text=prompt)
-            json_response = await chat.send_message(user_message)
+            json_response = await self._send_message(kind, profile, system_message, prompt)
             
             # Try to parse JSON response
             try:
-                # Remove markdown code blocks if present
-                cleaned_response = json_response.strip()
-                if cleaned_response.startswith('```'):
-                    cleaned_response = cleaned_response.split('```')[1]
-                    if cleaned_response.startswith('json'):
-                        cleaned_response = cleaned_response[4:]
-                cleaned_response = cleaned_response.strip()
-                
-                nutrition_data = json.loads(cleaned_response)
-                meals_data = nutrition_data.get('meals', {})
-                
-                # Format meals
-                formatted_meals = {}
-                
-                # Breakfast
-                breakfast_text = ""
-                for i, food in enumerate(meals_data.get('breakfast', []), 1):
-                    breakfast_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['breakfast'] = breakfast_text
-                formatted_meals['breakfast_cal'] = meals_data.get('breakfast_cal', 400)
-                
-                # Morning snack
-                morning_snack_text = ""
-                for i, food in enumerate(meals_data.get('morning_snack', []), 1):
-                    morning_snack_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['morning_snack'] = morning_snack_text
-                formatted_meals['morning_snack_cal'] = meals_data.get('morning_snack_cal', 150)
+                plan_data = self._parse_json_response(json_response)
+                self._check_plan(kind, plan_data)
                 
-                # Lunch
-                lunch_text = ""
-                for i, food in enumerate(meals_data.get('lunch', []), 1):
-                    lunch_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['lunch'] = lunch_text
-                formatted_meals['lunch_cal'] = meals_data.get('lunch_cal', 600)
+                # Render with a name placeholder so the plan can be cached
+                # for identical profiles; the name is swapped in below
+                rendered_plan, sections = render_plan(kind, plan_data, PROFILE_NAME_PLACEHOLDER)
                 
-                # Afternoon snack
-                afternoon_snack_text = ""
-                for i, food in enumerate(meals_data.get('afternoon_snack', []), 1):
-                    afternoon_snack_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['afternoon_snack'] = afternoon_snack_text
-                formatted_meals['afternoon_snack_cal'] = meals_data.get('afternoon_snack_cal', 200)
+                if kind == "nutrition":
+                    # Validate for forbidden foods
+                    is_valid, forbidden_found = validate_meal_plan(rendered_plan)
+                    if not is_valid:
+                        print(f"⚠️ AVISO: Alimentos caros detectados: {forbidden_found}")
+                        print("Gerando plano alternativo com alimentos permitidos...")
+                        # If validation fails, return default plan
+                        content, sections, data = self._get_default_nutrition(profile)
+                        return GeneratedPlan(content=content, sections=sections, source="fallback", data=data)
                 
-                # Dinner
-                dinner_text = ""
-                for i, food in enumerate(meals_data.get('dinner', []), 1):
-                    dinner_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['dinner'] = dinner_text
-                formatted_meals['dinner_cal'] = meals_data.get('dinner_cal', 500)
-                
-                # Supper
-                supper_text = ""
-                for i, food in enumerate(meals_data.get('supper', []), 1):
-                    supper_text += format_food_item(
-                        i, food['food'], food['quantity'], food.get('details', '')
-                    )
-                formatted_meals['supper'] = supper_text
-                formatted_meals['supper_cal'] = meals_data.get('supper_cal', 150)
-                
-                # Shopping list
-                shopping_text = ""
-                for item_data in meals_data.get('shopping_list', []):
-                    shopping_text += f"- {item_data['item']} - Preço aproximado: R$ {item_data['price']:.2f}\n"
-                formatted_meals['shopping_list'] = shopping_text
-                formatted_meals['total_cost'] = meals_data.get('total_cost', '120.00')
-                
-                # Substitutions
-                substitutions_text = ""
-                for sub in meals_data.get('substitutions', []):
-                    substitutions_text += f"- {sub['original']} pode ser substituído por {sub['alternative']}\n"
-                formatted_meals['substitutions'] = substitutions_text
-                
-                # Generate final nutrition plan using template
-                final_nutrition = get_nutrition_template(
-                    profile_name=profile.full_name,
-                    calories=nutrition_data.get('calories', 2000),
-                    protein=nutrition_data.get('protein', 150),
-                    carbs=nutrition_data.get('carbs', 200),
-                    fats=nutrition_data.get('fats', 60),
-                    meals=formatted_meals
+                self.plan_cache.set(kind, profile, prompt_version, rendered_plan, sections, plan_data)
+                return GeneratedPlan(
+                    content=personalize_plan(rendered_plan, profile.full_name),
+                    sections=sections,
+                    data=plan_data
                 )
                 
-                # Validate for forbidden foods
-                is_valid, forbidden_found = validate_meal_plan(final_nutrition)
-                if not is_valid:
-                    print(f"⚠️ AVISO: Alimentos caros detectados: {forbidden_found}")
-                    print("Gerando plano alternativo com alimentos permitidos...")
-                    # If validation fails, return default plan
-                    return self._get_default_nutrition(profile)
+            except IncompletePlanError as incomplete_error:
+                # Never cache or save a partial plan; serve the default one
+                print(f"Plano de {label} incompleto, usando plano padrão: {str(incomplete_error)}")
+                return self._fallback_plan(kind, profile)
                 
-                return final_nutrition
-                
-            except (json.JSONDecodeError, KeyError) as parse_error:
-                print(f"Erro ao parsear JSON de nutrição, usando resposta direta: {str(parse_error)}")
+            except (JSONExtractionError, KeyError) as parse_error:
+                print(f"Erro ao parsear JSON de {label}, usando resposta direta: {str(parse_error)}")
                 # Se falhar o parse, retorna resposta direta mas limpa
-                return json_response.replace('**', '').replace('*', '')
+                return GeneratedPlan(
+                    content=json_response.replace('**', '').replace('*', ''),
+                    source="raw"
+                )
             
         except Exception as e:
-            print(f"Erro ao gerar plano nutricional: {str(e)}")
-            # Fallback plan
-            return self._get_default_nutrition(profile)
+            print(f"Erro ao gerar {label}: {str(e)}")
+            return self._fallback_plan(kind, profile)
     
-    def _get_default_workout(self, profile: Profile) -> str:
-        """Fallback workout plan with detailed stretches"""
-        return f"""PLANO DE TREINO - {profile.full_name.upper()}
-
-FREQUÊNCIA SEMANAL
-3 vezes por semana com 1 dia de descanso entre treinos
-
-DIVISÃO DO TREINO
-ABC - Treino dividido por grupos musculares
-
-DIA A - PEITO E TRÍCEPS
-
-AQUECIMENTO
-1. Polichinelos - 3 minutos
-2. Rotação de braços - 2 minutos
-
-TREINO PRINCIPAL
-1. Flexões no solo
-   Séries: 3, Repetições: 10-15, Descanso: 60 segundos
-
-2. Mergulho entre cadeiras
-   Séries: 3, Repetições: 8-12, Descanso: 60 segundos
-
-ALONGAMENTO
-Mantenha cada posição de forma estática, sem forçar além do limite confortável.
-Respire profundamente durante o alongamento para melhor relaxamento muscular.
-
-1. Alongamento de Peitoral - 30 segundos
-   Como fazer: Fique de pé ao lado de uma parede, apoie a mão na altura do ombro e gire o tronco para o lado oposto
-
-2. Alongamento de Tríceps - 30 segundos (cada braço)
-   Como fazer: Levante um braço, dobre o cotovelo levando a mão nas costas, use a outra mão para puxar suavemente o cotovelo
-
-DIA B - COSTAS E BÍCEPS
-
-AQUECIMENTO
-1. Marcha no lugar - 3 minutos
-2. Circundução de ombros - 2 minutos
-
-TREINO PRINCIPAL
-1. Remada com peso improvisado
-   Séries: 3, Repetições: 12, Descanso: 60 segundos
-
-2. Rosca direta
-   Séries: 3, Repetições: 12, Descanso: 60 segundos
-
-ALONGAMENTO
-Mantenha cada posição de forma estática, sem forçar além do limite confortável.
-Respire profundamente durante o alongamento para melhor relaxamento muscular.
-
-1. Alongamento de Costas - 30 segundos
-   Como fazer: Sentado ou em pé, entrelace os dedos à frente do corpo e empurre as palmas para frente arredondando as costas
-
-2. Alongamento de Bíceps - 30 segundos (cada braço)
-   Como fazer: Estenda o braço à frente com a palma para cima, use a outra mão para puxar suavemente os dedos para trás
-
-DIA C - PERNAS E CORE
-
-AQUECIMENTO
-1. Elevação de joelhos - 3 minutos
-2. Círculos com tornozelos - 2 minutos
-
-TREINO PRINCIPAL
-1. Agachamento
-   Séries: 3, Repetições: 15, Descanso: 60 segundos
-
-2. Afundo alternado
-   Séries: 3, Repetições: 10 (cada perna), Descanso: 60 segundos
-
-3. Prancha abdominal
-   Séries: 3, Repetições: 30 segundos, Descanso: 45 segundos
-
-ALONGAMENTO
-Mantenha cada posição de forma estática, sem forçar além do limite confortável.
-Respire profundamente durante o alongamento para melhor relaxamento muscular.
-
-1. Alongamento de Quadríceps - 30 segundos (cada perna)
-   Como fazer: Em pé, segure um pé atrás levando o calcanhar em direção ao glúteo, mantenha os joelhos alinhados
-
-2. Alongamento de Posteriores de coxa - 30 segundos (cada perna)
-   Como fazer: Sentado no chão, estenda uma perna à frente, dobre a outra, incline o tronco buscando tocar o pé
-
-3. Alongamento de Panturrilha - 30 segundos (cada perna)
-   Como fazer: Apoie as mãos na parede, estenda uma perna atrás mantendo o calcanhar no chão, dobre a perna da frente
-
-DICAS IMPORTANTES
-- Mantenha sempre uma boa postura durante os exercícios
-- Hidrate-se antes, durante e após o treino
-- Respeite os intervalos de descanso entre as séries
-- Aumente a carga progressivamente conforme evolui
-- Em caso de dor, interrompa o exercício
-
-PROGRESSÃO
-Semana 1-2: Foque na execução correta dos movimentos
-Semana 3-4: Aumente levemente a carga mantendo a forma
-Semana 5-6: Reduza o tempo de descanso entre séries
-Semana 7-8: Aumente repetições ou adicione uma série extra
-
-OBSERVAÇÕES DE SEGURANÇA
-- Consulte um profissional antes de iniciar
-- Faça um aquecimento adequado antes de cada treino
-- Não treine o mesmo grupo muscular em dias consecutivos
-- Descanse pelo menos 1 dia por semana
-- Mantenha uma alimentação adequada para seus objetivos"""
+    def _fallback_plan(self, kind: str, profile: Profile) -> GeneratedPlan:
+        """Default plan for the profile, used when the model's plan cannot be used"""
+        if kind == "workout":
+            content, sections, data = self._get_default_workout(profile)
+        else:
+            content, sections, data = self._get_default_nutrition(profile)
+        return GeneratedPlan(content=content, sections=sections, source="fallback", data=data)
     
-    def _get_default_nutrition(self, profile: Profile) -> str:
-        """Fallback nutrition plan with cheap and accessible foods"""
-        return f"""PLANO NUTRICIONAL PERSONALIZADO - {profile.full_name.upper()}
-
-METAS DIÁRIAS
-Calorias totais: 2000 kcal
-Proteínas: 130g
-Carboidratos: 220g
-Gorduras: 55g
-
-CAFÉ DA MANHÃ
-1. Ovos mexidos - 2 unidades
-   Fonte de proteína de alta qualidade e baixo custo
-2. Pão francês - 2 unidades
-   Carboidrato de energia rápida
-3. Banana - 1 unidade média
-   Rica em potássio e fibras
-4. Café com leite - 1 xícara
-
-Total aproximado: 420 kcal
-
-LANCHE DA MANHÃ
-1. Iogurte natural - 1 copo (200ml)
-   Probióticos para saúde intestinal
-2. Aveia em flocos - 2 colheres de sopa
-   Fibras e saciedade
-
-Total aproximado: 180 kcal
-
-ALMOÇO
-1. Arroz branco - 5 colheres de sopa
-   Base energética da refeição
-2. Feijão carioca - 1 concha média
-   Proteína vegetal e ferro
-3. Frango (coxa ou sobrecoxa) - 150g
-   Proteína acessível e saborosa
-4. Salada de alface e tomate - à vontade
-   Vitaminas e minerais
-5. Óleo de soja - 1 colher de sopa
-   Gordura para cozimento
-
-Total aproximado: 650 kcal
-
-LANCHE DA TARDE
-1. Pão de forma - 2 fatias
-   Praticidade e energia
-2. Requeijão - 1 colher de sopa
-   Gordura e sabor
-3. Mamão - 1 fatia média
-   Digestão e vitaminas
-
-Total aproximado: 220 kcal
-
-JANTAR
-1. Macarrão - 1 pegador médio
-   Carboidrato de fácil preparo
-2. Carne moída - 100g
-   Proteína econômica
-3. Molho de tomate caseiro - à vontade
-   Tempero natural
-4. Cenoura ralada - 2 colheres de sopa
-   Vitamina A e cor
-
-Total aproximado: 480 kcal
-
-CEIA
-1. Leite integral - 1 copo (200ml)
-   Cálcio e proteína antes de dormir
-
-Total aproximado: 120 kcal
-
-LISTA DE COMPRAS SEMANAL
-- Ovos (30 unidades) - Preço aproximado: R$ 18,00
-- Frango (coxa/sobrecoxa 2kg) - Preço aproximado: R$ 20,00
-- Carne moída (1kg) - Preço aproximado: R$ 18,00
-- Arroz (5kg) - Preço aproximado: R$ 20,00
-- Feijão (1kg) - Preço aproximado: R$ 8,00
-- Macarrão (1kg) - Preço aproximado: R$ 5,00
-- Pão francês (14 unidades) - Preço aproximado: R$ 10,00
-- Pão de forma (1 pacote) - Preço aproximado: R$ 6,00
-- Leite (3L) - Preço aproximado: R$ 15,00
-- Iogurte natural (1L) - Preço aproximado: R$ 8,00
-- Aveia (500g) - Preço aproximado: R$ 5,00
-- Banana (1 dúzia) - Preço aproximado: R$ 6,00
-- Mamão (1 unidade) - Preço aproximado: R$ 5,00
-- Alface (2 pés) - Preço aproximado: R$ 4,00
-- Tomate (1kg) - Preço aproximado: R$ 6,00
-- Cenoura (500g) - Preço aproximado: R$ 3,00
-- Óleo de soja (900ml) - Preço aproximado: R$ 7,00
-- Requeijão (200g) - Preço aproximado: R$ 6,00
-
-Total estimado da semana: R$ 140,00
-
-DICAS DE PREPARO
-- Prepare as refeições com antecedência nos finais de semana
-- Use temperos naturais (alho, cebola, cheiro verde) para dar mais sabor
-- Cozinhe em maior quantidade e congele porções
-- Prefira alimentos grelhados, assados ou cozidos
-- Lave bem frutas e verduras antes de consumir
-
-DICAS DE ECONOMIA
-- Compre frutas e verduras da estação (mais baratas)
-- Escolha coxa/sobrecoxa de frango ao invés de peito
-- Compre ovos em caixas de 30 unidades (mais barato)
-- Prefira pão francês ao invés de pães especiais
-- Faça uma lista antes de ir ao mercado e evite compras por impulso
-
-SUBSTITUIÇÕES POSSÍVEIS
-- Frango pode ser substituído por Carne de segunda (patinho, músculo)
-- Banana pode ser substituída por Laranja ou Maçã
-- Mamão pode ser substituído por Melancia
-- Iogurte natural pode ser substituído por Leite com aveia
-- Requeijão pode ser substituído por Queijo minas
-
-OBSERVAÇÕES IMPORTANTES
-- Beba pelo menos 2 litros de água por dia
-- Evite alimentos ultraprocessados e fast food
-- Mastigue bem os alimentos para melhor digestão
-- Faça as refeições em horários regulares
-- Consulte um nutricionista para orientações específicas e personalizadas"""
+    async def stream_plan(
+        self,
+        kind: str,
+        profile: Profile,
+        heartbeat_seconds: float = 1.0
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Generate a plan while yielding (event, data) pairs for streaming clients
+        
+        Emits "progress" right away and then every heartbeat while the model is
+        generating, one "section" per rendered day or meal once the response is
+        parsed, and finally "plan" with the complete text, its source and the
+        structured plan.
+        """
+        started = time.monotonic()
+        yield "progress", {"stage": "started", "elapsed": 0.0}
+        
+        task = asyncio.ensure_future(self.generate_plan(kind, profile))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=heartbeat_seconds)
+                if done:
+                    break
+                yield "progress", {
+                    "stage": "generating",
+                    "elapsed": round(time.monotonic() - started, 1)
+                }
+        finally:
+            # The client went away before the plan was ready
+            if not task.done():
+                task.cancel()
+        
+        plan = task.result()
+        for index, (title, text) in enumerate(plan.sections):
+            yield "section", {"index": index, "title": title, "content": text}
+        yield "plan", {"content": plan.content, "source": plan.source, "data": plan.data}
+    
+    async def _send_message(self, kind: str, profile: Profile, system_message: str, prompt: str) -> str:
+        """
+        Send the prompt in a new Gemini chat session and return the raw response
+        
+        Raises LLMOverloadedError when admission control rejects the call.
+        """
+        # Create a unique session for this request
+        session_id = f"{kind}_{profile.user_id}_{uuid.uuid4()}"
+        
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model("gemini", "gemini-2.0-flash")
+        
+        user_message = UserMessage(text=prompt)
+        async with self.llm_limiter.slot():
+            return await chat.send_message(user_message)
+    
+    def _parse_json_response(self, json_response: str) -> dict:
+        """
+        Parse the JSON body of a model response
+        
+        Raises JSONExtractionError when no object can be recovered, and
+        IncompletePlanError when the response was cut off.
+        """
+        data, repairs = extract_json(json_response)
+        if REPAIR_TRUNCATED in repairs:
+            # The closed-up object parses, but whatever came after the cut is missing
+            raise IncompletePlanError("resposta truncada")
+        # A code fence is the model's usual output, not worth reporting
+        repairs = [repair for repair in repairs if repair != REPAIR_CODE_FENCE]
+        if repairs:
+            print(f"JSON da resposta reparado: {', '.join(repairs)}")
+        return data
+    
+    @staticmethod
+    def _check_plan(kind: str, plan_data: dict) -> None:
+        """Raise IncompletePlanError unless every day/meal the templates render is present"""
+        if kind == "workout":
+            days = plan_data.get("days")
+            if not isinstance(days, list) or not days:
+                raise IncompletePlanError("plano sem dias de treino")
+            for index, day in enumerate(days):
+                if not isinstance(day, dict) or not day.get("main_workout"):
+                    raise IncompletePlanError(f"dia {index + 1} sem treino principal")
+        else:
+            meals = plan_data.get("meals")
+            if not isinstance(meals, dict):
+                raise IncompletePlanError("plano sem refeições")
+            for meal, _title in MEAL_SECTIONS:
+                if not meals.get(meal):
+                    raise IncompletePlanError(f"refeição ausente: {meal}")
+    
+    def _build_prompt(self, kind: str, profile: Profile) -> tuple[str, str]:
+        """
+        Build the (system message, prompt) pair; only the profile suffix varies per request
+        
+        The user's name is left out on purpose: it does not change the plan,
+        and cached plans are shared by every profile with the same fingerprint,
+        so the model must never see (and echo) it. The templates add it on render.
+        """
+        return PROMPT_TEMPLATES[kind].render({
+            "age": profile.age,
+            "weight": profile.weight,
+            "height": profile.height,
+            "bmi": self._calculate_bmi(profile.weight, profile.height),
+            "training_location": TRAINING_LOCATIONS.get(profile.training_type, "local escolhido"),
+            "objectives": profile.objectives,
+            "dietary_restrictions": profile.dietary_restrictions or "Nenhuma",
+            "current_activities": profile.current_activities or (
+                "Nenhuma" if kind == "workout" else "Sedentário"
+            )
+        })
+    
+    def _get_default_workout(self, profile: Profile) -> tuple[str, list, dict]:
+        """Fallback workout plan for the profile's bucket, with detailed stretches"""
+        return fallback_library.workout(profile)
+    
+    def _get_default_nutrition(self, profile: Profile) -> tuple[str, list, dict]:
+        """Fallback nutrition plan for the profile's bucket, with cheap and accessible foods"""
+        return fallback_library.nutrition(profile)
 
 # Create singleton instance
 gemini_service = GeminiService()
@@ -0,0 +1,161 @@
+"""
+Background queue for plan generation jobs
+
+The HTTP request only records a job and enqueues it; a bounded pool of
+async workers runs the generation. Job state lives in the `generation_jobs`
+collection so any API worker can answer a status poll.
+
+The in-process queue does not survive a restart (redeploys, serverless
+cold stops), so jobs left `queued` or `running` past a deadline are marked
+`failed`: when polled and by a sweep at startup. Clients then stop polling
+and can submit again.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from models import GenerationJob, SuggestionResponse
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[GenerationJob], Awaitable[SuggestionResponse]]
+
+
+class JobQueueFullError(Exception):
+    """Raised when the pending job queue is at capacity"""
+
+
+class GenerationJobQueue:
+    def __init__(self, worker_count: int = 4, max_pending: int = 100, stale_after_seconds: float = 600):
+        self.worker_count = worker_count
+        self.max_pending = max_pending
+        # Jobs unfinished and untouched for this long are considered lost
+        self.stale_after_seconds = stale_after_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._handler: Optional[JobHandler] = None
+        self._get_db = None
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def start(self, get_db: Callable, handler: JobHandler) -> None:
+        """Spawn the worker pool on the running event loop"""
+        if self._workers:
+            return
+        self._get_db = get_db
+        self._handler = handler
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.worker_count)
+        ]
+        logger.info(f"Fila de geração iniciada com {self.worker_count} workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs stay `queued` in the database"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, db, user_id: str, suggestion_type: str) -> GenerationJob:
+        """Record a new job and enqueue it, raising JobQueueFullError when saturated"""
+        if self._queue is None:
+            raise RuntimeError("Fila de geração não iniciada")
+        if self._queue.full():
+            raise JobQueueFullError()
+
+        job = GenerationJob(user_id=user_id, type=suggestion_type)
+        await db.generation_jobs.insert_one(job.model_dump())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await self._update(db, job.id, status="failed", error="Fila de geração cheia")
+            raise JobQueueFullError()
+        return job
+
+    async def get(self, db, job_id: str, user_id: str) -> Optional[GenerationJob]:
+        """Load a job owned by user_id"""
+        job_doc = await db.generation_jobs.find_one(
+            {"id": job_id, "user_id": user_id},
+            {"_id": 0}
+        )
+        if not job_doc:
+            return None
+        
+        if job_doc["status"] in ("queued", "running") and job_doc["updated_at"] < self._stale_cutoff():
+            # Only if nothing touched it meanwhile
+            result = await db.generation_jobs.update_one(
+                {"id": job_id, "status": job_doc["status"], "updated_at": job_doc["updated_at"]},
+                {"$set": self._expired_fields()}
+            )
+            if result.modified_count:
+                self.expired += 1
+                job_doc.update(self._expired_fields())
+            else:
+                job_doc = await db.generation_jobs.find_one({"id": job_id}, {"_id": 0})
+        return GenerationJob(**job_doc)
+
+    async def expire_stale(self, db) -> int:
+        """Mark every job lost to a restart as failed; returns how many"""
+        result = await db.generation_jobs.update_many(
+            {"status": {"$in": ["queued", "running"]}, "updated_at": {"$lt": self._stale_cutoff()}},
+            {"$set": self._expired_fields()}
+        )
+        if result.modified_count:
+            logger.warning(f"{result.modified_count} jobs de geração abandonados marcados como falhos")
+        self.expired += result.modified_count
+        return result.modified_count
+
+    def _stale_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.stale_after_seconds)
+
+    @staticmethod
+    def _expired_fields() -> dict:
+        return {
+            "status": "failed",
+            "error": "Job interrompido. Tente novamente.",
+            "updated_at": datetime.utcnow()
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            db = self._get_db()
+            try:
+                # Skip jobs already expired while they waited in the queue
+                started = await db.generation_jobs.update_one(
+                    {"id": job.id, "status": "queued"},
+                    {"$set": {"status": "running", "updated_at": datetime.utcnow()}}
+                )
+                if not started.modified_count:
+                    continue
+                result = await self._handler(job)
+                await self._update(db, job.id, status="completed", result=result.model_dump())
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job de geração {job.id} falhou: {str(e)}")
+                self.failed += 1
+                try:
+                    await self._update(db, job.id, status="failed", error="Erro ao gerar sugestão")
+                except Exception as update_error:
+                    logger.error(f"Erro ao atualizar job {job.id}: {str(update_error)}")
+            finally:
+                self._queue.task_done()
+
+    async def _update(self, db, job_id: str, **fields) -> None:
+        fields["updated_at"] = datetime.utcnow()
+        await db.generation_jobs.update_one({"id": job_id}, {"$set": fields})
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired
+        }
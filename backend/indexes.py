@@ -0,0 +1,160 @@
+"""
+MongoDB index bootstrap
+
+Declares every index the API's queries rely on and creates the missing ones
+at startup. Creation is idempotent (existing indexes with the same name and
+spec are left alone) and the result is compared with what the server
+reports, so indexes that differ from the declaration or are not declared at
+all show up as drift instead of failing startup.
+"""
+import logging
+from typing import NamedTuple, Optional
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Generation jobs are only polled shortly after submission
+GENERATION_JOB_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    name: str
+    keys: tuple          # ((field, direction), ...)
+    unique: bool = False
+    # TTL index: documents expire this many seconds after the indexed date
+    expire_after_seconds: Optional[int] = None
+
+
+INDEX_SPECS = (
+    # Login and every authenticated request
+    IndexSpec("users", "users_email_unique", (("email", ASCENDING),), unique=True),
+    IndexSpec("users", "users_id_unique", (("id", ASCENDING),), unique=True),
+    # One profile per user
+    IndexSpec("profiles", "profiles_user_id_unique", (("user_id", ASCENDING),), unique=True),
+    # History pages (newest first, keyset on created_at + id), filtered by
+    # type or not, and fetch/delete by id
+    IndexSpec(
+        "suggestions", "suggestions_user_type_created_id",
+        (("user_id", ASCENDING), ("type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING))
+    ),
+    IndexSpec(
+        "suggestions", "suggestions_user_created_id",
+        (("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING))
+    ),
+    IndexSpec("suggestions", "suggestions_id_unique", (("id", ASCENDING),), unique=True),
+    # Checkout status polling and webhook processing
+    IndexSpec(
+        "payment_transactions", "payment_transactions_session_id_unique",
+        (("session_id", ASCENDING),), unique=True
+    ),
+    IndexSpec("subscriptions", "subscriptions_user_id_unique", (("user_id", ASCENDING),), unique=True),
+    IndexSpec("generation_jobs", "generation_jobs_id_unique", (("id", ASCENDING),), unique=True),
+    # Jobs keep the full plan text in `result`; drop them once nobody polls anymore
+    IndexSpec(
+        "generation_jobs", "generation_jobs_created_at_ttl",
+        (("created_at", ASCENDING),), expire_after_seconds=GENERATION_JOB_TTL_SECONDS
+    ),
+    # Account deletion
+    IndexSpec("payment_transactions", "payment_transactions_user_id", (("user_id", ASCENDING),)),
+    IndexSpec("generation_jobs", "generation_jobs_user_id", (("user_id", ASCENDING),)),
+    # Token revocation: lookup by key, incremental refresh by revoked_at,
+    # and removal once the revoked tokens would have expired anyway
+    IndexSpec("revoked_tokens", "revoked_tokens_key_unique", (("key", ASCENDING),), unique=True),
+    IndexSpec("revoked_tokens", "revoked_tokens_revoked_at", (("revoked_at", ASCENDING),)),
+    IndexSpec(
+        "revoked_tokens", "revoked_tokens_expires_at_ttl",
+        (("expires_at", ASCENDING),), expire_after_seconds=0
+    ),
+)
+
+
+def _describe(keys) -> str:
+    return ", ".join(f"{field} {int(direction)}" for field, direction in keys)
+
+
+class IndexManager:
+    def __init__(self, specs=INDEX_SPECS):
+        self.specs = specs
+        self.last_report: dict = {}
+
+    async def ensure_indexes(self, db) -> dict:
+        """
+        Create missing indexes and report drift
+
+        Conflicts and failed builds (e.g. duplicates under a
+        unique index) do not raise; they are logged and listed in the report.
+        """
+        report = {"created": [], "existing": [], "conflicts": [], "failed": [], "unexpected": []}
+
+        by_collection: dict[str, list[IndexSpec]] = {}
+        for spec in self.specs:
+            by_collection.setdefault(spec.collection, []).append(spec)
+
+        for collection_name, specs in by_collection.items():
+            collection = db[collection_name]
+            try:
+                existing = await collection.index_information()
+            except OperationFailure:
+                # Collection does not exist yet
+                existing = {}
+
+            for spec in specs:
+                label = f"{collection_name}.{spec.name}"
+                current = existing.get(spec.name)
+                if current is not None:
+                    same_keys = [tuple(key) for key in current["key"]] == [tuple(key) for key in spec.keys]
+                    same_options = (
+                        bool(current.get("unique")) == spec.unique
+                        and current.get("expireAfterSeconds") == spec.expire_after_seconds
+                    )
+                    if same_keys and same_options:
+                        report["existing"].append(label)
+                    else:
+                        report["conflicts"].append(
+                            f"{label}: esperado ({_describe(spec.keys)}, unique={spec.unique}, "
+                            f"ttl={spec.expire_after_seconds}), "
+                            f"encontrado ({_describe(current['key'])}, unique={bool(current.get('unique'))}, "
+                            f"ttl={current.get('expireAfterSeconds')})"
+                        )
+                    continue
+
+                options = {"name": spec.name, "unique": spec.unique}
+                if spec.expire_after_seconds is not None:
+                    options["expireAfterSeconds"] = spec.expire_after_seconds
+                try:
+                    await collection.create_index(list(spec.keys), **options)
+                    report["created"].append(label)
+                except OperationFailure as e:
+                    # Same keys under another name, or duplicates under a unique index
+                    report["failed"].append(f"{label}: {e.details.get('errmsg', str(e)) if e.details else str(e)}")
+
+            declared = {spec.name for spec in specs}
+            for name in existing:
+                if name != "_id_" and name not in declared:
+                    report["unexpected"].append(f"{collection_name}.{name}")
+
+        if report["created"]:
+            logger.info(f"Índices criados: {', '.join(report['created'])}")
+        for key in ("conflicts", "failed", "unexpected"):
+            for entry in report[key]:
+                logger.warning(f"Divergência de índice ({key}): {entry}")
+
+        self.last_report = report
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "declared": len(self.specs),
+            **{key: len(value) for key, value in self.last_report.items()},
+            "drift": [
+                entry
+                for key in ("conflicts", "failed", "unexpected")
+                for entry in self.last_report.get(key, [])
+            ]
+        }
+
+
+# Create singleton instance
+index_manager = IndexManager()
@@ -0,0 +1,217 @@
+"""
+Extraction of the JSON object embedded in an LLM response
+
+Model output is rarely a bare JSON document: it may be wrapped in a markdown
+code fence, surrounded by prose, carry trailing commas or be cut off when the
+model hits its token limit. The extractor finds the first balanced JSON
+object that parses, scanning the text once unless a brace in the prose
+opens a candidate that has to be dropped, repairs what it can and reports
+which repairs were applied.
+"""
+import re
+import json
+from typing import NamedTuple, Optional
+
+# Characters that matter to the structure scan; everything else is skipped
+_STRUCTURAL_RE = re.compile(r'[{}\[\]",\\]')
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_FENCE_OPEN_RE = re.compile(r"```[A-Za-z]*\s*$")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Repair names reported in ExtractionResult.repairs
+REPAIR_CODE_FENCE = "code_fence"
+REPAIR_LEADING_TEXT = "leading_text"
+REPAIR_TRAILING_TEXT = "trailing_text"
+REPAIR_TRAILING_COMMA = "trailing_comma"
+REPAIR_TRUNCATED = "truncated"
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no JSON object can be recovered from a response"""
+
+
+class ExtractionResult(NamedTuple):
+    data: dict
+    # Repairs applied to get a parseable object, in the order detected
+    repairs: tuple
+
+
+class StreamingJSONExtractor:
+    """
+    Incremental extractor for the first JSON object in a stream of chunks
+
+    feed() scans only the new chunk and returns the result as soon as the
+    object closes; finish() recovers a truncated object by cutting it back to
+    the last complete value and closing the open containers. Candidates that
+    do not parse are skipped in favour of the next "{".
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scanned = 0
+        self._start = -1
+        self._end = -1
+        self._in_string = False
+        self._escaped_at = -1
+        # Closing characters for the open containers, innermost last
+        self._closers = ""
+        # Last position where the object can be cut and closed with the
+        # closers open at that point
+        self._safe_cut = -1
+        self._safe_closers = ""
+        self._trailing_comma = False
+        self._result: Optional[ExtractionResult] = None
+        # Why the last dropped candidate failed, reported if none parses
+        self._last_error: Optional[JSONExtractionError] = None
+
+    @property
+    def done(self) -> bool:
+        return self._result is not None
+
+    def feed(self, chunk: str) -> Optional[ExtractionResult]:
+        """Add a chunk of the response; returns the result once the object is complete"""
+        if self._result is not None:
+            return self._result
+
+        self._buffer += chunk
+        return self._scan()
+
+    def _scan(self) -> Optional[ExtractionResult]:
+        # A candidate that does not parse (e.g. a brace in the prose before
+        # the JSON) is dropped and the scan restarts at the next "{"
+        while True:
+            if self._start == -1:
+                start = self._buffer.find("{", self._scanned)
+                if start == -1:
+                    self._scanned = len(self._buffer)
+                    return None
+                self._start = start
+                self._scanned = start
+
+            try:
+                return self._scan_candidate()
+            except JSONExtractionError as e:
+                self._last_error = e
+                self._restart()
+
+    def _scan_candidate(self) -> Optional[ExtractionResult]:
+        buffer = self._buffer
+        for match in _STRUCTURAL_RE.finditer(buffer, self._scanned):
+            pos = match.start()
+            char = match.group()
+
+            if self._in_string:
+                if char == "\\":
+                    if self._escaped_at != pos:
+                        self._escaped_at = pos + 1
+                elif char == '"' and self._escaped_at != pos:
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._closers += _CLOSERS[char]
+                self._mark_safe(pos + 1)
+            elif char == ",":
+                self._mark_safe(pos)
+            elif char in "}]":
+                if not self._closers or self._closers[-1] != char:
+                    raise JSONExtractionError(f"'{char}' inesperado na posição {pos}")
+                self._closers = self._closers[:-1]
+                if not self._closers:
+                    self._result = self._parse(buffer[self._start:pos + 1], truncated=False)
+                    self._end = pos + 1
+                    self._scanned = self._end
+                    return self._result
+                self._mark_safe(pos + 1)
+
+        self._scanned = len(buffer)
+        return None
+
+    def _restart(self) -> None:
+        """Drop the current candidate and scan again from just after its "{" """
+        self._scanned = self._start + 1
+        self._start = -1
+        self._in_string = False
+        self._escaped_at = -1
+        self._closers = ""
+        self._safe_cut = -1
+        self._safe_closers = ""
+
+    def finish(self) -> ExtractionResult:
+        """Return the extracted object, repairing it if the stream ended early"""
+        while self._result is None:
+            if self._start == -1:
+                raise self._last_error or JSONExtractionError("Nenhum objeto JSON encontrado na resposta")
+            if self._safe_cut == -1:
+                self._last_error = JSONExtractionError("Objeto JSON incompleto")
+            else:
+                candidate = self._buffer[self._start:self._safe_cut] + self._safe_closers[::-1]
+                try:
+                    self._result = self._parse(candidate, truncated=True)
+                    self._end = len(self._buffer)
+                    break
+                except JSONExtractionError as e:
+                    self._last_error = e
+            # Unrecoverable from this "{"; a later one may still hold the object
+            self._restart()
+            self._scan()
+        return self._result
+
+    def _mark_safe(self, pos: int) -> None:
+        self._safe_cut = pos
+        self._safe_closers = self._closers
+
+    def _parse(self, candidate: str, truncated: bool) -> ExtractionResult:
+        repairs = self._prefix_repairs()
+        if truncated:
+            repairs.append(REPAIR_TRUNCATED)
+
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            cleaned = _TRAILING_COMMA_RE.sub(r"\1", candidate)
+            if cleaned == candidate:
+                raise JSONExtractionError("JSON inválido na resposta")
+            try:
+                data = json.loads(cleaned)
+            except json.JSONDecodeError as e:
+                raise JSONExtractionError(f"JSON inválido na resposta: {e.msg}") from e
+            repairs.append(REPAIR_TRAILING_COMMA)
+
+        return ExtractionResult(data, tuple(repairs))
+
+    def _prefix_repairs(self) -> list:
+        prefix = self._buffer[:self._start].rstrip()
+        fence = _FENCE_OPEN_RE.search(prefix)
+        repairs = []
+        if fence:
+            repairs.append(REPAIR_CODE_FENCE)
+            prefix = prefix[:fence.start()]
+        if prefix.strip():
+            repairs.append(REPAIR_LEADING_TEXT)
+        return repairs
+
+    def trailing_text(self) -> str:
+        """Text after the object (without a closing code fence)"""
+        if self._end == -1:
+            return ""
+        suffix = self._buffer[self._end:].strip()
+        if suffix.startswith("```"):
+            suffix = suffix[3:].strip()
+        return suffix
+
+
+def extract_json(text: str) -> ExtractionResult:
+    """
+    Extract the first JSON object from a complete model response
+
+    Raises JSONExtractionError when no object can be recovered.
+    """
+    extractor = StreamingJSONExtractor()
+    result = extractor.feed(text) or extractor.finish()
+    if extractor.trailing_text():
+        result = ExtractionResult(result.data, result.repairs + (REPAIR_TRAILING_TEXT,))
+    return result
@@ -0,0 +1,84 @@
+"""
+Admission control for outbound LLM calls
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call is not admitted (queue full or wait deadline passed)"""
+
+
+class AdmissionController:
+    """
+    Caps concurrent LLM calls with a bounded wait queue
+
+    Up to `max_concurrent` calls run at once and at most `max_queue` more may
+    wait for a slot, each for no longer than `max_wait_seconds`. Anything
+    beyond that fails fast with LLMOverloadedError so the caller can serve a
+    fallback instead of piling onto a rate-limited upstream.
+    """
+
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 64, max_wait_seconds: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth_seen = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seen = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one LLM concurrency slot for the duration of the block"""
+        started = time.monotonic()
+
+        if self._semaphore.locked():
+            if self.queue_depth >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise LLMOverloadedError("Fila de chamadas ao LLM cheia")
+
+            self.queue_depth += 1
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.queue_depth)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait_seconds)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise LLMOverloadedError("Tempo de espera por chamada ao LLM esgotado")
+            finally:
+                self.queue_depth -= 1
+        else:
+            await self._semaphore.acquire()
+
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait_seconds,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds_seen": round(self.max_wait_seen, 4)
+        }
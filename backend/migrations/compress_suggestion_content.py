@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Backfill: compress the content of suggestions stored as plain text
+
+Processes documents in batches (one bulk write per batch) and can be
+stopped and re-run at any time; only documents that still have a plain
+`content` string are touched.
+
+Usage: python backend/migrations/compress_suggestion_content.py [--batch-size N] [--codec zlib|zstd] [--dry-run]
+"""
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+
+from database import Database, get_database
+from content_codec import ContentCodec
+
+
+async def backfill(batch_size: int, codec_name: str, dry_run: bool) -> None:
+    db = get_database()
+    codec = ContentCodec(codec_name=codec_name)
+    query = {"content": {"$type": "string"}}
+
+    total = await db.suggestions.count_documents(query)
+    print(f"Sugestões com conteúdo sem compressão: {total}")
+    if dry_run or total == 0:
+        return
+
+    compressed = skipped = bytes_before = bytes_after = 0
+    last_id = None
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+        docs = await (
+            db.suggestions.find(batch_query, {"_id": 1, "content": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        operations = []
+        for doc in docs:
+            original = doc["content"]
+            encoded = codec.encode({"content": original})
+            if "content_z" not in encoded:
+                # Below the size threshold: stays plain
+                skipped += 1
+                continue
+            bytes_before += len(original.encode("utf-8"))
+            bytes_after += len(encoded["content_z"])
+            operations.append(UpdateOne(
+                # Only if the content was not changed since it was read
+                {"_id": doc["_id"], "content": original},
+                {
+                    "$set": {"content_z": encoded["content_z"], "content_codec": encoded["content_codec"]},
+                    "$unset": {"content": ""}
+                }
+            ))
+
+        if operations:
+            result = await db.suggestions.bulk_write(operations, ordered=False)
+            compressed += result.modified_count
+        print(f"  {compressed} comprimidas, {skipped} mantidas em texto")
+
+    if bytes_before:
+        print(f"Conteúdo: {bytes_before / 1024:.0f} KB -> {bytes_after / 1024:.0f} KB "
+              f"({bytes_after / bytes_before:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--codec", default="zlib", choices=["zlib", "zstd"])
+    parser.add_argument("--dry-run", action="store_true", help="Only count the documents to migrate")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(backfill(args.batch_size, args.codec, args.dry_run))
+    finally:
+        asyncio.run(Database.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,11 @@ class User(BaseModel):
     password_hash: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class CurrentUser(BaseModel):
+    """Authenticated user as resolved from the access token"""
+    id: str
+    email: str
+
 # ==================== PROFILE MODELS ====================
 
 class Profile(BaseModel):
@@ -114,14 +119,51 @@ class Suggestion(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     type: Literal["workout", "nutrition"]
-    content: str
+    # Rendered text; not stored when the structured plan is (rendered on read)
+    content: Optional[str] = None
+    # Structured plan the content is rendered from, with the template version
+    # and profile name it was rendered with
+    plan: Optional[dict] = None
+    template_version: Optional[str] = None
+    profile_name: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class SuggestionResponse(BaseModel):
     id: str
     type: str
-    content: str
+    # content for view=text; plan instead for view=structured (when stored)
+    content: Optional[str] = None
+    plan: Optional[dict] = None
+    created_at: datetime
+
+class SuggestionSummary(BaseModel):
+    id: str
+    type: str
+    created_at: datetime
+
+class SuggestionPage(BaseModel):
+    items: List[SuggestionSummary]
+    # Opaque cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class GenerationJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    type: Literal["workout", "nutrition"]
+    status: Literal["queued", "running", "completed", "failed"] = "queued"
+    result: Optional[SuggestionResponse] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class GenerationJobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    result: Optional[SuggestionResponse] = None
+    error: Optional[str] = None
     created_at: datetime
+    updated_at: datetime
 
 # ==================== TOKEN MODELS ====================
 
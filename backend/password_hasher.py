@@ -0,0 +1,181 @@
+"""
+Password hashing off the event loop
+
+pbkdf2_sha256 costs tens of milliseconds of CPU per call. Run inline in a
+handler it stalls every other request on the worker, so hashes and
+verifications go to a dedicated, bounded executor instead. Threads are
+enough for pbkdf2 (hashlib releases the GIL while it runs); a process pool
+can be selected for schemes that hold the GIL.
+
+Hashes made with a deprecated scheme or weaker settings than configured are
+upgraded after a successful login: the new hash is computed in the
+background and stored only if the old one is still in place.
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+from auth import pwd_context, password_needs_update
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when too many hash/verify calls are already waiting"""
+
+
+# Module-level so a process pool can pickle them
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class _LatencyStats:
+    def __init__(self, samples: int = 1024):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._recent = deque(maxlen=samples)
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self._recent.append(seconds)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> Optional[float]:
+            if len(recent) < 20:
+                return None
+            return round(recent[min(int(len(recent) * p), len(recent) - 1)] * 1000, 2)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_seconds * 1000, 2)
+        }
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int = 2, max_pending: int = 64, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._rehash_tasks: set[asyncio.Task] = set()
+        self.in_flight = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.rehash_skipped = 0
+        self.rehash_failed = 0
+        self.latency = {"hash": _LatencyStats(), "verify": _LatencyStats()}
+
+    def _ensure_executor(self) -> None:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+            # Calls running plus calls queued behind them
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+
+    async def _run(self, operation: str, func, *args):
+        self._ensure_executor()
+        if self._slots.locked():
+            self.rejected += 1
+            raise PasswordHasherBusyError("Muitas verificações de senha em andamento")
+
+        started = time.perf_counter()
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            finally:
+                self.in_flight -= 1
+                # Includes the wait for a free worker
+                self.latency[operation].record(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self._run("verify", _verify, password, hashed_password)
+
+    @staticmethod
+    def needs_update(hashed_password: str) -> bool:
+        """Whether a verified hash should be replaced (cheap: only parses the hash)"""
+        return password_needs_update(hashed_password)
+
+    def schedule_rehash(self, password: str, persist: Callable[[str], Awaitable[bool]]) -> None:
+        """
+        Hash the password again with the current settings, off the request path
+
+        `persist` stores the new hash and returns False when the stored hash
+        changed in the meantime (e.g. a password change), which keeps it.
+        """
+        task = asyncio.create_task(self._rehash(password, persist))
+        self._rehash_tasks.add(task)
+        task.add_done_callback(self._rehash_tasks.discard)
+
+    async def _rehash(self, password: str, persist: Callable[[str], Awaitable[bool]]) -> None:
+        try:
+            new_hash = await self.hash(password)
+            if await persist(new_hash):
+                self.rehashed += 1
+            else:
+                self.rehash_skipped += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Busy executor included: the next login tries again
+            self.rehash_failed += 1
+            logger.warning(f"Erro ao atualizar hash de senha: {str(e)}")
+
+    def shutdown(self) -> None:
+        for task in self._rehash_tasks:
+            task.cancel()
+        self._rehash_tasks.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def stats(self) -> dict:
+        return {
+            "executor": "process" if self.use_processes else "thread",
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "rehash": {
+                "pending": len(self._rehash_tasks),
+                "rehashed": self.rehashed,
+                "skipped": self.rehash_skipped,
+                "failed": self.rehash_failed
+            },
+            **{operation: stats.snapshot() for operation, stats in self.latency.items()}
+        }
+
+
+# Create singleton instance
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+    max_pending=int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", "64")),
+    use_processes=os.environ.get("PASSWORD_HASH_EXECUTOR", "thread") == "process"
+)
@@ -0,0 +1,93 @@
+"""
+Cache of generated plans keyed by a fingerprint of the profile fields that feed the prompt
+"""
+import json
+import hashlib
+from typing import NamedTuple, Optional
+from cache import TTLCache
+from models import Profile
+
+# Rendered plans are cached with this marker instead of the user's name, so a
+# single entry can be shared by every profile with the same fingerprint.
+# It is uppercase-invariant because the templates call `.upper()` on the name.
+PROFILE_NAME_PLACEHOLDER = "{{FITLIFE_PROFILE_NAME}}"
+
+# Profile fields that influence the generated plan (full_name is swapped in on read)
+FINGERPRINT_FIELDS = (
+    "age",
+    "weight",
+    "height",
+    "objectives",
+    "dietary_restrictions",
+    "training_type",
+    "current_activities"
+)
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float):
+        return round(value, 1)
+    return value
+
+
+def personalize_plan(rendered_plan: str, full_name: str) -> str:
+    """Swap the profile name placeholder for the user's name"""
+    return rendered_plan.replace(PROFILE_NAME_PLACEHOLDER, full_name.upper())
+
+
+def profile_fingerprint(kind: str, profile: Profile, prompt_version: str) -> str:
+    """Stable hash of the plan kind, prompt version and normalized profile fields"""
+    payload = {
+        "kind": kind,
+        "prompt_version": prompt_version,
+        **{field: _normalize(getattr(profile, field)) for field in FINGERPRINT_FIELDS}
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CachedPlan(NamedTuple):
+    content: str
+    # (title, text) blocks of the rendered plan; they never contain the name
+    sections: list
+    # Structured plan the content was rendered from
+    data: Optional[dict]
+
+
+class PlanCache:
+    """LRU + TTL cache of rendered plans with the profile name left as a placeholder"""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 6 * 60 * 60):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, kind: str, profile: Profile, prompt_version: str) -> Optional[CachedPlan]:
+        """Return the cached plan personalized for profile, or None on a miss"""
+        cached = self._cache.get(profile_fingerprint(kind, profile, prompt_version))
+        if cached is None:
+            return None
+        return cached._replace(content=personalize_plan(cached.content, profile.full_name))
+
+    def set(
+        self,
+        kind: str,
+        profile: Profile,
+        prompt_version: str,
+        rendered_plan: str,
+        sections: list = (),
+        plan_data: Optional[dict] = None
+    ) -> None:
+        """Store a plan rendered with PROFILE_NAME_PLACEHOLDER as the profile name"""
+        self._cache.set(
+            profile_fingerprint(kind, profile, prompt_version),
+            CachedPlan(rendered_plan, list(sections), plan_data)
+        )
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,48 @@
+"""
+Render-on-read for suggestions stored as structured plans
+
+Suggestions generated from a parsed plan store the plan itself (plus the
+profile name it was generated for) instead of the rendered text. The text
+is rendered when read, with the current templates, and memoized by
+(suggestion id, template version): a template change takes effect on the
+next read without regenerating anything.
+"""
+import os
+from typing import Optional
+from cache import TTLCache
+from templates import TEMPLATE_VERSION, render_plan
+
+
+class PlanRenderer:
+    def __init__(self, max_entries: int = 2048, ttl_seconds: Optional[float] = 60 * 60):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def render(self, suggestion_doc: dict) -> str:
+        """Rendered text of a suggestion document holding a structured plan"""
+        key = (suggestion_doc["id"], TEMPLATE_VERSION)
+        content = self._cache.get(key)
+        if content is None:
+            content, _sections = render_plan(
+                suggestion_doc["type"],
+                suggestion_doc["plan"],
+                suggestion_doc.get("profile_name") or ""
+            )
+            self._cache.set(key, content)
+        return content
+
+    def prime(self, suggestion_id: str, content: str) -> None:
+        """Record text already rendered with the current templates (e.g. right after generation)"""
+        self._cache.set((suggestion_id, TEMPLATE_VERSION), content)
+
+    def forget(self, suggestion_id: str) -> None:
+        self._cache.delete((suggestion_id, TEMPLATE_VERSION))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Create singleton instance
+plan_renderer = PlanRenderer(
+    max_entries=int(os.environ.get("RENDER_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.environ.get("RENDER_CACHE_TTL_SECONDS", str(60 * 60)))
+)
@@ -0,0 +1,130 @@
+"""
+Connection pool metrics for the MongoDB client
+
+A CMAP (connection monitoring and pooling) listener registered on the
+client. It counts connections opened and closed, checkouts in progress
+and failed, and how long operations waited for a connection, so pool
+exhaustion shows up in the metrics before it shows up as timeouts. Counts
+are tracked per server but reported summed, without server addresses.
+
+Events are published from the driver's worker threads, hence the lock.
+"""
+import time
+import threading
+from collections import deque
+from pymongo import monitoring
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def __init__(self, wait_samples: int = 1024):
+        self._lock = threading.Lock()
+        # Checkout start times; started and checked out run on the same thread
+        self._local = threading.local()
+        self.pools: dict[str, dict] = {}
+        self.pool_clears = 0
+        self.checkouts = 0
+        self.checkout_failures: dict[str, int] = {}
+        self.total_wait_seconds = 0.0
+        self.max_wait_seen = 0.0
+        self._recent_waits = deque(maxlen=wait_samples)
+
+    def _pool(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = {
+                "open": 0, "checked_out": 0, "max_checked_out": 0,
+                "created": 0, "closed": 0, "max_pool_size": None
+            }
+        return pool
+
+    # Pool lifecycle
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)["max_pool_size"] = event.options.get("maxPoolSize")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    # Connection churn
+
+    def connection_created(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open"] += 1
+            pool["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open"] = max(pool["open"] - 1, 0)
+            pool["closed"] += 1
+
+    # Checkouts
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        waited = time.monotonic() - started if started is not None else 0.0
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] += 1
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+            self._recent_waits.append(waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] = max(pool["checked_out"] - 1, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            p95 = recent[int(len(recent) * 0.95) - 1] if len(recent) >= 20 else None
+            return {
+                "pools": len(self.pools),
+                **{
+                    field: sum(pool[field] for pool in self.pools.values())
+                    for field in ("open", "checked_out", "created", "closed")
+                },
+                # Peak per server (peaks on different servers need not coincide)
+                "max_checked_out": max((pool["max_checked_out"] for pool in self.pools.values()), default=0),
+                "max_pool_size": next(
+                    (pool["max_pool_size"] for pool in self.pools.values() if pool["max_pool_size"] is not None),
+                    None
+                ),
+                "pool_clears": self.pool_clears,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p95_wait_ms": round(p95 * 1000, 3) if p95 is not None else None,
+                "max_wait_ms": round(self.max_wait_seen * 1000, 3)
+            }
+
+
+# Create singleton instance
+pool_metrics = PoolMetricsListener()
@@ -0,0 +1,155 @@
+"""
+Read-through cache of user profiles
+
+Profiles are read on every generation and profile view but rarely change,
+so repository.load_profile serves them from here and the profile writes
+(update, account deletion) invalidate the entry. The default backend keeps
+the validated Profile objects in process; a shared backend (Redis, when the
+optional `redis` package is installed) keeps every API worker consistent
+after a write.
+"""
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+from cache import TTLCache
+from models import Profile
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCacheBackend(ABC):
+    """Storage behind ProfileCache"""
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[Profile]:
+        ...
+
+    @abstractmethod
+    async def set(self, user_id: str, profile: Profile) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, user_id: str) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InProcessProfileBackend(ProfileCacheBackend):
+    """LRU with TTL in this process; other workers see a write after the TTL at most"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get(self, user_id: str) -> Optional[Profile]:
+        return self._cache.get(user_id)
+
+    async def set(self, user_id: str, profile: Profile) -> None:
+        self._cache.set(user_id, profile)
+
+    async def delete(self, user_id: str) -> None:
+        self._cache.delete(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class RedisProfileBackend(ProfileCacheBackend):
+    """Profiles shared by every API worker, stored as JSON under `prefix + user_id`"""
+
+    def __init__(self, url: str, ttl_seconds: float = 300, prefix: str = "fitlife:profile:"):
+        if redis_asyncio is None:
+            raise RuntimeError("Pacote redis não instalado")
+        self._client = redis_asyncio.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, user_id: str) -> Optional[Profile]:
+        raw = await self._client.get(self.prefix + user_id)
+        return Profile.model_validate_json(raw) if raw is not None else None
+
+    async def set(self, user_id: str, profile: Profile) -> None:
+        await self._client.set(self.prefix + user_id, profile.model_dump_json(), ex=int(self.ttl_seconds))
+
+    async def delete(self, user_id: str) -> None:
+        await self._client.delete(self.prefix + user_id)
+
+    def stats(self) -> dict:
+        return {"ttl_seconds": self.ttl_seconds}
+
+
+class ProfileCache:
+    def __init__(self, backend: ProfileCacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def get(self, user_id: str) -> Optional[Profile]:
+        # The cache is an optimization: backend errors fall through to MongoDB
+        try:
+            profile = await self.backend.get(user_id)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Erro ao ler perfil do cache: {str(e)}")
+            profile = None
+        if profile is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return profile
+
+    async def set(self, user_id: str, profile: Profile) -> None:
+        try:
+            await self.backend.set(user_id, profile)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Erro ao gravar perfil no cache: {str(e)}")
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop the cached profile after it was changed or deleted"""
+        self.invalidations += 1
+        try:
+            await self.backend.delete(user_id)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Erro ao invalidar perfil no cache: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            **self.backend.stats()
+        }
+
+
+def _backend_from_env() -> ProfileCacheBackend:
+    ttl_seconds = float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "60"))
+    if os.environ.get("PROFILE_CACHE_BACKEND", "memory") == "redis":
+        if redis_asyncio is None:
+            logger.warning("redis não instalado; usando cache de perfis em memória")
+        elif not os.environ.get("REDIS_URL"):
+            logger.warning("REDIS_URL não definida; usando cache de perfis em memória")
+        else:
+            return RedisProfileBackend(os.environ["REDIS_URL"], ttl_seconds=ttl_seconds)
+    return InProcessProfileBackend(
+        max_entries=int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "10000")),
+        ttl_seconds=ttl_seconds
+    )
+
+
+# Create singleton instance
+profile_cache = ProfileCache(_backend_from_env())
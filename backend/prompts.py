@@ -0,0 +1,187 @@
+"""
+Versioned prompt templates for plan generation
+
+Each prompt is split into a static prefix (instructions, food lists, output
+schema), assembled once at import and byte-identical across requests, and a
+short profile-specific suffix that is the only part rendered per request.
+Keeping the shared part first lets provider-side prompt caching reuse it.
+"""
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from food_lists import ALLOWED_FOODS_TEXT, FORBIDDEN_FOODS_TEXT
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt version: system message, static prefix and per-request suffix
+
+    Hashable and compared by content. `cache_key` combines the version with
+    a digest of the text, so a prompt edited without a version bump still
+    stops matching previously cached plans.
+    """
+    kind: str
+    version: str
+    system_message: str
+    prefix: str
+    # str.format-style template over the values given to render()
+    suffix: str
+
+    @cached_property
+    def digest(self) -> str:
+        content = "\0".join((self.system_message, self.prefix, self.suffix))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+    @cached_property
+    def cache_key(self) -> str:
+        return f"{self.version}:{self.digest}"
+
+    def render(self, values: dict) -> tuple[str, str]:
+        """Return the (system message, prompt) pair for one request"""
+        return self.system_message, self.prefix + self.suffix.format_map(values)
+
+
+WORKOUT_PROMPT = PromptTemplate(
+    kind="workout",
+    version="workout-v3",
+    system_message="""Você é um personal trainer experiente especializado em criar treinos personalizados.
+Você deve retornar APENAS um JSON estruturado com os dados do treino. NÃO adicione texto extra.""",
+    prefix="""Crie um plano de treino personalizado retornando um JSON estruturado.
+
+INSTRUÇÕES
+- Adapte para o local de treino informado no perfil
+- Considere atividades atuais
+- Inclua aquecimento, treino e alongamento
+- Seja específico nas séries e repetições
+- IMPORTANTE: Para alongamentos, descreva COMO FAZER cada um passo a passo
+- Exemplo alongamento: "Sentado, estenda uma perna à frente, incline o tronco buscando tocar os dedos dos pés"
+
+RETORNE APENAS ESTE JSON (sem texto extra):
+
+{
+  "frequency": "3 a 4 vezes por semana com descanso entre treinos",
+  "division": "Tipo de divisão (ABC, Upper/Lower, Full Body, etc)",
+  "days": [
+    {
+      "title": "DIA A - NOME DO GRUPO",
+      "warmup": [
+        {"exercise": "Nome", "duration": "tempo"},
+        {"exercise": "Nome", "duration": "tempo"}
+      ],
+      "main_workout": [
+        {
+          "name": "Nome do exercício",
+          "sets": 3,
+          "reps": "12",
+          "rest": "60 segundos"
+        }
+      ],
+      "cooldown": [
+        {
+          "muscle": "Nome do músculo",
+          "duration": "30 segundos",
+          "instructions": "Descrição passo a passo de como fazer o alongamento"
+        }
+      ]
+    }
+  ]
+}
+
+Gere 3 dias de treino (A, B, C) adaptados ao perfil abaixo.
+Seja específico e prático.
+LEMBRE-SE: Alongamentos devem ter instruções detalhadas de execução!
+
+""",
+    suffix="""PERFIL
+Idade: {age} anos
+Peso: {weight} kg
+Altura: {height} cm
+IMC: {bmi}
+Local: {training_location}
+Objetivos: {objectives}
+Atividades atuais: {current_activities}"""
+)
+
+NUTRITION_PROMPT = PromptTemplate(
+    kind="nutrition",
+    version="nutrition-v3",
+    system_message="""Você é um nutricionista especializado em planos alimentares ECONÔMICOS e ACESSÍVEIS.
+Você DEVE usar APENAS alimentos da lista permitida.
+Retorne APENAS um JSON estruturado. NÃO adicione texto extra.""",
+    prefix=f"""Crie um plano nutricional ECONÔMICO e ACESSÍVEL retornando um JSON estruturado.
+
+{ALLOWED_FOODS_TEXT}
+
+{FORBIDDEN_FOODS_TEXT}
+
+REGRAS OBRIGATÓRIAS:
+1. Use APENAS alimentos da lista permitida acima
+2. NUNCA use alimentos da lista proibida
+3. Priorize: ovos, frango, carne moída, arroz, feijão, batata, banana, pão, leite, aveia
+4. Evite alimentos caros como: salmão, camarão, quinoa, chia, castanhas caras, superfoods
+5. Preços devem ser realistas (R$ 5 a R$ 20 por item)
+6. Total da semana deve ficar entre R$ 100 e R$ 150
+7. Respeite as restrições alimentares do perfil
+
+IMPORTANTE: Se incluir algum alimento caro ou não permitido, o plano será rejeitado!
+
+RETORNE APENAS ESTE JSON (sem texto extra):
+
+{{
+  "calories": 2000,
+  "protein": 150,
+  "carbs": 200,
+  "fats": 60,
+  "meals": {{
+    "breakfast": [
+      {{"food": "Nome", "quantity": "quantidade", "details": "opcional"}}
+    ],
+    "breakfast_cal": 400,
+    "morning_snack": [
+      {{"food": "Nome", "quantity": "quantidade"}}
+    ],
+    "morning_snack_cal": 150,
+    "lunch": [
+      {{"food": "Nome", "quantity": "quantidade"}}
+    ],
+    "lunch_cal": 600,
+    "afternoon_snack": [
+      {{"food": "Nome", "quantity": "quantidade"}}
+    ],
+    "afternoon_snack_cal": 200,
+    "dinner": [
+      {{"food": "Nome", "quantity": "quantidade"}}
+    ],
+    "dinner_cal": 500,
+    "supper": [
+      {{"food": "Nome", "quantity": "quantidade"}}
+    ],
+    "supper_cal": 150,
+    "shopping_list": [
+      {{"item": "Nome", "price": 10.00}}
+    ],
+    "total_cost": "120.00",
+    "substitutions": [
+      {{"original": "Alimento", "alternative": "Substituto"}}
+    ]
+  }}
+}}
+
+Gere um plano completo com alimentos BARATOS e ACESSÍVEIS para o perfil abaixo.
+
+""",
+    suffix="""PERFIL
+Idade: {age} anos
+Peso: {weight} kg
+Altura: {height} cm
+IMC: {bmi}
+Objetivos: {objectives}
+Restrições: {dietary_restrictions}
+Atividade: {current_activities}"""
+)
+
+PROMPT_TEMPLATES = {
+    "workout": WORKOUT_PROMPT,
+    "nutrition": NUTRITION_PROMPT
+}
@@ -0,0 +1,313 @@
+"""
+Rate limiting for the expensive endpoints
+
+Login and registration burn pbkdf2 CPU and the generation endpoints spend
+LLM budget, so they are throttled per client IP and per authenticated user
+before reaching the handlers. Limits use GCRA (generic cell rate
+algorithm): a sliding window that keeps a single timestamp per key (the
+theoretical arrival time of the next request) instead of a log of
+requests. Rejected requests get 429 with Retry-After.
+
+State lives in a pluggable backend: in process by default, or Redis (when
+the optional `redis` package is installed) so every API worker shares the
+same budget.
+"""
+import json
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from auth import decode_token
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class Rate(NamedTuple):
+    limit: int
+    period_seconds: float
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period_seconds / self.limit
+
+
+def parse_rate(value: str) -> Rate:
+    """Parse "<requests>/<seconds>", e.g. "10/60" """
+    limit, period = value.split("/")
+    rate = Rate(int(limit), float(period))
+    if rate.limit <= 0 or rate.period_seconds <= 0:
+        raise ValueError(f"Limite inválido: {value}")
+    return rate
+
+
+class RateLimitRule(NamedTuple):
+    method: str
+    path: str
+    # "ip" or "user"
+    scope: str
+    rate: Rate
+
+
+class RateLimitBackend(ABC):
+    """Storage of the GCRA state, one timestamp per key"""
+
+    @abstractmethod
+    async def acquire_many(self, limits: list[tuple[str, Rate]]) -> float:
+        """
+        Count one request against every (key, rate) pair, all or nothing
+
+        Returns 0 when every limit allows the request, which is then counted
+        against all of them; otherwise the longest wait, counting nothing.
+        """
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        """Count one request against a single limit"""
+        return await self.acquire_many([(key, rate)])
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process state; each API worker enforces the limits on its own"""
+
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> theoretical arrival time, least recently used first
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+    async def acquire_many(self, limits: list[tuple[str, Rate]]) -> float:
+        now = self._clock()
+        new_tats = []
+        retry_after = 0.0
+        for key, rate in limits:
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + rate.emission_interval
+            # A full window's worth of requests may be ahead of schedule
+            retry_after = max(retry_after, new_tat - rate.period_seconds - now)
+            new_tats.append((key, new_tat))
+        if retry_after > 0:
+            return retry_after
+
+        for key, new_tat in new_tats:
+            self._tat[key] = new_tat
+            self._tat.move_to_end(key)
+        while len(self._tat) > self.max_keys:
+            # The least recently seen key; usually its window has long passed
+            self._tat.popitem(last=False)
+        return 0.0
+
+    def stats(self) -> dict:
+        return {"keys": len(self._tat), "max_keys": self.max_keys}
+
+
+# Same algorithm as InMemoryRateLimitBackend, atomically on the Redis server;
+# ARGV holds an (emission interval, period) pair per key
+_GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local new_tats = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    new_tats[i] = tat + interval
+    retry_after = math.max(retry_after, new_tats[i] - period - now)
+end
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000))
+end
+return '0'
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """State shared by every API worker"""
+
+    def __init__(self, url: str, prefix: str = "fitlife:ratelimit:"):
+        if redis_asyncio is None:
+            raise RuntimeError("Pacote redis não instalado")
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_GCRA_SCRIPT)
+        self.prefix = prefix
+
+    async def acquire_many(self, limits: list[tuple[str, Rate]]) -> float:
+        result = await self._script(
+            keys=[self.prefix + key for key, _ in limits],
+            args=[value for _, rate in limits for value in (rate.emission_interval, rate.period_seconds)]
+        )
+        return float(result)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, rules: list[RateLimitRule], trusted_proxy_hops: int = 0):
+        self.backend = backend
+        # Reverse proxies in front of the API that append to X-Forwarded-For;
+        # 0 ignores the header (the client controls whatever it sends)
+        self.trusted_proxy_hops = trusted_proxy_hops
+        self._rules: dict[tuple[str, str], list[RateLimitRule]] = {}
+        for rule in rules:
+            self._rules.setdefault((rule.method, rule.path), []).append(rule)
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def rules_for(self, method: str, path: str) -> list[RateLimitRule]:
+        return self._rules.get((method, path), [])
+
+    def client_ip(self, scope: dict, headers: dict) -> str:
+        if self.trusted_proxy_hops > 0:
+            forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+            entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+            # Each trusted proxy appends the address it received the request
+            # from, so the client is that many entries from the right; anything
+            # further left was sent by the client and can be spoofed
+            if len(entries) >= self.trusted_proxy_hops:
+                return entries[-self.trusted_proxy_hops]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def user_id(headers: dict) -> Optional[str]:
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            payload = decode_token(token)
+        except Exception:
+            # The handler rejects the token; the IP limit still applies
+            return None
+        return payload.get("uid") or payload.get("sub")
+
+    async def check(self, scope: dict) -> float:
+        """Seconds the request must wait (0 when it may proceed)"""
+        rules = self.rules_for(scope["method"], scope["path"])
+        if not rules:
+            return 0.0
+
+        headers = dict(scope.get("headers") or [])
+        limits = []
+        for rule in rules:
+            if rule.scope == "user":
+                subject = self.user_id(headers)
+                if subject is None:
+                    continue
+            else:
+                subject = self.client_ip(scope, headers)
+            limits.append((f"{rule.scope}:{subject}:{rule.method}:{rule.path}", rule.rate))
+
+        retry_after = 0.0
+        if limits:
+            # All rules at once, so a request one rule rejects spends no
+            # budget under the others
+            try:
+                retry_after = await self.backend.acquire_many(limits)
+            except Exception as e:
+                # Fail open: a backend outage must not take the API down
+                self.errors += 1
+                logger.error(f"Erro no rate limiter: {str(e)}")
+
+        if retry_after > 0:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "rules": sum(len(rules) for rules in self._rules.values()),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            **self.backend.stats()
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 for requests over a RateLimiter's limits"""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        retry_after = await self.limiter.check(scope)
+        if retry_after <= 0:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps(
+            {"detail": "Muitas requisições. Tente novamente em instantes."},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                # Whole seconds, rounded up
+                (b"retry-after", str(int(-(-retry_after // 1))).encode("ascii")),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+GENERATION_ENDPOINTS = (
+    ("POST", "/api/suggestions/workout"),
+    ("POST", "/api/suggestions/nutrition"),
+    ("POST", "/api/suggestions/jobs"),
+    ("GET", "/api/suggestions/workout/stream"),
+    ("GET", "/api/suggestions/nutrition/stream"),
+)
+
+
+def rate_limiter_from_env(environ) -> RateLimiter:
+    """Build the API's RateLimiter from RATE_LIMIT_* settings"""
+    login = parse_rate(environ.get("RATE_LIMIT_LOGIN", "10/60"))
+    register = parse_rate(environ.get("RATE_LIMIT_REGISTER", "5/3600"))
+    generation_user = parse_rate(environ.get("RATE_LIMIT_GENERATION_USER", "20/3600"))
+    generation_ip = parse_rate(environ.get("RATE_LIMIT_GENERATION_IP", "60/3600"))
+
+    rules = [
+        RateLimitRule("POST", "/api/auth/login", "ip", login),
+        RateLimitRule("POST", "/api/auth/register", "ip", register),
+    ]
+    for method, path in GENERATION_ENDPOINTS:
+        rules.append(RateLimitRule(method, path, "user", generation_user))
+        rules.append(RateLimitRule(method, path, "ip", generation_ip))
+
+    backend: Optional[RateLimitBackend] = None
+    if environ.get("RATE_LIMIT_BACKEND", "memory") == "redis":
+        if redis_asyncio is None:
+            logger.warning("redis não instalado; usando rate limiter em memória")
+        elif not environ.get("REDIS_URL"):
+            logger.warning("REDIS_URL não definida; usando rate limiter em memória")
+        else:
+            backend = RedisRateLimitBackend(environ["REDIS_URL"])
+    if backend is None:
+        backend = InMemoryRateLimitBackend(max_keys=int(environ.get("RATE_LIMIT_MAX_KEYS", "100000")))
+
+    # RATE_LIMIT_TRUST_FORWARDED_FOR=true is shorthand for a single proxy
+    default_hops = "1" if environ.get("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true" else "0"
+    return RateLimiter(
+        backend,
+        rules,
+        trusted_proxy_hops=int(environ.get("RATE_LIMIT_TRUSTED_PROXY_HOPS", default_hops))
+    )
@@ -0,0 +1,194 @@
+"""
+Data access for users, profiles and suggestions
+
+Documents read here were written through the same Pydantic models, so
+they are rebuilt with model_construct instead of being validated again.
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+from models import CurrentUser, Profile, Suggestion
+from content_codec import content_codec
+from plan_renderer import plan_renderer
+from profile_cache import profile_cache
+
+PROFILE_PROJECTION = {"_id": 0}
+
+
+def profile_from_doc(profile_doc: dict) -> Profile:
+    """Build a Profile from a stored document without re-validating it"""
+    return Profile.model_construct(**profile_doc)
+
+
+async def load_profile(db, user_id: str) -> Optional[Profile]:
+    """Load the profile of a user by id, through the profile cache"""
+    profile = await profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    profile_doc = await db.profiles.find_one({"user_id": user_id}, PROFILE_PROJECTION)
+    if not profile_doc:
+        return None
+    profile = profile_from_doc(profile_doc)
+    await profile_cache.set(user_id, profile)
+    return profile
+
+
+async def update_profile_fields(db, user_id: str, update_data: dict) -> Optional[Profile]:
+    """Apply a partial update to a user's profile and return the updated profile"""
+    if not update_data:
+        return await load_profile(db, user_id)
+
+    # Write and read back in one atomic round trip
+    profile_doc = await db.profiles.find_one_and_update(
+        {"user_id": user_id},
+        {"$set": update_data},
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    await profile_cache.invalidate(user_id)
+    return profile_from_doc(profile_doc) if profile_doc else None
+
+
+async def update_password_hash(db, user_id: str, old_hash: str, new_hash: str) -> bool:
+    """Replace a user's password hash only if it is still old_hash (compare-and-set)"""
+    result = await db.users.update_one(
+        {"id": user_id, "password_hash": old_hash},
+        {"$set": {"password_hash": new_hash}}
+    )
+    return result.modified_count == 1
+
+
+async def load_user_with_profile(db, email: str) -> tuple[Optional[CurrentUser], Optional[Profile]]:
+    """Load a user by email together with their profile in one round trip"""
+    pipeline = [
+        {"$match": {"email": email}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "id": 1, "email": 1}},
+        # Equality lookup, served by the profiles.user_id index
+        {"$lookup": {
+            "from": "profiles",
+            "localField": "id",
+            "foreignField": "user_id",
+            "as": "profile"
+        }},
+        {"$project": {"id": 1, "email": 1, "profile": {"$arrayElemAt": ["$profile", 0]}}},
+        {"$unset": "profile._id"}
+    ]
+    docs = await db.users.aggregate(pipeline).to_list(length=1)
+    if not docs:
+        return None, None
+
+    user_doc = docs[0]
+    current_user = CurrentUser.model_construct(id=user_doc["id"], email=user_doc["email"])
+    profile_doc = user_doc.get("profile")
+    if not profile_doc:
+        return current_user, None
+    profile = profile_from_doc(profile_doc)
+    await profile_cache.set(current_user.id, profile)
+    return current_user, profile
+
+
+# ==================== SUGGESTIONS ====================
+
+SUGGESTION_PROJECTION = {"_id": 0, "user_id": 0}
+SUGGESTION_SUMMARY_PROJECTION = {
+    "_id": 0, "user_id": 0, "content": 0, "content_z": 0, "content_codec": 0,
+    "plan": 0, "template_version": 0, "profile_name": 0
+}
+
+
+def encode_cursor(created_at: datetime, suggestion_id: str) -> str:
+    """Opaque keyset cursor pointing just past (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), suggestion_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, suggestion_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(suggestion_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def materialize_suggestion(suggestion_doc: dict, view: str = "text") -> dict:
+    """
+    Fill in what the requested view returns, in place; returns the document
+
+    "text" returns `content`, rendered from the structured plan when that is
+    what was stored. "structured" returns `plan` without rendering it; only
+    suggestions stored as text (no plan) carry `content` in that view.
+    """
+    content_codec.decode(suggestion_doc)
+    plan = suggestion_doc.get("plan")
+    if view == "structured" and plan is not None:
+        suggestion_doc.pop("content", None)
+    else:
+        if plan is not None and suggestion_doc.get("content") is None:
+            suggestion_doc["content"] = plan_renderer.render(suggestion_doc)
+        suggestion_doc.pop("plan", None)
+    return suggestion_doc
+
+
+async def list_suggestions(
+    db,
+    user_id: str,
+    suggestion_type: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of summaries of a user's suggestions, newest first
+
+    Pages are cut on (created_at, id) so each one is an index range scan of
+    `limit` documents regardless of how deep it is. Summaries leave the
+    (compressed) content out, so nothing is decompressed or rendered for a
+    list; load_suggestion returns one suggestion with its content. Returns
+    the summaries and the cursor of the next page (None on the last one).
+    """
+    query = {"user_id": user_id}
+    if suggestion_type is not None:
+        query["type"] = suggestion_type
+    if cursor is not None:
+        created_at, suggestion_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": suggestion_id}}
+        ]
+
+    docs = await (
+        db.suggestions.find(query, SUGGESTION_SUMMARY_PROJECTION)
+        .sort([("created_at", -1), ("id", -1)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+    return docs, next_cursor
+
+
+async def insert_suggestion(db, suggestion: Suggestion) -> None:
+    """
+    Store a suggestion: the structured plan when there is one (its text is
+    rendered on read), otherwise the content compressed
+    """
+    suggestion_doc = suggestion.model_dump()
+    if suggestion.plan is not None:
+        del suggestion_doc["content"]
+        if suggestion.content is not None:
+            plan_renderer.prime(suggestion.id, suggestion.content)
+    await db.suggestions.insert_one(content_codec.encode(suggestion_doc))
+
+
+async def load_suggestion(db, user_id: str, suggestion_id: str, view: str = "text") -> Optional[dict]:
+    """Load one suggestion, in the requested view, if it belongs to user_id"""
+    suggestion_doc = await db.suggestions.find_one({"id": suggestion_id, "user_id": user_id}, SUGGESTION_PROJECTION)
+    return materialize_suggestion(suggestion_doc, view) if suggestion_doc else None
@@ -1,24 +1,49 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from pathlib import Path
 import os
+import hmac
+import json
 import logging
 from datetime import datetime, timedelta
+from typing import Literal, Optional
 
 # Import models and utilities
 from models import (
     UserCreate, UserLogin, User, Token,
     Profile, ProfileUpdate, ProfileResponse,
-    SuggestionCreate, Suggestion, SuggestionResponse,
+    SuggestionCreate, Suggestion, SuggestionResponse, SuggestionSummary, SuggestionPage,
+    GenerationJob, GenerationJobResponse, CurrentUser,
     PaymentTransaction, CheckoutRequest
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token, get_current_user_email
+    create_access_token, get_current_user_email, get_token_payload, token_cache, set_revocation_hook,
+    security
 )
 from database import get_database
-from gemini_service import gemini_service
+from current_user import (
+    get_current_user, get_current_user_with_profile, current_user_resolver, UserWithProfile
+)
+from repository import (
+    load_profile, update_profile_fields, update_password_hash,
+    list_suggestions, load_suggestion, insert_suggestion
+)
+from gemini_service import gemini_service, GeneratedPlan
+from templates import TEMPLATE_VERSION
+from plan_renderer import plan_renderer
+from account_deletion import account_deleter
+from pool_metrics import pool_metrics
+from profile_cache import profile_cache
+from password_hasher import password_hasher, PasswordHasherBusyError
 from payment_service import payment_service, SUBSCRIPTION_PACKAGES
+from single_flight import SingleFlight
+from generation_jobs import GenerationJobQueue, JobQueueFullError
+from indexes import index_manager
+from rate_limit import RateLimitMiddleware, rate_limiter_from_env
+from token_revocation import token_revocation
 from emergentintegrations.payments.stripe.checkout import StripeCheckout
 
 # Load environment variables
@@ -31,6 +56,17 @@ app = FastAPI(title="FitLife AI API", version="1.0.0")
 # Create API router with /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Operational endpoints, mounted only when METRICS_TOKEN is set and
+# answered only to requests carrying it
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+internal_router = APIRouter(prefix="/internal")
+
+# Throttle the endpoints that burn pbkdf2 CPU or LLM budget (added before
+# CORS so 429 responses still carry the CORS headers)
+rate_limiter = rate_limiter_from_env(os.environ)
+if os.environ.get("RATE_LIMIT_ENABLED", "true").lower() != "false":
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,6 +83,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Coalesces concurrent generations for the same (user_id, type), e.g. double taps
+suggestion_flight = SingleFlight()
+
+# Bounded pool of background workers for asynchronous generation jobs
+generation_jobs = GenerationJobQueue(
+    worker_count=int(os.environ.get("GENERATION_WORKERS", "4")),
+    max_pending=int(os.environ.get("GENERATION_QUEUE_SIZE", "100")),
+    stale_after_seconds=float(os.environ.get("GENERATION_JOB_STALE_SECONDS", "600"))
+)
+
 # ==================== HELPER FUNCTIONS ====================
 
 def calculate_bmi(weight: float, height: int) -> tuple[float, str]:
@@ -69,6 +115,73 @@ def calculate_bmi(weight: float, height: int) -> tuple[float, str]:
     
     return bmi, category
 
+async def create_suggestion(db, profile: Profile, suggestion_type: str) -> SuggestionResponse:
+    """Generate a plan with Gemini and persist it as a Suggestion"""
+    plan = await gemini_service.generate_plan(suggestion_type, profile)
+    return await save_suggestion(db, profile, suggestion_type, plan)
+
+async def save_suggestion(db, profile: Profile, suggestion_type: str, plan: GeneratedPlan) -> SuggestionResponse:
+    """Persist a generated plan as a Suggestion (structured when it was parsed)"""
+    structured = plan.data is not None
+    suggestion = Suggestion(
+        user_id=profile.user_id,
+        type=suggestion_type,
+        content=plan.content,
+        plan=plan.data,
+        template_version=TEMPLATE_VERSION if structured else None,
+        profile_name=profile.full_name if structured else None
+    )
+    
+    await insert_suggestion(db, suggestion)
+    
+    return SuggestionResponse(
+        id=suggestion.id,
+        type=suggestion.type,
+        content=plan.content,
+        created_at=suggestion.created_at
+    )
+
+async def run_generation_job(job: GenerationJob) -> SuggestionResponse:
+    """Generate the suggestion for a queued job"""
+    db = get_database()
+    
+    profile = await load_profile(db, job.user_id)
+    if profile is None:
+        raise ValueError("Perfil não encontrado")
+    return await suggestion_flight.do(
+        (job.user_id, job.type),
+        lambda: create_suggestion(db, profile, job.type)
+    )
+
+def to_job_response(job: GenerationJob) -> GenerationJobResponse:
+    return GenerationJobResponse(
+        id=job.id,
+        type=job.type,
+        status=job.status,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_suggestion(db, profile: Profile, suggestion_type: str):
+    """Stream plan generation as SSE and persist the Suggestion at the end"""
+    try:
+        async for event, data in gemini_service.stream_plan(suggestion_type, profile):
+            if event == "plan":
+                plan = GeneratedPlan(content=data["content"], source=data["source"], data=data["data"])
+                suggestion = await save_suggestion(db, profile, suggestion_type, plan)
+                yield format_sse("done", suggestion.model_dump(mode="json"))
+            else:
+                yield format_sse(event, data)
+    except Exception as e:
+        logger.error(f"Erro no streaming de {suggestion_type}: {str(e)}")
+        yield format_sse("error", {"detail": "Erro ao gerar sugestão"})
+
 # ==================== AUTH ENDPOINTS ====================
 
 @api_router.post("/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
@@ -84,10 +197,20 @@ async def register(user_data: UserCreate):
             detail="Email já cadastrado"
         )
     
+    # Hash off the event loop
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"}
+        )
+    
     # Create user
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password)
+        password_hash=password_hash
     )
     
     await db.users.insert_one(user.model_dump())
@@ -108,7 +231,7 @@ async def register(user_data: UserCreate):
     await db.profiles.insert_one(profile.model_dump())
     
     # Create access token
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
     
     logger.info(f"Novo usuário registrado: {user.email}")
     
@@ -129,45 +252,59 @@ async def login(credentials: UserLogin):
     
     user = User(**user_doc)
     
-    # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    # Verify password (off the event loop)
+    try:
+        password_ok = await password_hasher.verify(credentials.password, user.password_hash)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"}
+        )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
         )
     
+    # Upgrade hashes made with an older scheme or weaker settings, in the background
+    if password_hasher.needs_update(user.password_hash):
+        password_hasher.schedule_rehash(
+            credentials.password,
+            lambda new_hash: update_password_hash(db, user.id, user.password_hash, new_hash)
+        )
+    
     # Create access token
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
     
     logger.info(f"Login bem-sucedido: {user.email}")
     
     return Token(access_token=access_token)
 
+@api_router.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: dict = Depends(get_token_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Revoke the token used for this request"""
+    db = get_database()
+    
+    await token_revocation.revoke_token(db, payload, credentials.credentials)
+    
+    logger.info(f"Logout: {payload['sub']}")
+
 # ==================== PROFILE ENDPOINTS ====================
 
 @api_router.get("/profile", response_model=ProfileResponse)
-async def get_profile(current_user_email: str = Depends(get_current_user_email)):
+async def get_profile(authenticated: UserWithProfile = Depends(get_current_user_with_profile)):
     """Get current user's profile"""
-    db = get_database()
-    
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
-        )
-    
-    # Get profile
-    profile_doc = await db.profiles.find_one({"user_id": user_doc["id"]})
-    if not profile_doc:
+    profile = authenticated.profile
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Perfil não encontrado"
         )
     
-    profile = Profile(**profile_doc)
-    
     # Calculate BMI
     bmi, bmi_category = calculate_bmi(profile.weight, profile.height)
     
@@ -191,44 +328,27 @@ async def get_profile(current_user_email: str = Depends(get_current_user_email))
 @api_router.put("/profile", response_model=ProfileResponse)
 async def update_profile(
     profile_update: ProfileUpdate,
-    current_user_email: str = Depends(get_current_user_email)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Update current user's profile"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
-        )
-    
-    # Get current profile
-    profile_doc = await db.profiles.find_one({"user_id": user_doc["id"]})
-    if not profile_doc:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Perfil não encontrado"
-        )
-    
     # Update only provided fields
     update_data = profile_update.model_dump(exclude_unset=True)
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
-        await db.profiles.update_one(
-            {"user_id": user_doc["id"]},
-            {"$set": update_data}
-        )
     
-    # Get updated profile
-    updated_profile_doc = await db.profiles.find_one({"user_id": user_doc["id"]})
-    profile = Profile(**updated_profile_doc)
+    profile = await update_profile_fields(db, current_user.id, update_data)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil não encontrado"
+        )
     
     # Calculate BMI
     bmi, bmi_category = calculate_bmi(profile.weight, profile.height)
     
-    logger.info(f"Perfil atualizado: {current_user_email}")
+    logger.info(f"Perfil atualizado: {current_user.email}")
     
     return ProfileResponse(
         id=profile.id,
@@ -248,163 +368,215 @@ async def update_profile(
     )
 
 @api_router.delete("/user", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_account(current_user_email: str = Depends(get_current_user_email)):
+async def delete_account(current_user: CurrentUser = Depends(get_current_user)):
     """Delete user account and all associated data"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
+    # Delete the user and all associated data
+    deleted = await account_deleter.delete_account(db, current_user.id)
+    if not deleted:
+        # Already deleted (the token still names the account)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuário não encontrado"
         )
+    await profile_cache.invalidate(current_user.id)
+    await token_revocation.revoke_user(db, current_user.id)
+    current_user_resolver.invalidate(current_user)
     
-    user_id = user_doc["id"]
-    
-    # Delete all user data
-    await db.profiles.delete_one({"user_id": user_id})
-    await db.suggestions.delete_many({"user_id": user_id})
-    await db.users.delete_one({"id": user_id})
-    
-    logger.info(f"Conta deletada: {current_user_email}")
+    logger.info(f"Conta deletada: {current_user.email}")
 
 # ==================== SUGGESTIONS ENDPOINTS ====================
 
 @api_router.post("/suggestions/workout", response_model=SuggestionResponse, status_code=status.HTTP_201_CREATED)
-async def generate_workout(current_user_email: str = Depends(get_current_user_email)):
+async def generate_workout(authenticated: UserWithProfile = Depends(get_current_user_with_profile)):
     """Generate personalized workout suggestion"""
     db = get_database()
     
-    # Get user and profile
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
-        )
-    
-    profile_doc = await db.profiles.find_one({"user_id": user_doc["id"]})
-    if not profile_doc:
+    current_user, profile = authenticated
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Perfil não encontrado. Complete seu perfil primeiro."
         )
     
-    profile = Profile(**profile_doc)
-    
     # Generate workout using Gemini
-    logger.info(f"Gerando treino para: {current_user_email}")
-    content = await gemini_service.generate_workout(profile)
-    
-    # Save suggestion
-    suggestion = Suggestion(
-        user_id=user_doc["id"],
-        type="workout",
-        content=content
-    )
-    
-    await db.suggestions.insert_one(suggestion.model_dump())
-    
-    return SuggestionResponse(
-        id=suggestion.id,
-        type=suggestion.type,
-        content=suggestion.content,
-        created_at=suggestion.created_at
+    logger.info(f"Gerando treino para: {current_user.email}")
+    return await suggestion_flight.do(
+        (current_user.id, "workout"),
+        lambda: create_suggestion(db, profile, "workout")
     )
 
 @api_router.post("/suggestions/nutrition", response_model=SuggestionResponse, status_code=status.HTTP_201_CREATED)
-async def generate_nutrition(current_user_email: str = Depends(get_current_user_email)):
+async def generate_nutrition(authenticated: UserWithProfile = Depends(get_current_user_with_profile)):
     """Generate personalized nutrition suggestion"""
     db = get_database()
     
-    # Get user and profile
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
+    current_user, profile = authenticated
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
+            detail="Perfil não encontrado. Complete seu perfil primeiro."
         )
     
-    profile_doc = await db.profiles.find_one({"user_id": user_doc["id"]})
+    # Generate nutrition plan using Gemini
+    logger.info(f"Gerando plano nutricional para: {current_user.email}")
+    return await suggestion_flight.do(
+        (current_user.id, "nutrition"),
+        lambda: create_suggestion(db, profile, "nutrition")
+    )
+
+@api_router.post("/suggestions/jobs", response_model=GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    job_request: SuggestionCreate,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Queue a workout or nutrition generation and return the job to poll"""
+    db = get_database()
+    
+    profile_doc = await db.profiles.find_one({"user_id": current_user.id}, {"_id": 1})
     if not profile_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Perfil não encontrado. Complete seu perfil primeiro."
         )
     
-    profile = Profile(**profile_doc)
+    try:
+        job = await generation_jobs.submit(db, current_user.id, job_request.type)
+    except JobQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas gerações em andamento. Tente novamente em instantes.",
+            headers={"Retry-After": "10"}
+        )
     
-    # Generate nutrition plan using Gemini
-    logger.info(f"Gerando plano nutricional para: {current_user_email}")
-    content = await gemini_service.generate_nutrition(profile)
+    logger.info(f"Job de geração {job.id} ({job.type}) criado para: {current_user.email}")
     
-    # Save suggestion
-    suggestion = Suggestion(
-        user_id=user_doc["id"],
-        type="nutrition",
-        content=content
-    )
+    return to_job_response(job)
+
+@api_router.get("/suggestions/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get the status of a generation job and its result once completed"""
+    db = get_database()
     
-    await db.suggestions.insert_one(suggestion.model_dump())
+    job = await generation_jobs.get(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job não encontrado"
+        )
     
-    return SuggestionResponse(
-        id=suggestion.id,
-        type=suggestion.type,
-        content=suggestion.content,
-        created_at=suggestion.created_at
-    )
+    return to_job_response(job)
 
-@api_router.get("/suggestions/history")
-async def get_suggestions_history(current_user_email: str = Depends(get_current_user_email)):
-    """Get all suggestions history for current user"""
+@api_router.get("/suggestions/{suggestion_type}/stream")
+async def stream_suggestion_generation(
+    suggestion_type: Literal["workout", "nutrition"],
+    authenticated: UserWithProfile = Depends(get_current_user_with_profile)
+):
+    """Generate a workout or nutrition suggestion streamed as Server-Sent Events"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
+    current_user, profile = authenticated
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
+            detail="Perfil não encontrado. Complete seu perfil primeiro."
         )
     
-    # Get all suggestions, sorted by most recent
-    suggestions_cursor = db.suggestions.find({"user_id": user_doc["id"]}).sort("created_at", -1)
-    suggestions_docs = await suggestions_cursor.to_list(length=None)
+    logger.info(f"Gerando {suggestion_type} via streaming para: {current_user.email}")
+    return StreamingResponse(
+        stream_suggestion(db, profile, suggestion_type),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@api_router.get("/suggestions", response_model=SuggestionPage)
+async def list_suggestions_page(
+    suggestion_type: Optional[Literal["workout", "nutrition"]] = Query(None, alias="type"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get one page of the suggestions history (summaries), newest first
+    
+    Pass the returned next_cursor to get the following page. Fetch the
+    content of a suggestion with GET /suggestions/{suggestion_id}.
+    """
+    db = get_database()
+    
+    try:
+        docs, next_cursor = await list_suggestions(
+            db, current_user.id, suggestion_type=suggestion_type, limit=limit, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+    
+    return SuggestionPage(
+        items=[SuggestionSummary(**doc) for doc in docs],
+        next_cursor=next_cursor
+    )
+
+@api_router.get("/suggestions/history")
+async def get_suggestions_history(
+    limit: int = Query(50, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get the most recent suggestions of each type (summaries)
+    
+    Fetch the content of a suggestion with GET /suggestions/{suggestion_id};
+    page through older ones with GET /suggestions.
+    """
+    db = get_database()
+    
+    workouts, _ = await list_suggestions(db, current_user.id, suggestion_type="workout", limit=limit)
+    nutrition, _ = await list_suggestions(db, current_user.id, suggestion_type="nutrition", limit=limit)
     
     return {
-        "workouts": [
-            SuggestionResponse(**doc) 
-            for doc in suggestions_docs 
-            if doc["type"] == "workout"
-        ],
-        "nutrition": [
-            SuggestionResponse(**doc) 
-            for doc in suggestions_docs 
-            if doc["type"] == "nutrition"
-        ]
+        "workouts": [SuggestionSummary(**doc) for doc in workouts],
+        "nutrition": [SuggestionSummary(**doc) for doc in nutrition]
     }
 
-@api_router.delete("/suggestions/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_suggestion(
+@api_router.get("/suggestions/{suggestion_id}", response_model=SuggestionResponse)
+async def get_suggestion(
     suggestion_id: str,
-    current_user_email: str = Depends(get_current_user_email)
+    view: Literal["text", "structured"] = "text",
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Delete a specific suggestion"""
+    """Get a specific suggestion with its full content"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
+    suggestion_doc = await load_suggestion(db, current_user.id, suggestion_id, view=view)
+    if not suggestion_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
+            detail="Sugestão não encontrada"
         )
     
+    return SuggestionResponse(**suggestion_doc)
+
+@api_router.delete("/suggestions/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_suggestion(
+    suggestion_id: str,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Delete a specific suggestion"""
+    db = get_database()
+    
     # Delete suggestion (only if it belongs to the user)
     result = await db.suggestions.delete_one({
         "id": suggestion_id,
-        "user_id": user_doc["id"]
+        "user_id": current_user.id
     })
     
     if result.deleted_count == 0:
@@ -413,7 +585,8 @@ async def delete_suggestion(
             detail="Sugestão não encontrada"
         )
     
-    logger.info(f"Sugestão deletada: {suggestion_id} por {current_user_email}")
+    plan_renderer.forget(suggestion_id)
+    logger.info(f"Sugestão deletada: {suggestion_id} por {current_user.email}")
 
 # ==================== PAYMENT ENDPOINTS ====================
 
@@ -421,16 +594,11 @@ async def delete_suggestion(
 async def create_checkout(
     checkout_data: CheckoutRequest,
     request: Request,
-    current_user_email: str = Depends(get_current_user_email)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Create Stripe checkout session for subscription"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     # Build webhook URL
     host_url = str(request.base_url).rstrip('/')
     webhook_url = f"{host_url}/api/webhook/stripe"
@@ -441,8 +609,8 @@ async def create_checkout(
     # Create checkout session
     session = await payment_service.create_checkout_session(
         stripe_checkout=stripe_checkout,
-        user_id=user_doc["id"],
-        user_email=user_doc["email"],
+        user_id=current_user.id,
+        user_email=current_user.email,
         package_id=checkout_data.package_id,
         origin_url=checkout_data.origin_url
     )
@@ -450,8 +618,8 @@ async def create_checkout(
     # Create payment transaction record
     package = payment_service.get_package_details(checkout_data.package_id)
     transaction = PaymentTransaction(
-        user_id=user_doc["id"],
-        user_email=user_doc["email"],
+        user_id=current_user.id,
+        user_email=current_user.email,
         session_id=session.session_id,
         amount=package["amount"],
         currency=package["currency"],
@@ -464,7 +632,7 @@ async def create_checkout(
     
     await db.payment_transactions.insert_one(transaction.model_dump())
     
-    logger.info(f"Checkout session created: {session.session_id} for user {current_user_email}")
+    logger.info(f"Checkout session created: {session.session_id} for user {current_user.email}")
     
     return {
         "url": session.url,
@@ -548,16 +716,11 @@ async def stripe_webhook(request: Request):
         raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.get("/subscription/status")
-async def get_subscription_status(current_user_email: str = Depends(get_current_user_email)):
+async def get_subscription_status(current_user: CurrentUser = Depends(get_current_user)):
     """Get user's subscription status"""
     db = get_database()
     
-    # Get user
-    user_doc = await db.users.find_one({"email": current_user_email})
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
-    status = await payment_service.get_subscription_status(user_doc["id"], db)
+    status = await payment_service.get_subscription_status(current_user.id, db)
     
     return status
 
@@ -587,12 +750,48 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+async def require_metrics_token(x_metrics_token: str = Header(default="")):
+    """Reject requests to the internal endpoints without the metrics token"""
+    if not hmac.compare_digest(x_metrics_token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido"
+        )
+
+@internal_router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """In-process cache and generation metrics for this worker"""
+    return {
+        "plan_cache": gemini_service.plan_cache.stats(),
+        "llm_admission": gemini_service.llm_limiter.stats(),
+        "suggestion_single_flight": suggestion_flight.stats(),
+        "generation_jobs": generation_jobs.stats(),
+        "indexes": index_manager.stats(),
+        "current_user": current_user_resolver.stats(),
+        "plan_renderer": plan_renderer.stats(),
+        "account_deletion": account_deleter.stats(),
+        "mongo_pool": pool_metrics.stats(),
+        "profile_cache": profile_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "token_revocation": token_revocation.stats()
+    }
+
 # Include router
 app.include_router(api_router)
+if METRICS_TOKEN:
+    app.include_router(internal_router)
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
+    if os.environ.get("MONGO_ENSURE_INDEXES", "true").lower() != "false":
+        await index_manager.ensure_indexes(get_database())
+    await generation_jobs.expire_stale(get_database())
+    generation_jobs.start(get_database, run_generation_job)
+    await token_revocation.start(get_database)
+    set_revocation_hook(token_revocation.is_revoked)
     logger.info("🚀 FitLife AI API iniciada")
     logger.info("📊 MongoDB conectado")
     logger.info("🤖 Gemini AI configurado com Emergent LLM Key")
@@ -600,6 +799,10 @@ async def startup_event():
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    await generation_jobs.stop()
+    await account_deleter.stop()
+    password_hasher.shutdown()
+    await token_revocation.stop()
     from database import Database
     await Database.close()
     logger.info("👋 FitLife AI API encerrada")
@@ -1,8 +1,49 @@
 """
 Templates padrão para geração de treinos e dietas
 Garantem formato consistente e profissional
+
+Cada template é uma f-string; as listas (dias, itens, refeições) são
+montadas pelos helpers de item com um único join cada.
+"""
+
+# Versão do formato renderizado: altere ao mudar qualquer template, para que
+# textos gerados a partir de planos estruturados salvos sejam renderizados de novo
+TEMPLATE_VERSION = "v1"
+
+
+def _workout_text(profile_name: str, frequency: str, division: str, days: str) -> str:
+    """Monta o plano de treino com os blocos dos dias já renderizados"""
+    return f"""PLANO DE TREINO PERSONALIZADO - {profile_name.upper()}
+
+FREQUÊNCIA SEMANAL
+{frequency}
+
+DIVISÃO DO TREINO
+{division}
+
+{days}
+DICAS IMPORTANTES
+- Mantenha sempre uma boa postura durante os exercícios
+- Hidrate-se antes, durante e após o treino
+- Respeite os intervalos de descanso entre as séries
+- Aumente a carga progressivamente conforme evolui
+- Em caso de dor, interrompa o exercício
+
+PROGRESSÃO
+Semana 1-2: Foque na execução correta dos movimentos
+Semana 3-4: Aumente levemente a carga mantendo a forma
+Semana 5-6: Reduza o tempo de descanso entre séries
+Semana 7-8: Aumente repetições ou adicione uma série extra
+
+OBSERVAÇÕES DE SEGURANÇA
+- Consulte um profissional antes de iniciar
+- Faça um aquecimento adequado antes de cada treino
+- Não treine o mesmo grupo muscular em dias consecutivos
+- Descanse pelo menos 1 dia por semana
+- Mantenha uma alimentação adequada para seus objetivos
 """
 
+
 def get_workout_template(profile_name: str, frequency: str, division: str, days: list) -> str:
     """
     Template fixo para treinos
@@ -13,20 +54,17 @@ def get_workout_template(profile_name: str, frequency: str, division: str, days:
         division: Tipo de divisão (ex: "ABC - Treino dividido por grupos musculares")
         days: Lista de dicionários com estrutura de cada dia
     """
-    
-    template = f"""PLANO DE TREINO PERSONALIZADO - {profile_name.upper()}
+    return _workout_text(profile_name, frequency, division, "".join([format_workout_day(day) for day in days]))
 
-FREQUÊNCIA SEMANAL
-{frequency}
-
-DIVISÃO DO TREINO
-{division}
 
-"""
+def format_workout_day(day: dict) -> str:
+    """
+    Formata o bloco de um dia de treino
     
-    # Adicionar cada dia de treino
-    for day in days:
-        template += f"""
+    Args:
+        day: Dicionário com title, warmup, main_workout e cooldown já formatados
+    """
+    return f"""
 {day['title']}
 
 AQUECIMENTO
@@ -42,30 +80,22 @@ Respire profundamente durante o alongamento para melhor relaxamento muscular.
 {day['cooldown']}
 
 """
-    
-    template += """
-DICAS IMPORTANTES
-- Mantenha sempre uma boa postura durante os exercícios
-- Hidrate-se antes, durante e após o treino
-- Respeite os intervalos de descanso entre as séries
-- Aumente a carga progressivamente conforme evolui
-- Em caso de dor, interrompa o exercício
 
-PROGRESSÃO
-Semana 1-2: Foque na execução correta dos movimentos
-Semana 3-4: Aumente levemente a carga mantendo a forma
-Semana 5-6: Reduza o tempo de descanso entre séries
-Semana 7-8: Aumente repetições ou adicione uma série extra
 
-OBSERVAÇÕES DE SEGURANÇA
-- Consulte um profissional antes de iniciar
-- Faça um aquecimento adequado antes de cada treino
-- Não treine o mesmo grupo muscular em dias consecutivos
-- Descanse pelo menos 1 dia por semana
-- Mantenha uma alimentação adequada para seus objetivos
-"""
-    
-    return template
+# Refeições do plano nutricional, na ordem em que aparecem no template
+MEAL_SECTIONS = (
+    ("breakfast", "CAFÉ DA MANHÃ"),
+    ("morning_snack", "LANCHE DA MANHÃ"),
+    ("lunch", "ALMOÇO"),
+    ("afternoon_snack", "LANCHE DA TARDE"),
+    ("dinner", "JANTAR"),
+    ("supper", "CEIA"),
+)
+
+
+def format_meal_section(title: str, items: str, calories) -> str:
+    """Formata o bloco de uma refeição com seus itens e total calórico"""
+    return f"{title}\n{items}\nTotal aproximado: {calories} kcal\n"
 
 
 def get_nutrition_template(profile_name: str, calories: int, protein: int, carbs: int, fats: int, meals: dict) -> str:
@@ -80,8 +110,7 @@ def get_nutrition_template(profile_name: str, calories: int, protein: int, carbs
         fats: Gramas de gorduras
         meals: Dicionário com as refeições
     """
-    
-    template = f"""PLANO NUTRICIONAL PERSONALIZADO - {profile_name.upper()}
+    return f"""PLANO NUTRICIONAL PERSONALIZADO - {profile_name.upper()}
 
 METAS DIÁRIAS
 Calorias totais: {calories} kcal
@@ -142,8 +171,6 @@ OBSERVAÇÕES IMPORTANTES
 - Faça as refeições em horários regulares
 - Consulte um nutricionista para orientações específicas
 """
-    
-    return template
 
 
 def format_exercise_item(number: int, name: str, sets: int, reps: str, rest: str) -> str:
@@ -170,3 +197,113 @@ def format_cooldown_item(number: int, muscle: str, duration: str, instructions:
     if instructions:
         return f"{number}. Alongamento de {muscle} - {duration}\n   Como fazer: {instructions}\n"
     return f"{number}. Alongamento de {muscle} - {duration}\n"
+
+
+def render_workout_plan(workout_data: dict, profile_name: str) -> tuple[str, list]:
+    """
+    Renderiza um treino estruturado (formato JSON do prompt) com o template fixo
+    
+    Returns:
+        tuple: (plano completo, lista de (título, texto) de cada dia)
+    """
+    # Formatar cada dia com os helpers de item
+    formatted_days = []
+    for day in workout_data.get('days', []):
+        formatted_days.append({
+            'title': day['title'],
+            'warmup': "".join([
+                format_warmup_item(i, ex['exercise'], ex['duration'])
+                for i, ex in enumerate(day.get('warmup', []), 1)
+            ]),
+            'main_workout': "".join([
+                format_exercise_item(i, ex['name'], ex['sets'], ex['reps'], ex['rest'])
+                for i, ex in enumerate(day.get('main_workout', []), 1)
+            ]),
+            'cooldown': "".join([
+                format_cooldown_item(i, stretch['muscle'], stretch['duration'], stretch.get('instructions', ''))
+                for i, stretch in enumerate(day.get('cooldown', []), 1)
+            ])
+        })
+    
+    # Cada dia é renderizado uma vez e reaproveitado no plano e nas seções
+    day_blocks = [format_workout_day(day) for day in formatted_days]
+    final_workout = _workout_text(
+        profile_name,
+        workout_data.get('frequency', '3 a 4 vezes por semana'),
+        workout_data.get('division', 'Treino ABC'),
+        "".join(day_blocks)
+    )
+    
+    sections = [
+        (day['title'], block.strip())
+        for day, block in zip(formatted_days, day_blocks)
+    ]
+    return final_workout, sections
+
+
+def render_nutrition_plan(nutrition_data: dict, profile_name: str) -> tuple[str, list]:
+    """
+    Renderiza um plano nutricional estruturado (formato JSON do prompt) com o template fixo
+    
+    Returns:
+        tuple: (plano completo, lista de (título, texto) de cada refeição)
+    """
+    meals_data = nutrition_data.get('meals', {})
+    default_calories = {
+        'breakfast': 400,
+        'morning_snack': 150,
+        'lunch': 600,
+        'afternoon_snack': 200,
+        'dinner': 500,
+        'supper': 150
+    }
+    
+    # Refeições
+    formatted_meals = {}
+    for meal, _title in MEAL_SECTIONS:
+        formatted_meals[meal] = "".join([
+            format_food_item(i, food['food'], food['quantity'], food.get('details', ''))
+            for i, food in enumerate(meals_data.get(meal, []), 1)
+        ])
+        formatted_meals[f'{meal}_cal'] = meals_data.get(f'{meal}_cal', default_calories[meal])
+    
+    # Lista de compras
+    formatted_meals['shopping_list'] = "".join([
+        f"- {item_data['item']} - Preço aproximado: R$ {item_data['price']:.2f}\n"
+        for item_data in meals_data.get('shopping_list', [])
+    ])
+    formatted_meals['total_cost'] = meals_data.get('total_cost', '120.00')
+    
+    # Substituições
+    formatted_meals['substitutions'] = "".join([
+        f"- {sub['original']} pode ser substituído por {sub['alternative']}\n"
+        for sub in meals_data.get('substitutions', [])
+    ])
+    
+    # Montar o plano nutricional final com o template
+    final_nutrition = get_nutrition_template(
+        profile_name=profile_name,
+        calories=nutrition_data.get('calories', 2000),
+        protein=nutrition_data.get('protein', 150),
+        carbs=nutrition_data.get('carbs', 200),
+        fats=nutrition_data.get('fats', 60),
+        meals=formatted_meals
+    )
+    
+    sections = [
+        (title, format_meal_section(title, formatted_meals[meal], formatted_meals[f'{meal}_cal']).strip())
+        for meal, title in MEAL_SECTIONS
+    ]
+    return final_nutrition, sections
+
+
+# Renderizadores por tipo de plano, para regerar textos a partir dos dados estruturados
+PLAN_RENDERERS = {
+    "workout": render_workout_plan,
+    "nutrition": render_nutrition_plan,
+}
+
+
+def render_plan(kind: str, plan_data: dict, profile_name: str) -> tuple[str, list]:
+    """Renderiza um plano estruturado do tipo indicado ("workout" ou "nutrition")"""
+    return PLAN_RENDERERS[kind](plan_data, profile_name)
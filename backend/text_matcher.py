@@ -0,0 +1,131 @@
+"""
+Compiled multi-pattern matcher for accent- and case-insensitive whole-word search
+
+Text is folded once into lowercase ASCII words (accents stripped, anything that
+is not a letter or digit becomes a separator) and split into tokens. Patterns
+are compiled at construction into an index keyed by their first token, so a
+scan is one pass to fold and split the text plus one set intersection,
+regardless of how many patterns there are; token sequences are only compared
+for first tokens that occur in the text.
+"""
+import re
+import unicodedata
+from typing import Iterator, NamedTuple
+
+_TOKEN_RE = re.compile(rb"[a-z0-9]+")
+_COMBINING_RE = re.compile("[̀-ͯ]")
+
+
+class Match(NamedTuple):
+    index: int      # Position of the pattern in the list given to the matcher
+    pattern: str    # Pattern as given to the matcher
+    start: int      # Offset of the match in the original text
+    end: int        # Offset just past the match in the original text
+
+
+def _fold_char(ch: str) -> bytes:
+    """Fold one character to a lowercase ASCII letter/digit, or a separator"""
+    folded = "".join(
+        c for c in unicodedata.normalize("NFKD", ch)
+        if not unicodedata.combining(c)
+    ).casefold()
+    if folded and folded[0].isascii() and folded[0].isalnum():
+        return folded[0].encode("ascii")
+    return b" "
+
+
+# Latin-1 byte -> folded byte. Characters outside Latin-1 are encoded as "?"
+# and therefore become separators.
+_FOLD_TABLE = bytes(_fold_char(chr(code))[0] for code in range(256))
+
+
+def fold_text(text: str) -> tuple[bytes, list]:
+    """
+    Fold text into lowercase ASCII letters, digits and separators
+
+    Returns the folded bytes and, when they are not aligned one-to-one with
+    text, the offset in text of each folded byte (otherwise None).
+    """
+    encoded = text.encode("latin-1", "replace")
+    # Non Latin-1 characters were replaced by "?"; only decomposed accents
+    # (combining marks) among them need the slow path
+    if encoded.count(b"?") == text.count("?") or not _COMBINING_RE.search(text):
+        return encoded.translate(_FOLD_TABLE), None
+
+    chars = []
+    offsets = []
+    for i, ch in enumerate(text):
+        if not unicodedata.combining(ch):
+            chars.append(ch)
+            offsets.append(i)
+    folded = "".join(chars).encode("latin-1", "replace").translate(_FOLD_TABLE)
+    return folded, offsets
+
+
+class MultiPatternMatcher:
+    """
+    Finds every whole-word occurrence of a fixed set of patterns
+
+    Matching ignores case, accents and punctuation between words, so
+    "Açaí (bowl)" matches "acai bowl" and "AÇAÍ (BOWL)", while "Chia" does
+    not match inside "chiado".
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # First token -> [(pattern index, token count, b" tok1 tok2 ... ")]
+        self._by_first_token: dict[bytes, list] = {}
+
+        for index, pattern in enumerate(self.patterns):
+            tokens = fold_text(pattern)[0].split()
+            if not tokens:
+                raise ValueError(f"Padrão sem letras ou dígitos: {pattern!r}")
+            needle = b" " + b" ".join(tokens) + b" "
+            self._by_first_token.setdefault(tokens[0], []).append((index, len(tokens), needle))
+
+        self._first_tokens = frozenset(self._by_first_token)
+
+    def _scan(self, text: str) -> tuple[list, bytes, list]:
+        """Return sorted (token position, pattern index, token count) hits plus the folded text"""
+        folded, offsets = fold_text(text)
+        tokens = folded.split()
+        hits = self._first_tokens.intersection(tokens)
+        if not hits:
+            return [], folded, offsets
+
+        # Tokens joined by single spaces: a pattern occurs where its own
+        # space-joined tokens (padded with spaces) occur
+        collapsed = b" " + b" ".join(tokens) + b" "
+        found = []
+        for token in hits:
+            for index, size, needle in self._by_first_token[token]:
+                pos = collapsed.find(needle)
+                while pos != -1:
+                    # Number of tokens before the match
+                    found.append((collapsed.count(b" ", 0, pos), index, size))
+                    pos = collapsed.find(needle, pos + 1)
+        found.sort()
+        return found, folded, offsets
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """Yield every match, ordered by position in text"""
+        found, folded, offsets = self._scan(text)
+        if not found:
+            return
+
+        spans = [m.span() for m in _TOKEN_RE.finditer(folded)]
+        for k, index, size in found:
+            start, end = spans[k][0], spans[k + size - 1][1]
+            if offsets is not None:
+                # End before the next base character, keeping the combining
+                # marks of the match's last letter
+                start, end = offsets[start], offsets[end] if end < len(offsets) else len(text)
+            yield Match(index, self.patterns[index], start, end)
+
+    def findall(self, text: str) -> list[Match]:
+        return list(self.finditer(text))
+
+    def matched_patterns(self, text: str) -> list[str]:
+        """Distinct patterns found in text, in the order they were given"""
+        found = {index for _, index, _ in self._scan(text)[0]}
+        return [self.patterns[index] for index in sorted(found)]
@@ -0,0 +1,243 @@
+"""
+Revocation of access tokens
+
+Revoked tokens are recorded in the `revoked_tokens` collection, either one
+token (on logout, by its `jti`, or by its SHA-256 for tokens issued without
+one) or every token of a user (on account deletion). A TTL index removes
+each entry once the tokens it covers would have expired anyway.
+
+Each API worker mirrors the collection into a Bloom filter, so the check
+that runs on every request costs no I/O when the token is not revoked (the
+common case). A hit in the filter is confirmed against MongoDB, since Bloom
+filters have false positives. The filter is refreshed incrementally from
+`revoked_at` and rebuilt from scratch periodically to drop expired entries.
+"""
+import os
+import math
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional
+from pymongo import ASCENDING
+from auth import ACCESS_TOKEN_EXPIRE_MINUTES
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Entries written by other workers may commit slightly out of revoked_at
+# order; each refresh re-reads this much overlap (adding is idempotent)
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` keys at `error_rate` false positives"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def token_keys(payload: dict, token: str) -> list[str]:
+    """Revocation keys a token is covered by"""
+    keys = [single_token_key(payload, token)]
+    if payload.get("uid"):
+        keys.append(f"user:{payload['uid']}")
+    return keys
+
+
+def single_token_key(payload: dict, token: str) -> str:
+    """
+    Key revoking just this token: its jti, or a digest of the token itself
+    for tokens issued before tokens carried a jti
+    """
+    if payload.get("jti"):
+        return f"jti:{payload['jti']}"
+    return "tok:" + hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenRevocationList:
+    def __init__(
+        self,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+        refresh_seconds: float = 10,
+        rebuild_seconds: float = 3600
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_revoked_at: Optional[datetime] = None
+        self._last_rebuild: Optional[datetime] = None
+        self._get_db: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+        # Confirmations of filter hits, so repeated requests do not query again
+        self._confirmed = TTLCache(max_entries=10000, ttl_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        self._false_positives = TTLCache(max_entries=10000, ttl_seconds=refresh_seconds)
+        self.checks = 0
+        self.filter_hits = 0
+        self.false_positive_count = 0
+        self.refresh_failed = 0
+
+    async def start(self, get_db: Callable) -> None:
+        """Load the filter and keep refreshing it in the background"""
+        if self._task is not None:
+            return
+        self._get_db = get_db
+        try:
+            await self._rebuild(get_db())
+        except Exception as e:
+            self.refresh_failed += 1
+            logger.error(f"Erro ao carregar tokens revogados: {str(e)}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self._tick(self._get_db())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.refresh_failed += 1
+                logger.error(f"Erro ao atualizar tokens revogados: {str(e)}")
+
+    async def _tick(self, db) -> None:
+        rebuild_due = (
+            self._last_rebuild is None
+            or datetime.utcnow() - self._last_rebuild >= timedelta(seconds=self.rebuild_seconds)
+            # The filter's own size: it is built larger when more
+            # revocations than `capacity` are live
+            or self._filter.count > self._filter.capacity
+        )
+        if rebuild_due:
+            await self._rebuild(db)
+        else:
+            await self._refresh(db, self._filter)
+
+    async def _rebuild(self, db) -> None:
+        # Expired entries are not read back, so they leave the new filter
+        started = datetime.utcnow()
+        stored = await db.revoked_tokens.estimated_document_count()
+        bloom = BloomFilter(max(self.capacity, stored * 2), self.error_rate)
+        self._last_revoked_at = None
+        await self._refresh(db, bloom)
+        self._filter = bloom
+        self._last_rebuild = started
+
+    async def _refresh(self, db, bloom: BloomFilter) -> None:
+        query = {"expires_at": {"$gt": datetime.utcnow()}}
+        if self._last_revoked_at is not None:
+            query["revoked_at"] = {"$gte": self._last_revoked_at - REFRESH_OVERLAP}
+        cursor = db.revoked_tokens.find(query, {"_id": 0, "key": 1, "revoked_at": 1}).sort("revoked_at", ASCENDING)
+        async for entry in cursor:
+            # The overlap re-reads recent entries; count each key once
+            if entry["key"] not in bloom:
+                bloom.add(entry["key"])
+            self._last_revoked_at = entry["revoked_at"]
+
+    async def revoke(self, db, key: str, expires_at: datetime, user_id: Optional[str] = None) -> None:
+        """Record a revocation; effective at once in this worker, after a refresh in the others"""
+        now = datetime.utcnow()
+        await db.revoked_tokens.update_one(
+            {"key": key},
+            {
+                "$set": {"revoked_at": now, "user_id": user_id},
+                "$max": {"expires_at": expires_at}
+            },
+            upsert=True
+        )
+        self._filter.add(key)
+        self._confirmed.set(key, True)
+        self._false_positives.delete(key)
+
+    async def revoke_token(self, db, payload: dict, token: str) -> None:
+        """Revoke one token (logout)"""
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = datetime.utcfromtimestamp(payload["exp"])
+        else:
+            expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        await self.revoke(
+            db,
+            single_token_key(payload, token),
+            expires_at,
+            user_id=payload.get("uid")
+        )
+
+    async def revoke_user(self, db, user_id: str) -> None:
+        """Revoke every token of a user (account deletion)"""
+        await self.revoke(
+            db,
+            f"user:{user_id}",
+            datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+            user_id=user_id
+        )
+
+    async def is_revoked(self, payload: dict, token: str) -> bool:
+        """Revocation hook for auth; only filter hits reach MongoDB"""
+        self.checks += 1
+        for key in token_keys(payload, token):
+            if key in self._confirmed:
+                return True
+            if key not in self._filter or key in self._false_positives:
+                continue
+
+            self.filter_hits += 1
+            entry = await self._get_db().revoked_tokens.find_one(
+                {"key": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"_id": 1}
+            )
+            if entry is not None:
+                self._confirmed.set(key, True)
+                return True
+            self.false_positive_count += 1
+            self._false_positives.set(key, True)
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "filter_keys": self._filter.count,
+            "filter_bits": self._filter.size_bits,
+            "hash_count": self._filter.hash_count,
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "false_positives": self.false_positive_count,
+            "refresh_failed": self.refresh_failed,
+            "last_rebuild": self._last_rebuild.isoformat() if self._last_rebuild else None
+        }
+
+
+# Create singleton instance
+token_revocation = TokenRevocationList(
+    capacity=int(os.environ.get("REVOCATION_FILTER_CAPACITY", "100000")),
+    error_rate=float(os.environ.get("REVOCATION_FILTER_ERROR_RATE", "0.001")),
+    refresh_seconds=float(os.environ.get("REVOCATION_REFRESH_SECONDS", "10")),
+    rebuild_seconds=float(os.environ.get("REVOCATION_REBUILD_SECONDS", "3600"))
+)
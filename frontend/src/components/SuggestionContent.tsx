@@ -0,0 +1,56 @@
+import React, { useEffect, useState } from 'react';
+import { AlertCircle, Loader2 } from 'lucide-react';
+import WorkoutDisplay from '@/components/WorkoutDisplay';
+import NutritionDisplay from '@/components/NutritionDisplay';
+import { api } from '@/services/api';
+
+interface SuggestionContentProps {
+  suggestionId: string;
+  type: 'workout' | 'nutrition';
+}
+
+// Loads the content of a history entry when it is opened
+const SuggestionContent: React.FC<SuggestionContentProps> = ({ suggestionId, type }) => {
+  const [content, setContent] = useState<string | null>(null);
+  const [error, setError] = useState(false);
+
+  useEffect(() => {
+    let active = true;
+    setContent(null);
+    setError(false);
+    api.getSuggestion(suggestionId)
+      .then((suggestion) => {
+        if (active) setContent(suggestion.content);
+      })
+      .catch((err) => {
+        console.error("Erro ao carregar sugestão:", err);
+        if (active) setError(true);
+      });
+    return () => {
+      active = false;
+    };
+  }, [suggestionId]);
+
+  if (error) {
+    return (
+      <div className="flex items-center gap-2 text-red-500 py-8 justify-center">
+        <AlertCircle className="w-5 h-5" />
+        Não foi possível carregar o conteúdo
+      </div>
+    );
+  }
+
+  if (content === null) {
+    return (
+      <div className="flex justify-center py-8">
+        <Loader2 className="w-8 h-8 animate-spin text-primary" />
+      </div>
+    );
+  }
+
+  return type === 'workout'
+    ? <WorkoutDisplay content={content} />
+    : <NutritionDisplay content={content} />;
+};
+
+export default SuggestionContent;
@@ -7,6 +7,7 @@ import {
 } from "lucide-react";
 import WorkoutDisplay from "@/components/WorkoutDisplay";
 import NutritionDisplay from "@/components/NutritionDisplay";
+import SuggestionContent from "@/components/SuggestionContent";
 import PWAInstallButton from "@/components/PWAInstallButton";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
@@ -441,7 +442,7 @@ const DashboardNew = () => {
                                     <DialogTitle>Treino Completo</DialogTitle>
                                   </DialogHeader>
                                   <div className="mt-4">
-                                    <WorkoutDisplay content={workout.content} />
+                                    <SuggestionContent suggestionId={workout.id} type="workout" />
                                   </div>
                                 </DialogContent>
                               </Dialog>
@@ -495,7 +496,7 @@ const DashboardNew = () => {
                                     <DialogTitle>Plano Nutricional Completo</DialogTitle>
                                   </DialogHeader>
                                   <div className="mt-4">
-                                    <NutritionDisplay content={nutrition.content} />
+                                    <SuggestionContent suggestionId={nutrition.id} type="nutrition" />
                                   </div>
                                 </DialogContent>
                               </Dialog>
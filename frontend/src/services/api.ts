@@ -93,6 +93,11 @@ class ApiService {
     return response.data;
   }
 
+  async getSuggestion(suggestionId: string): Promise<Suggestion> {
+    const response = await this.client.get<Suggestion>(`/api/suggestions/${suggestionId}`);
+    return response.data;
+  }
+
   async deleteSuggestion(suggestionId: string): Promise<void> {
     await this.client.delete(`/api/suggestions/${suggestionId}`);
   }
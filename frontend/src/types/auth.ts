@@ -56,7 +56,10 @@ export interface Suggestion {
   created_at: string;
 }
 
+// History entries leave the content out; fetch it with api.getSuggestion
+export type SuggestionSummary = Omit<Suggestion, 'content'>;
+
 export interface SuggestionsHistory {
-  workouts: Suggestion[];
-  nutrition: Suggestion[];
+  workouts: SuggestionSummary[];
+  nutrition: SuggestionSummary[];
 }
@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+from account_deletion import USER_OWNED_COLLECTIONS, AccountDeleter
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    async def count_documents(self, query, limit=0):
+        return sum(1 for doc in self.docs if doc["user_id"] == query["user_id"])
+
+    async def delete_many(self, query, session=None):
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if doc["user_id"] != query["user_id"]]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def delete_one(self, query, session=None):
+        for doc in self.docs:
+            if doc["id"] == query["id"]:
+                self.docs.remove(doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def with_transaction(self, callback):
+        return await callback(self)
+
+
+class FakeClient:
+    def __init__(self, replica_set):
+        self.replica_set = replica_set
+        self.admin = self
+
+    async def command(self, name):
+        return {"setName": "rs0"} if self.replica_set else {}
+
+    async def start_session(self):
+        return FakeSession()
+
+
+class FakeDB:
+    def __init__(self, replica_set=False):
+        self.client = FakeClient(replica_set)
+        self.users = FakeCollection([{"id": "u1", "user_id": "u1"}, {"id": "u2", "user_id": "u2"}])
+        self.collections = {
+            name: FakeCollection([{"user_id": "u1"}, {"user_id": "u2"}])
+            for name in USER_OWNED_COLLECTIONS
+        }
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    @property
+    def suggestions(self):
+        return self.collections["suggestions"]
+
+
+def delete_twice(db):
+    deleter = AccountDeleter()
+
+    async def run():
+        return await deleter.delete_account(db, "u1"), await deleter.delete_account(db, "u1")
+
+    return deleter, asyncio.run(run())
+
+
+def test_second_delete_reports_nothing_deleted():
+    db = FakeDB()
+    deleter, results = delete_twice(db)
+
+    assert results == (1, 0)
+    assert deleter.deleted_accounts == 1
+    assert [doc["id"] for doc in db.users.docs] == ["u2"]
+    assert all(
+        [doc["user_id"] for doc in collection.docs] == ["u2"]
+        for collection in db.collections.values()
+    )
+
+
+def test_second_delete_reports_nothing_deleted_in_a_transaction():
+    db = FakeDB(replica_set=True)
+    deleter, results = delete_twice(db)
+
+    assert results == (1, 0)
+    assert deleter.transactional == 2
+    assert [doc["id"] for doc in db.users.docs] == ["u2"]
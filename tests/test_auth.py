@@ -0,0 +1,82 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+
+# auth needs passlib, python-jose and fastapi
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+pytest.importorskip("fastapi")
+
+import auth  # noqa: E402
+from auth import VerifiedTokenCache, create_access_token, decode_token, get_token_payload  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = VerifiedTokenCache()
+    monkeypatch.setattr(auth, "token_cache", cache)
+    monkeypatch.setattr(auth, "revocation_hook", None)
+    return cache
+
+
+def advance_clock(monkeypatch, seconds):
+    """Move auth's wall clock forward (the cache's own TTL clock is left alone)"""
+    now = time.time() + seconds
+    monkeypatch.setattr(auth, "time", SimpleNamespace(time=lambda: now))
+
+
+def test_entry_is_not_served_once_the_token_expires(monkeypatch):
+    cache = VerifiedTokenCache()
+    cache.set("token", {"sub": "maria@example.com", "exp": time.time() + 60})
+    assert cache.get("token") is not None
+
+    advance_clock(monkeypatch, 61)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_already_expired_payload_is_not_cached():
+    cache = VerifiedTokenCache()
+    cache.set("token", {"sub": "maria@example.com", "exp": time.time() - 1})
+    assert cache.get("token") is None
+
+
+def test_expired_token_is_verified_again_and_rejected(monkeypatch, token_cache):
+    token = create_access_token({"sub": "maria@example.com"}, expires_delta=timedelta(minutes=5))
+    assert decode_token(token)["sub"] == "maria@example.com"
+
+    def expired(*args, **kwargs):
+        raise auth.JWTError("Signature has expired")
+
+    # Past exp the signature check (which rejects expired tokens) runs again
+    advance_clock(monkeypatch, 6 * 60)
+    monkeypatch.setattr(auth.jwt, "decode", expired)
+    with pytest.raises(HTTPException) as error:
+        decode_token(token)
+    assert error.value.status_code == 401
+
+
+def test_revoked_token_is_rejected_despite_the_cache(monkeypatch, token_cache):
+    token = create_access_token({"sub": "maria@example.com", "uid": "u1"})
+    credentials = SimpleNamespace(credentials=token)
+    revoked = set()
+    checked = []
+
+    async def is_revoked(payload, raw_token):
+        checked.append(payload["jti"])
+        return raw_token in revoked
+
+    auth.set_revocation_hook(is_revoked)
+    assert asyncio.run(get_token_payload(credentials))["uid"] == "u1"
+    assert token_cache.get(token) is not None
+
+    revoked.add(token)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_token_payload(credentials))
+    assert error.value.status_code == 401
+    # The hook runs on cached tokens too, and a rejection evicts the entry
+    assert len(checked) == 2
+    assert token_cache.get(token) is None
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+
+# generation_jobs imports the models (pydantic)
+pytest.importorskip("pydantic")
+
+from generation_jobs import GenerationJobQueue  # noqa: E402
+from models import SuggestionResponse  # noqa: E402
+
+USER_ID = "user-1"
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if "$in" in condition and doc[field] not in condition["$in"]:
+                return False
+            if "$lt" in condition and not doc[field] < condition["$lt"]:
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+
+class FakeJobs:
+    def __init__(self):
+        self.docs = {}
+        # Awaited once before the next update, to interleave a concurrent writer
+        self.before_update = None
+
+    async def insert_one(self, doc):
+        self.docs[doc["id"]] = dict(doc)
+
+    async def find_one(self, query, projection):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                return dict(doc)
+        return None
+
+    async def update_one(self, query, update):
+        if self.before_update is not None:
+            hook, self.before_update = self.before_update, None
+            await hook()
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                doc.update(update["$set"])
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs.values() if _matches(doc, query)]
+        for doc in matched:
+            doc.update(update["$set"])
+        return SimpleNamespace(modified_count=len(matched))
+
+
+class FakeDB:
+    def __init__(self):
+        self.generation_jobs = FakeJobs()
+
+
+def backdate(db, job_id):
+    """Make a job look untouched since before the stale cutoff"""
+    db.generation_jobs.docs[job_id]["updated_at"] -= timedelta(hours=1)
+
+
+def test_stale_poll_does_not_overwrite_a_job_that_just_finished():
+    db = FakeDB()
+    queue = GenerationJobQueue(worker_count=1, stale_after_seconds=60)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            return SuggestionResponse(id="s1", type=job.type, content="plano", created_at=datetime.utcnow())
+
+        async def finish_job():
+            release.set()
+            await queue._queue.join()
+
+        queue.start(lambda: db, handler)
+        job = await queue.submit(db, USER_ID, "workout")
+        while db.generation_jobs.docs[job.id]["status"] != "running":
+            await asyncio.sleep(0)
+
+        # The poll reads the job as stale, then the worker finishes it before
+        # the poll marks it failed
+        backdate(db, job.id)
+        db.generation_jobs.before_update = finish_job
+        polled = await queue.get(db, job.id, USER_ID)
+        expired = await queue.expire_stale(db)
+        await queue.stop()
+        return job, polled, expired
+
+    job, polled, expired = asyncio.run(run())
+    assert polled.status == "completed"
+    assert polled.result.content == "plano"
+    assert expired == 0
+    assert db.generation_jobs.docs[job.id]["status"] == "completed"
+    assert db.generation_jobs.docs[job.id]["error"] is None
+    assert (queue.completed, queue.expired) == (1, 0)
+
+
+def test_job_expired_while_queued_is_not_run():
+    db = FakeDB()
+    queue = GenerationJobQueue(worker_count=1, stale_after_seconds=60)
+    handled = []
+
+    async def run():
+        async def handler(job):
+            handled.append(job.id)
+            return SuggestionResponse(id="s1", type=job.type, content="plano", created_at=datetime.utcnow())
+
+        queue.start(lambda: db, handler)
+        # The worker has not picked the job up yet
+        job = await queue.submit(db, USER_ID, "workout")
+        backdate(db, job.id)
+        expired = await queue.expire_stale(db)
+        await queue._queue.join()
+        polled = await queue.get(db, job.id, USER_ID)
+        await queue.stop()
+        return polled, expired
+
+    polled, expired = asyncio.run(run())
+    assert expired == 1
+    assert handled == []
+    assert polled.status == "failed"
+    assert (queue.completed, queue.expired) == (0, 1)
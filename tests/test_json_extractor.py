@@ -0,0 +1,117 @@
+import pytest
+
+from json_extractor import (
+    REPAIR_CODE_FENCE,
+    REPAIR_LEADING_TEXT,
+    REPAIR_TRAILING_COMMA,
+    REPAIR_TRAILING_TEXT,
+    REPAIR_TRUNCATED,
+    JSONExtractionError,
+    StreamingJSONExtractor,
+    extract_json,
+)
+
+
+def test_bare_object_needs_no_repair():
+    result = extract_json('{"a": 1, "b": [1, 2]}')
+    assert result.data == {"a": 1, "b": [1, 2]}
+    assert result.repairs == ()
+
+
+def test_code_fence_is_stripped():
+    result = extract_json('```json\n{"a": 1}\n```')
+    assert result.data == {"a": 1}
+    assert result.repairs == (REPAIR_CODE_FENCE,)
+
+
+def test_surrounding_prose_is_reported():
+    result = extract_json('Aqui está o plano:\n```json\n{"a": 1}\n```\nBons treinos!')
+    assert result.data == {"a": 1}
+    assert result.repairs == (REPAIR_CODE_FENCE, REPAIR_LEADING_TEXT, REPAIR_TRAILING_TEXT)
+
+
+def test_trailing_commas_are_removed():
+    result = extract_json('{"a": [1, 2,], "b": {"c": 3,},}')
+    assert result.data == {"a": [1, 2], "b": {"c": 3}}
+    assert result.repairs == (REPAIR_TRAILING_COMMA,)
+
+
+def test_braces_and_escapes_inside_strings_are_ignored():
+    text = r'{"a": "x } ] { [", "b": "aspas \" e barra \\", "c": "\\\"}"}'
+    result = extract_json(text + " fim")
+    assert result.data == {"a": "x } ] { [", "b": 'aspas " e barra \\', "c": '\\"}'}
+
+
+def test_truncated_object_is_cut_back_to_the_last_complete_value():
+    result = extract_json('{"a": 1, "b": [1, 2, {"c": 3}], "d": "cortad')
+    assert result.data == {"a": 1, "b": [1, 2, {"c": 3}]}
+    assert result.repairs == (REPAIR_TRUNCATED,)
+
+
+def test_truncated_inside_nested_containers():
+    result = extract_json('{"a": {"b": [1, 2')
+    assert result.data == {"a": {"b": [1]}}
+    assert REPAIR_TRUNCATED in result.repairs
+
+
+def test_braces_in_prose_before_the_object_are_skipped():
+    result = extract_json('Plano {A}: treino de força\n```json\n{"a": 1}\n```')
+    assert result.data == {"a": 1}
+    assert result.repairs == (REPAIR_CODE_FENCE, REPAIR_LEADING_TEXT)
+
+
+def test_unclosed_brace_in_prose_before_the_object_is_skipped():
+    result = extract_json('Plano {A: treino\n```json\n{"a": {"b": [1, 2]}}\n```')
+    assert result.data == {"a": {"b": [1, 2]}}
+
+
+def test_prose_brace_before_a_truncated_object():
+    result = extract_json('Plano {A}: {"a": 1, "b": [1, 2')
+    assert result.data == {"a": 1, "b": [1]}
+    assert REPAIR_TRUNCATED in result.repairs
+
+
+def test_no_object_raises():
+    with pytest.raises(JSONExtractionError):
+        extract_json("Desculpe, não consigo ajudar com isso.")
+
+
+def test_mismatched_closer_raises():
+    with pytest.raises(JSONExtractionError):
+        extract_json('{"a": [1, 2}')
+
+
+def test_streaming_chunks_split_anywhere():
+    text = 'Plano:\n```json\n{"a": "x \\" }", "b": [1, 2,]}\n```'
+    for size in (1, 2, 3, 7):
+        extractor = StreamingJSONExtractor()
+        result = None
+        for i in range(0, len(text), size):
+            result = extractor.feed(text[i:i + size])
+            if result is not None:
+                break
+        assert result is not None
+        assert result.data == {"a": 'x " }', "b": [1, 2]}
+        assert result.repairs == (REPAIR_CODE_FENCE, REPAIR_LEADING_TEXT, REPAIR_TRAILING_COMMA)
+
+
+def test_streaming_skips_braces_in_prose():
+    text = 'Plano {A} e {B]: ```json\n{"a": [1, {"b": 2}]}\n```'
+    for size in (1, 4, 9):
+        extractor = StreamingJSONExtractor()
+        result = None
+        for i in range(0, len(text), size):
+            result = extractor.feed(text[i:i + size])
+            if result is not None:
+                break
+        assert result is not None
+        assert result.data == {"a": [1, {"b": 2}]}
+
+
+def test_streaming_returns_as_soon_as_the_object_closes():
+    extractor = StreamingJSONExtractor()
+    assert extractor.feed('{"a": ') is None
+    assert not extractor.done
+    assert extractor.feed('1}') is not None
+    assert extractor.done
+    assert extractor.finish().repairs == ()
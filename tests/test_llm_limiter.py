@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+
+from llm_limiter import AdmissionController, LLMOverloadedError
+
+
+async def hold(controller, release):
+    async with controller.slot():
+        await release.wait()
+
+
+def test_calls_within_the_limit_are_admitted():
+    controller = AdmissionController(max_concurrent=2, max_queue=0)
+
+    async def run():
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        in_flight = controller.in_flight
+        release.set()
+        await asyncio.gather(*tasks)
+        return in_flight
+
+    assert asyncio.run(run()) == 2
+    assert controller.admitted == 2
+    assert controller.in_flight == 0
+
+
+def test_full_queue_rejects_at_once():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_seconds=5)
+
+    async def run():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+
+        with pytest.raises(LLMOverloadedError):
+            async with controller.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(run())
+    assert controller.rejected_queue_full == 1
+    assert controller.admitted == 2
+    assert controller.queue_depth == 0
+
+
+def test_queued_call_times_out():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait_seconds=0.02)
+
+    async def run():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(LLMOverloadedError):
+            async with controller.slot():
+                pass
+
+        release.set()
+        await running
+
+        # The slot freed by the holder is usable again
+        async with controller.slot():
+            pass
+
+    asyncio.run(run())
+    assert controller.rejected_timeout == 1
+    assert controller.admitted == 2
+    assert controller.queue_depth == 0
+    assert controller.in_flight == 0
+
+
+def test_slot_is_released_when_the_call_fails():
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with controller.slot():
+                raise RuntimeError("erro do LLM")
+        async with controller.slot():
+            pass
+
+    asyncio.run(run())
+    assert controller.admitted == 2
+    assert controller.rejected_queue_full == 0
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+# password_hasher imports auth (passlib, python-jose, fastapi); repository
+# imports the models (pydantic) and the codecs (pymongo's bson)
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic")
+pytest.importorskip("bson")
+
+from password_hasher import PasswordHasher  # noqa: E402
+from repository import update_password_hash  # noqa: E402
+
+USER_ID = "user-1"
+OLD_HASH = "$pbkdf2-sha256$1000$old"
+
+
+class FakeUsers:
+    def __init__(self):
+        self.doc = {"id": USER_ID, "password_hash": OLD_HASH}
+
+    async def update_one(self, query, update):
+        if all(self.doc[field] == value for field, value in query.items()):
+            self.doc.update(update["$set"])
+            return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+
+class FakeDB:
+    def __init__(self):
+        self.users = FakeUsers()
+
+
+def rehash(change_password_to=None):
+    """Run a login's background rehash, optionally changing the password meanwhile"""
+    db = FakeDB()
+    hasher = PasswordHasher()
+
+    async def run():
+        hashing = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_hash(password):
+            hashing.set()
+            await release.wait()
+            return "$pbkdf2-sha256$29000$new"
+
+        hasher.hash = slow_hash
+        hasher.schedule_rehash(
+            "senha-antiga",
+            lambda new_hash: update_password_hash(db, USER_ID, OLD_HASH, new_hash)
+        )
+        await hashing.wait()
+        if change_password_to is not None:
+            db.users.doc["password_hash"] = change_password_to
+        release.set()
+        await asyncio.gather(*list(hasher._rehash_tasks))
+
+    asyncio.run(run())
+    return db.users.doc["password_hash"], hasher
+
+
+def test_rehash_replaces_the_old_hash():
+    stored, hasher = rehash()
+    assert stored == "$pbkdf2-sha256$29000$new"
+    assert (hasher.rehashed, hasher.rehash_skipped) == (1, 0)
+
+
+def test_password_changed_during_a_rehash_is_kept():
+    stored, hasher = rehash(change_password_to="$pbkdf2-sha256$29000$changed")
+    assert stored == "$pbkdf2-sha256$29000$changed"
+    assert (hasher.rehashed, hasher.rehash_skipped, hasher.rehash_failed) == (0, 1, 0)
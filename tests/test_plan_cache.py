@@ -0,0 +1,129 @@
+import json
+import asyncio
+import pytest
+
+# plan_cache imports the models (pydantic)
+pytest.importorskip("pydantic")
+
+from models import Profile  # noqa: E402
+from plan_cache import (  # noqa: E402
+    FINGERPRINT_FIELDS, PROFILE_NAME_PLACEHOLDER, PlanCache, profile_fingerprint
+)
+from templates import render_plan  # noqa: E402
+
+PROMPT_VERSION = "workout-v3:abc"
+
+# Profile fields that do not feed the prompt
+NOT_GENERATION_INPUTS = {"id", "user_id", "full_name", "created_at", "updated_at"}
+
+# A value different from the base profile's for each generation input
+CHANGED_VALUES = {
+    "age": 31,
+    "weight": 82.5,
+    "height": 181,
+    "objectives": "Ganhar massa muscular",
+    "dietary_restrictions": "Sem lactose",
+    "training_type": "academia",
+    "current_activities": "Corrida 2x por semana",
+}
+
+WORKOUT_PLAN = {
+    "frequency": "3 vezes por semana",
+    "division": "Treino ABC",
+    "days": [{
+        "title": "DIA A - CORPO INTEIRO",
+        "warmup": [{"exercise": "Polichinelos", "duration": "3 minutos"}],
+        "main_workout": [{"name": "Agachamento", "sets": 3, "reps": "15", "rest": "45 segundos"}],
+        "cooldown": [{"muscle": "Quadríceps", "duration": "30 segundos"}],
+    }],
+}
+
+
+def profile(**fields):
+    values = {
+        "user_id": "user-1",
+        "full_name": "Ana Souza",
+        "age": 30,
+        "weight": 70.0,
+        "height": 170,
+        "objectives": "Emagrecer",
+        "dietary_restrictions": None,
+        "training_type": "casa",
+        "current_activities": None,
+    }
+    values.update(fields)
+    return Profile(**values)
+
+
+def test_every_generation_input_is_fingerprinted():
+    generation_inputs = set(Profile.model_fields) - NOT_GENERATION_INPUTS
+    assert generation_inputs == set(FINGERPRINT_FIELDS)
+    assert set(CHANGED_VALUES) == set(FINGERPRINT_FIELDS)
+
+
+@pytest.mark.parametrize("field", FINGERPRINT_FIELDS)
+def test_profiles_differing_in_a_generation_input_do_not_share_an_entry(field):
+    base = profile()
+    changed = profile(**{field: CHANGED_VALUES[field]})
+    assert profile_fingerprint("workout", base, PROMPT_VERSION) != profile_fingerprint("workout", changed, PROMPT_VERSION)
+
+    cache = PlanCache()
+    cache.set("workout", base, PROMPT_VERSION, "plano")
+    assert cache.get("workout", changed, PROMPT_VERSION) is None
+
+
+def test_fingerprint_depends_on_kind_and_prompt_version():
+    base = profile()
+    fingerprint = profile_fingerprint("workout", base, PROMPT_VERSION)
+    assert profile_fingerprint("nutrition", base, PROMPT_VERSION) != fingerprint
+    assert profile_fingerprint("workout", base, "workout-v4:def") != fingerprint
+
+
+def test_profiles_differing_only_by_name_share_an_entry_with_their_own_name():
+    ana = profile(full_name="Ana Souza", user_id="user-1")
+    bruno = profile(full_name="Bruno Lima", user_id="user-2")
+    assert profile_fingerprint("workout", ana, PROMPT_VERSION) == profile_fingerprint("workout", bruno, PROMPT_VERSION)
+
+    rendered, sections = render_plan("workout", WORKOUT_PLAN, PROFILE_NAME_PLACEHOLDER)
+    cache = PlanCache()
+    cache.set("workout", ana, PROMPT_VERSION, rendered, sections, WORKOUT_PLAN)
+
+    for owner, other in ((ana, bruno), (bruno, ana)):
+        cached = cache.get("workout", owner, PROMPT_VERSION)
+        assert cached is not None
+        assert cached.content == render_plan("workout", WORKOUT_PLAN, owner.full_name)[0]
+        assert other.full_name.upper() not in cached.content
+        assert PROFILE_NAME_PLACEHOLDER not in cached.content
+
+
+def test_generate_plan_reuses_a_cached_plan_across_names(monkeypatch):
+    # gemini_service needs the LLM client package and a key at import
+    pytest.importorskip("emergentintegrations")
+    pytest.importorskip("dotenv")
+    monkeypatch.setenv("EMERGENT_LLM_KEY", "test-key")
+    from gemini_service import GeminiService
+
+    service = GeminiService()
+    prompts = []
+
+    async def send_message(kind, owner, system_message, prompt):
+        prompts.append(prompt)
+        return json.dumps(WORKOUT_PLAN)
+
+    monkeypatch.setattr(service, "_send_message", send_message)
+
+    async def run():
+        return (
+            await service.generate_plan("workout", profile(full_name="Ana Souza")),
+            await service.generate_plan("workout", profile(full_name="Bruno Lima", user_id="user-2")),
+            await service.generate_plan("workout", profile(full_name="Carla Dias", age=45)),
+        )
+
+    ana, bruno, carla = asyncio.run(run())
+    assert (ana.source, bruno.source, carla.source) == ("llm", "cache", "llm")
+    assert len(prompts) == 2
+    # The model never sees a name, and each user gets their own
+    assert not any(name in prompt for prompt in prompts for name in ("Ana", "Bruno", "Carla"))
+    assert "ANA SOUZA" in ana.content and "BRUNO LIMA" not in ana.content
+    assert "BRUNO LIMA" in bruno.content and "ANA SOUZA" not in bruno.content
+    assert "CARLA DIAS" in carla.content
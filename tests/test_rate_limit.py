@@ -0,0 +1,197 @@
+import asyncio
+import pytest
+
+# rate_limit imports auth (passlib, python-jose, fastapi)
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+pytest.importorskip("fastapi")
+
+from rate_limit import (  # noqa: E402
+    InMemoryRateLimitBackend, Rate, RateLimitBackend, RateLimiter, RateLimitRule, rate_limiter_from_env
+)
+
+LOGIN = "/api/auth/login"
+
+
+def login_scope(forwarded_for=None, client="10.0.0.1"):
+    headers = []
+    if forwarded_for is not None:
+        headers.append((b"x-forwarded-for", forwarded_for.encode("latin-1")))
+    return {"type": "http", "method": "POST", "path": LOGIN, "client": (client, 4321), "headers": headers}
+
+
+def limiter(limit=10, trusted_proxy_hops=0):
+    rule = RateLimitRule("POST", LOGIN, "ip", Rate(limit, 60))
+    return RateLimiter(InMemoryRateLimitBackend(), [rule], trusted_proxy_hops=trusted_proxy_hops)
+
+
+def test_client_ip_ignores_forwarded_for_without_trusted_proxies():
+    rate_limiter = limiter()
+    scope = login_scope("1.2.3.4")
+    assert rate_limiter.client_ip(scope, dict(scope["headers"])) == "10.0.0.1"
+
+
+def test_client_ip_uses_entry_appended_by_trusted_proxy():
+    rate_limiter = limiter(trusted_proxy_hops=1)
+    scope = login_scope("6.6.6.6, 203.0.113.7")
+    assert rate_limiter.client_ip(scope, dict(scope["headers"])) == "203.0.113.7"
+
+
+def test_client_ip_counts_trusted_hops_from_the_right():
+    rate_limiter = limiter(trusted_proxy_hops=2)
+    scope = login_scope("6.6.6.6, 203.0.113.7, 10.1.1.1")
+    assert rate_limiter.client_ip(scope, dict(scope["headers"])) == "203.0.113.7"
+
+
+def test_client_ip_falls_back_to_peer_when_header_is_short():
+    rate_limiter = limiter(trusted_proxy_hops=2)
+    scope = login_scope("203.0.113.7")
+    assert rate_limiter.client_ip(scope, dict(scope["headers"])) == "10.0.0.1"
+
+
+def test_spoofed_forwarded_for_does_not_bypass_the_limit():
+    rate_limiter = limiter(limit=10, trusted_proxy_hops=1)
+
+    async def run():
+        # The proxy appends the real client address after whatever the client sent
+        return [
+            await rate_limiter.check(login_scope(f"198.51.100.{i}, 203.0.113.7"))
+            for i in range(12)
+        ]
+
+    results = asyncio.run(run())
+    assert all(retry_after == 0 for retry_after in results[:10])
+    assert all(retry_after > 0 for retry_after in results[10:])
+
+
+def test_trust_forwarded_for_setting_means_one_hop():
+    assert rate_limiter_from_env({"RATE_LIMIT_TRUST_FORWARDED_FOR": "true"}).trusted_proxy_hops == 1
+    assert rate_limiter_from_env({"RATE_LIMIT_TRUSTED_PROXY_HOPS": "2"}).trusted_proxy_hops == 2
+    assert rate_limiter_from_env({}).trusted_proxy_hops == 0
+
+
+def test_redis_backend_without_url_falls_back_to_memory(monkeypatch):
+    import rate_limit
+    monkeypatch.setattr(rate_limit, "redis_asyncio", object())
+    rate_limiter = rate_limiter_from_env({"RATE_LIMIT_BACKEND": "redis"})
+    assert isinstance(rate_limiter.backend, InMemoryRateLimitBackend)
+
+
+def test_backend_must_implement_acquire():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_acquire_allows_a_full_window_then_rejects():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+    rate = Rate(5, 60)
+
+    async def run():
+        return [await backend.acquire("k", rate) for _ in range(6)]
+
+    results = asyncio.run(run())
+    assert results[:5] == [0.0] * 5
+    # The next slot frees up one emission interval (12 s) after the first
+    assert results[5] == pytest.approx(12.0)
+
+
+def test_acquire_frees_one_request_per_emission_interval():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+    rate = Rate(5, 60)
+
+    async def run():
+        for _ in range(5):
+            await backend.acquire("k", rate)
+        clock.now += 12
+        first = await backend.acquire("k", rate)
+        second = await backend.acquire("k", rate)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == 0.0
+    assert second == pytest.approx(12.0)
+
+
+def test_rejected_requests_do_not_consume_budget():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+    rate = Rate(2, 10)
+
+    async def run():
+        await backend.acquire("k", rate)
+        await backend.acquire("k", rate)
+        for _ in range(10):
+            assert await backend.acquire("k", rate) > 0
+        clock.now += 5
+        return await backend.acquire("k", rate)
+
+    assert asyncio.run(run()) == 0.0
+
+
+def test_acquire_keys_are_independent_and_bounded():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(max_keys=2, clock=clock)
+    rate = Rate(1, 60)
+
+    async def run():
+        assert await backend.acquire("a", rate) == 0.0
+        assert await backend.acquire("b", rate) == 0.0
+        assert await backend.acquire("b", rate) > 0
+        # Evicts "a", the least recently allowed key
+        assert await backend.acquire("c", rate) == 0.0
+        return await backend.acquire("a", rate)
+
+    assert asyncio.run(run()) == 0.0
+    assert backend.stats()["keys"] == 2
+
+
+def test_acquire_many_counts_nothing_when_one_limit_rejects():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+    loose, strict = Rate(10, 60), Rate(1, 60)
+
+    async def run():
+        assert await backend.acquire("strict", strict) == 0.0
+        for _ in range(5):
+            assert await backend.acquire_many([("loose", loose), ("strict", strict)]) > 0
+        # The rejected requests spent none of the loose budget
+        return [await backend.acquire("loose", loose) for _ in range(11)]
+
+    results = asyncio.run(run())
+    assert results[:10] == [0.0] * 10
+    assert results[10] > 0
+
+
+def test_request_rejected_per_ip_does_not_spend_the_user_budget(monkeypatch):
+    path = "/api/suggestions/workout"
+    rules = [
+        RateLimitRule("POST", path, "user", Rate(5, 3600)),
+        RateLimitRule("POST", path, "ip", Rate(2, 3600)),
+    ]
+    rate_limiter = RateLimiter(InMemoryRateLimitBackend(), rules)
+    monkeypatch.setattr(RateLimiter, "user_id", staticmethod(lambda headers: "user-1"))
+
+    def scope(client):
+        return {"type": "http", "method": "POST", "path": path, "client": (client, 4321), "headers": []}
+
+    async def run():
+        first_ip = [await rate_limiter.check(scope("10.0.0.1")) for _ in range(6)]
+        second_ip = [await rate_limiter.check(scope("10.0.0.2")) for _ in range(2)]
+        third_ip = [await rate_limiter.check(scope("10.0.0.3")) for _ in range(2)]
+        return first_ip, second_ip, third_ip
+
+    first_ip, second_ip, third_ip = asyncio.run(run())
+    assert [retry_after == 0 for retry_after in first_ip] == [True, True, False, False, False, False]
+    assert all(retry_after == 0 for retry_after in second_ip)
+    # Five requests got through in total: the user limit is now reached
+    assert [retry_after == 0 for retry_after in third_ip] == [True, False]
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+
+# repository imports the models (pydantic) and the codecs (pymongo's bson)
+pytest.importorskip("pydantic")
+pytest.importorskip("pymongo")
+pytest.importorskip("bson")
+
+from content_codec import ContentCodec  # noqa: E402
+from repository import decode_cursor, encode_cursor, list_suggestions, load_suggestion  # noqa: E402
+
+USER_ID = "user-1"
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._limit = None
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self._docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    async def to_list(self, length):
+        return [dict(doc) for doc in self._docs[:min(self._limit, length)]]
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc[field] < condition["$lt"]:
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return FakeCursor([_project(doc, projection) for doc in self.docs if _matches(doc, query)])
+
+    async def find_one(self, query, projection):
+        docs = self.find(query, projection)._docs
+        return docs[0] if docs else None
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.suggestions = FakeCollection(docs)
+
+
+def suggestion(n, created_at, user_id=USER_ID, suggestion_type="workout"):
+    return {
+        "id": f"s{n:02d}",
+        "user_id": user_id,
+        "type": suggestion_type,
+        "content": f"plano {n}",
+        "created_at": created_at,
+    }
+
+
+def all_pages(db, limit, **kwargs):
+    async def run():
+        pages = []
+        cursor = None
+        while True:
+            docs, cursor = await list_suggestions(db, USER_ID, limit=limit, cursor=cursor, **kwargs)
+            pages.append([doc["id"] for doc in docs])
+            if cursor is None:
+                return pages
+    return asyncio.run(run())
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(BASE_TIME, "s01")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (BASE_TIME, "s01")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "WzFd", "eyJhIjogMX0"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_with_equal_created_at_neither_skip_nor_repeat():
+    # Six suggestions share one timestamp, so pages must be cut on the id too
+    docs = [suggestion(n, BASE_TIME) for n in range(6)]
+    docs += [suggestion(n, BASE_TIME - timedelta(minutes=n)) for n in range(6, 10)]
+
+    assert all_pages(FakeDB(docs), limit=4) == [
+        ["s05", "s04", "s03", "s02"],
+        ["s01", "s00", "s06", "s07"],
+        ["s08", "s09"],
+    ]
+
+
+def test_last_page_has_no_cursor_when_it_is_exactly_full():
+    docs = [suggestion(n, BASE_TIME) for n in range(4)]
+    assert all_pages(FakeDB(docs), limit=2) == [["s03", "s02"], ["s01", "s00"]]
+
+
+def test_pages_are_filtered_by_user_and_type():
+    docs = [suggestion(n, BASE_TIME) for n in range(3)]
+    docs.append(suggestion(3, BASE_TIME, user_id="user-2"))
+    docs.append(suggestion(4, BASE_TIME, suggestion_type="nutrition"))
+
+    assert all_pages(FakeDB(docs), limit=2, suggestion_type="workout") == [
+        ["s02", "s01"],
+        ["s00"],
+    ]
+
+
+def test_pages_leave_content_out_and_fetch_by_id_decodes_it():
+    codec = ContentCodec("zlib", min_bytes=1)
+    docs = [codec.encode(suggestion(n, BASE_TIME)) for n in range(2)]
+    assert all("content_z" in doc for doc in docs)
+    db = FakeDB(docs)
+
+    page, _ = asyncio.run(list_suggestions(db, USER_ID))
+    assert [set(doc) for doc in page] == [{"id", "type", "created_at"}] * 2
+
+    loaded = asyncio.run(load_suggestion(db, USER_ID, "s01"))
+    assert loaded["content"] == "plano 1"
+    assert "content_z" not in loaded
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_for_one_key_share_a_single_run():
+    flight = SingleFlight()
+    runs = 0
+
+    async def generate():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return {"plan": runs}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("user-1:workout", generate) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert runs == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0.01, result="a")),
+            flight.do("b", lambda: asyncio.sleep(0.01, result="b")),
+        )
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.calls == 2
+    assert flight.coalesced == 0
+
+
+def test_key_runs_again_once_the_call_completed():
+    flight = SingleFlight()
+
+    async def run():
+        first = await flight.do("k", lambda: asyncio.sleep(0, result=1))
+        assert not flight.in_flight("k")
+        second = await flight.do("k", lambda: asyncio.sleep(0, result=2))
+        return first, second
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("falhou")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.calls == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    release = None
+
+    async def generate():
+        await release.wait()
+        return "plano"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        leaving = asyncio.create_task(flight.do("k", generate))
+        staying = asyncio.create_task(flight.do("k", generate))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == "plano"
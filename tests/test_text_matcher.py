@@ -0,0 +1,70 @@
+import unicodedata
+import pytest
+
+from text_matcher import MultiPatternMatcher, fold_text
+
+
+def test_fold_text_strips_accents_case_and_punctuation():
+    folded, offsets = fold_text("Açaí, PÃO!")
+    assert folded == b"acai  pao "
+    assert offsets is None
+
+
+def test_matches_ignore_accents_and_case():
+    matcher = MultiPatternMatcher(["açaí", "pão de queijo"])
+    assert matcher.matched_patterns("ACAI com Pao De Queijo") == ["açaí", "pão de queijo"]
+    assert matcher.matched_patterns("Açaí e PÃO DE QUEIJO") == ["açaí", "pão de queijo"]
+
+
+def test_matches_whole_words_only():
+    matcher = MultiPatternMatcher(["chia", "pão"])
+    assert matcher.findall("chiado e pãozinho") == []
+    assert matcher.matched_patterns("semente de chia.") == ["chia"]
+
+
+def test_multi_word_patterns_span_punctuation_and_whitespace():
+    matcher = MultiPatternMatcher(["açaí bowl"])
+    assert matcher.matched_patterns("Açaí (bowl)") == ["açaí bowl"]
+    assert matcher.matched_patterns("açaí\n\n  bowl") == ["açaí bowl"]
+    assert matcher.matched_patterns("açaí com bowl") == []
+
+
+def test_offsets_point_into_the_original_text():
+    text = "Evite AÇAÍ (bowl) e chia"
+    matcher = MultiPatternMatcher(["chia", "açaí bowl"])
+    matches = matcher.findall(text)
+    assert [(m.pattern, text[m.start:m.end]) for m in matches] == [
+        ("açaí bowl", "AÇAÍ (bowl"),
+        ("chia", "chia"),
+    ]
+    assert [m.index for m in matches] == [1, 0]
+
+
+def test_offsets_with_decomposed_accents():
+    text = unicodedata.normalize("NFD", "um açaí e um pão")
+    matches = MultiPatternMatcher(["pão", "açaí"]).findall(text)
+    assert [text[m.start:m.end] for m in matches] == [
+        unicodedata.normalize("NFD", "açaí"),
+        unicodedata.normalize("NFD", "pão"),
+    ]
+
+
+def test_reports_every_occurrence_in_order():
+    matcher = MultiPatternMatcher(["ovo", "ovo cozido"])
+    matches = matcher.findall("ovo cozido, ovo frito")
+    assert [(m.pattern, m.start) for m in matches] == [
+        ("ovo", 0),
+        ("ovo cozido", 0),
+        ("ovo", 12),
+    ]
+
+
+def test_characters_outside_latin1_are_separators():
+    matcher = MultiPatternMatcher(["whey"])
+    assert matcher.matched_patterns("whey—protein") == ["whey"]
+    assert matcher.matched_patterns("whey🥛") == ["whey"]
+
+
+def test_pattern_without_letters_is_rejected():
+    with pytest.raises(ValueError):
+        MultiPatternMatcher(["!!"])
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+import pytest
+
+# token_revocation imports auth (passlib, python-jose, fastapi) and pymongo
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+pytest.importorskip("fastapi")
+pytest.importorskip("pymongo")
+
+from token_revocation import (  # noqa: E402
+    BloomFilter, TokenRevocationList, single_token_key, token_keys
+)
+
+TOKEN = "header.payload.signature"
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, field, direction):
+        self._docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeRevokedTokens:
+    def __init__(self):
+        self.docs = {}
+        self.lookups = 0
+        # Scans of the whole collection (rebuilds) and incremental ones
+        self.full_scans = 0
+        self.incremental_scans = 0
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query, projection):
+        if "revoked_at" in query:
+            self.incremental_scans += 1
+            since = query["revoked_at"]["$gte"]
+        else:
+            self.full_scans += 1
+            since = None
+        return FakeCursor([
+            {"key": doc["key"], "revoked_at": doc["revoked_at"]}
+            for doc in self.docs.values()
+            if doc["expires_at"] > query["expires_at"]["$gt"] and (since is None or doc["revoked_at"] >= since)
+        ])
+
+    async def update_one(self, query, update, upsert):
+        doc = self.docs.setdefault(query["key"], {"key": query["key"]})
+        doc.update(update["$set"])
+        doc["expires_at"] = max(doc.get("expires_at", update["$max"]["expires_at"]), update["$max"]["expires_at"])
+
+    async def find_one(self, query, projection):
+        self.lookups += 1
+        doc = self.docs.get(query["key"])
+        if doc is None or doc["expires_at"] <= query["expires_at"]["$gt"]:
+            return None
+        return {"_id": query["key"]}
+
+
+class FakeDB:
+    def __init__(self):
+        self.revoked_tokens = FakeRevokedTokens()
+
+
+class AlwaysHitFilter(BloomFilter):
+    """A filter whose every lookup is a (possibly false) positive"""
+
+    def __contains__(self, key):
+        return True
+
+
+def revocation_list(db):
+    revocations = TokenRevocationList()
+    revocations._get_db = lambda: db
+    return revocations
+
+
+def payload(**claims):
+    return {"sub": "maria@example.com", "exp": (datetime.utcnow() + timedelta(hours=1)).timestamp(), **claims}
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti:{i}")
+
+    assert all(f"jti:{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert bloom.count == 1000
+
+
+def test_token_keys():
+    assert token_keys(payload(jti="abc", uid="u1"), TOKEN) == ["jti:abc", "user:u1"]
+    # Tokens issued without a jti are keyed by their digest
+    digest = hashlib.sha256(TOKEN.encode("utf-8")).hexdigest()
+    assert single_token_key(payload(), TOKEN) == f"tok:{digest}"
+    assert token_keys(payload(), TOKEN) == [f"tok:{digest}"]
+
+
+def test_unrevoked_token_does_not_reach_the_database():
+    db = FakeDB()
+    revocations = revocation_list(db)
+
+    assert not asyncio.run(revocations.is_revoked(payload(jti="abc", uid="u1"), TOKEN))
+    assert db.revoked_tokens.lookups == 0
+
+
+def test_revoked_token_is_rejected():
+    db = FakeDB()
+    revocations = revocation_list(db)
+    token_payload = payload(jti="abc", uid="u1")
+
+    async def run():
+        await revocations.revoke_token(db, token_payload, TOKEN)
+        return (
+            await revocations.is_revoked(token_payload, TOKEN),
+            await revocations.is_revoked(payload(jti="other", uid="u1"), "other.token")
+        )
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_legacy_token_is_revoked_by_digest():
+    db = FakeDB()
+    revocations = revocation_list(db)
+
+    async def run():
+        await revocations.revoke_token(db, payload(), TOKEN)
+        return (
+            await revocations.is_revoked(payload(), TOKEN),
+            await revocations.is_revoked(payload(), "another.legacy.token")
+        )
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_revoked_user_rejects_every_token_of_the_user():
+    db = FakeDB()
+    revocations = revocation_list(db)
+
+    async def run():
+        await revocations.revoke_user(db, "u1")
+        return (
+            await revocations.is_revoked(payload(jti="a", uid="u1"), TOKEN),
+            await revocations.is_revoked(payload(jti="b", uid="u2"), TOKEN)
+        )
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_filter_hit_is_confirmed_against_the_database():
+    db = FakeDB()
+    # Revoked by another worker: only in the database and the filter
+    db.revoked_tokens.docs["jti:abc"] = {"key": "jti:abc", "expires_at": datetime.utcnow() + timedelta(hours=1)}
+    revocations = revocation_list(db)
+    revocations._filter = AlwaysHitFilter()
+
+    async def run():
+        first = await revocations.is_revoked(payload(jti="abc"), TOKEN)
+        second = await revocations.is_revoked(payload(jti="abc"), TOKEN)
+        return first, second
+
+    assert asyncio.run(run()) == (True, True)
+    # The confirmation is cached
+    assert db.revoked_tokens.lookups == 1
+    assert revocations.filter_hits == 1
+
+
+def test_false_positive_is_remembered():
+    db = FakeDB()
+    revocations = revocation_list(db)
+    revocations._filter = AlwaysHitFilter()
+
+    async def run():
+        return [await revocations.is_revoked(payload(jti="abc"), TOKEN) for _ in range(3)]
+
+    assert asyncio.run(run()) == [False, False, False]
+    assert db.revoked_tokens.lookups == 1
+    assert revocations.false_positive_count == 1
+
+
+def test_expired_revocation_is_a_false_positive():
+    db = FakeDB()
+    db.revoked_tokens.docs["jti:abc"] = {"key": "jti:abc", "expires_at": datetime.utcnow() - timedelta(minutes=1)}
+    revocations = revocation_list(db)
+    revocations._filter = AlwaysHitFilter()
+
+    assert not asyncio.run(revocations.is_revoked(payload(jti="abc"), TOKEN))
+    assert revocations.false_positive_count == 1
+
+
+def test_filter_past_capacity_is_not_rebuilt_on_every_tick():
+    db = FakeDB()
+    now = datetime.utcnow()
+    for i in range(10):
+        db.revoked_tokens.docs[f"jti:{i}"] = {
+            "key": f"jti:{i}",
+            "revoked_at": now - timedelta(seconds=10 - i),
+            "expires_at": now + timedelta(hours=1)
+        }
+    # More live revocations than the configured capacity
+    revocations = TokenRevocationList(capacity=4)
+
+    async def run():
+        await revocations._rebuild(db)
+        for _ in range(3):
+            await revocations._tick(db)
+
+    asyncio.run(run())
+    assert revocations._filter.capacity == 20
+    assert revocations._filter.count == 10
+    assert db.revoked_tokens.full_scans == 1
+    assert db.revoked_tokens.incremental_scans == 3
+    assert all(f"jti:{i}" in revocations._filter for i in range(10))